@@ -0,0 +1,231 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Async LLM Executor - Runs many chat completions concurrently within OpenAI rate limits
+
+Every request carries a pre-estimated token cost (prompt + max_tokens) that is
+reserved against the shared RPM/TPM limiter before dispatch. 429 responses
+honor the provider's retry-after hint for all in-flight callers. Requests
+reaching the front of the queue while OpenAI's circuit breaker is open fail
+immediately.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from openai import AsyncOpenAI, RateLimitError
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.metrics import llm_queue_depth, llm_queue_wait, llm_rate_limited, record_llm_usage
+from src.services.circuit_breaker import CircuitBreaker, get_breaker
+from src.services.llm_client import get_async_openai_client
+from src.services.rate_limiter import RateLimiter, get_rate_limiter, retry_after_seconds
+from src.utils.logger import log
+from src.utils.tokens import count_message_tokens
+
+
+@dataclass
+class LLMRequest:
+    """One chat completion to execute"""
+    messages: List[Dict[str, str]]
+    model: str = "gpt-4o-mini"
+    max_tokens: int = 1000
+    temperature: float = 0.7
+    key: Any = None
+    purpose: str = "llm"
+
+    @property
+    def estimated_tokens(self) -> int:
+        return count_message_tokens(self.messages, self.model) + self.max_tokens
+
+
+@dataclass
+class LLMResult:
+    """Outcome of an LLMRequest"""
+    request: LLMRequest
+    content: str = ""
+    tokens_used: int = 0
+    cached_tokens: int = 0
+    wait_seconds: float = 0.0
+    latency_seconds: float = 0.0
+    attempts: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class ExecutorStats:
+    """Counters for queue depth and wait time"""
+    submitted: int = 0
+    in_flight: int = 0
+    completed: int = 0
+    failed: int = 0
+    throttled: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self.submitted - self.in_flight - self.completed - self.failed
+
+    def as_dict(self) -> Dict[str, Any]:
+        done = self.completed + self.failed
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "throttled": self.throttled,
+            "avg_wait_seconds": self.total_wait_seconds / done if done else 0.0,
+            "max_wait_seconds": self.max_wait_seconds
+        }
+
+
+class AsyncLLMExecutor:
+    """
+    Concurrent chat-completion runner on AsyncOpenAI
+
+    Concurrency is bounded by max_concurrency; throughput is bounded by the
+    shared RateLimiter so sync and async callers draw from the same budget.
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: int = 3,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        # Defaults to the shared pooled client of the running event loop
+        self.client = client
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+        self.max_retries = max_retries
+        self.breaker = breaker or get_breaker("openai")
+        self.stats = ExecutorStats()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(self, request: LLMRequest) -> LLMResult:
+        """Execute one request, waiting for concurrency and rate-limit capacity"""
+        result = LLMResult(request=request)
+        self.stats.submitted += 1
+        llm_queue_depth.set(self.stats.queue_depth)
+        queued_at = time.monotonic()
+
+        try:
+            async with self._get_semaphore():
+                if not self.breaker.allow():
+                    result.error = f"{self.breaker.name} circuit open - failing fast"
+                else:
+                    await self._admitted(request, result, queued_at)
+        except asyncio.CancelledError:
+            # Abandoned at a deadline (see run_all)
+            self.stats.failed += 1
+            llm_queue_depth.set(self.stats.queue_depth)
+            raise
+
+        if result.ok:
+            self.stats.completed += 1
+        else:
+            self.stats.failed += 1
+        self.stats.total_wait_seconds += result.wait_seconds
+        self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, result.wait_seconds)
+        llm_queue_depth.set(self.stats.queue_depth)
+        return result
+
+    async def _admitted(self, request: LLMRequest, result: LLMResult, queued_at: float):
+        """Rate-limit and dispatch a request the circuit breaker let through"""
+        estimated = request.estimated_tokens
+        try:
+            await self.rate_limiter.acquire_async(estimated)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        result.wait_seconds = time.monotonic() - queued_at
+        self.stats.in_flight += 1
+        llm_queue_depth.set(self.stats.queue_depth)
+        llm_queue_wait.observe(result.wait_seconds)
+
+        try:
+            await self._dispatch(request, result, estimated)
+        except asyncio.CancelledError:
+            # Still waiting on OpenAI at the deadline - counts as a failed (too slow) call
+            result.error = "cancelled"
+            raise
+        finally:
+            self.stats.in_flight -= 1
+            self.breaker.record(not result.ok, result.latency_seconds)
+
+    async def _dispatch(self, request: LLMRequest, result: LLMResult, estimated: int):
+        started = time.monotonic()
+        while True:
+            result.attempts += 1
+            try:
+                client = self.client or get_async_openai_client()
+                response = await client.chat.completions.create(
+                    model=request.model,
+                    messages=request.messages,
+                    temperature=request.temperature,
+                    max_tokens=request.max_tokens
+                )
+                result.content = response.choices[0].message.content or ""
+                result.tokens_used = getattr(response.usage, "total_tokens", 0) if response.usage else 0
+                result.cached_tokens = record_llm_usage(request.purpose, response.usage)
+                self.rate_limiter.reconcile(estimated, result.tokens_used)
+                break
+            except RateLimitError as e:
+                self.stats.throttled += 1
+                llm_rate_limited.inc()
+                delay = retry_after_seconds(e, default=2 ** result.attempts)
+                self.rate_limiter.penalize(delay)
+                log.warning("async_executor.rate_limited", retry_after=delay, attempt=result.attempts)
+                if result.attempts > self.max_retries:
+                    result.error = str(e)
+                    break
+                waited = await self.rate_limiter.acquire_async(estimated)
+                result.wait_seconds += waited
+            except Exception as e:
+                log.error("async_executor.request_failed", error=str(e), key=request.key)
+                result.error = str(e)
+                break
+        result.latency_seconds = time.monotonic() - started
+
+    async def run_all(self, requests: List[LLMRequest], timeout: Optional[float] = None) -> List[LLMResult]:
+        """
+        Execute requests concurrently; results are returned in request order
+
+        Requests still unfinished after timeout seconds are cancelled and
+        returned as failed results, so callers can report partial output.
+        """
+        if timeout is None:
+            results = list(await asyncio.gather(*(self.run(request) for request in requests)))
+        else:
+            tasks = [asyncio.ensure_future(self.run(request)) for request in requests]
+            done, pending = await asyncio.wait(tasks, timeout=timeout) if tasks else (set(), set())
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+                log.warning("async_executor.deadline_exceeded", cancelled=len(pending), timeout_seconds=timeout)
+            results = [
+                task.result() if task in done
+                else LLMResult(request=request, error=f"deadline exceeded after {timeout:.1f}s")
+                for task, request in zip(tasks, requests)
+            ]
+        log.info("async_executor.batch_complete", requests=len(requests), **self.stats.as_dict())
+        return results
@@ -0,0 +1,254 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Batch Jobs - Offline, resumable batch execution of agent requests
+
+For nightly full-estate runs where cost and throughput matter more than latency.
+Requests are written to a JSONL job file in the OpenAI Batch API input format,
+submitted through a backend, polled until complete and mapped back to VMs.
+Every step is recorded in the job's manifest.json, so a restarted process picks
+up where the previous one stopped instead of resubmitting.
+
+Backends:
+- OpenAIBatchBackend: the OpenAI Batch API (files + batches endpoints)
+- LocalBatchBackend:  a file-based stand-in that completes requests locally
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.utils.files import write_json_atomic
+from src.utils.logger import log
+from src.utils.tokens import count_message_tokens, count_tokens
+
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+TERMINAL_STATES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchJobError(Exception):
+    """Raised when a batch ends in a failed, expired or cancelled state"""
+
+
+class LocalBatchBackend:
+    """
+    File-based stand-in for the OpenAI Batch API
+
+    Each submitted batch gets a directory under root holding its input, status
+    and output files. Requests are completed on the first poll by completer,
+    which maps a request body to reply text, so no network is needed.
+    """
+
+    def __init__(self, root: str, completer: Callable[[Dict[str, Any]], str]):
+        self.root = root
+        self.completer = completer
+
+    def _status_path(self, batch_id: str) -> str:
+        return os.path.join(self.root, batch_id, "status.json")
+
+    def submit(self, input_path: str) -> str:
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        os.makedirs(os.path.join(self.root, batch_id), exist_ok=True)
+        shutil.copyfile(input_path, os.path.join(self.root, batch_id, "input.jsonl"))
+        with open(self._status_path(batch_id), "w", encoding="utf-8") as f:
+            json.dump({"status": "in_progress"}, f)
+        return batch_id
+
+    def poll(self, batch_id: str) -> str:
+        with open(self._status_path(batch_id), "r", encoding="utf-8") as f:
+            status = json.load(f)["status"]
+        if status == "in_progress":
+            self._complete(batch_id)
+            status = "completed"
+        return status
+
+    def _complete(self, batch_id: str):
+        directory = os.path.join(self.root, batch_id)
+        output_path = os.path.join(directory, "output.jsonl")
+        with open(os.path.join(directory, "input.jsonl"), "r", encoding="utf-8") as src, \
+                open(output_path, "w", encoding="utf-8") as out:
+            for line in src:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                body = request["body"]
+                content = self.completer(body)
+                prompt_tokens = count_message_tokens(body.get("messages", []), body.get("model", "gpt-4o-mini"))
+                completion_tokens = count_tokens(content)
+                out.write(json.dumps({
+                    "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "body": {
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                                  "total_tokens": prompt_tokens + completion_tokens}
+                    }},
+                    "error": None
+                }) + "\n")
+        with open(self._status_path(batch_id), "w", encoding="utf-8") as f:
+            json.dump({"status": "completed"}, f)
+
+    def download(self, batch_id: str, dest_path: str):
+        shutil.copyfile(os.path.join(self.root, batch_id, "output.jsonl"), dest_path)
+
+
+class OpenAIBatchBackend:
+    """OpenAI Batch API backend (50% cheaper, completes within 24h)"""
+
+    def __init__(self, client=None, completion_window: str = "24h"):
+        if client is None:
+            from src.services.llm_client import get_openai_client
+            client = get_openai_client()
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, input_path: str) -> str:
+        with open(input_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=CHAT_COMPLETIONS_URL,
+            completion_window=self.completion_window
+        )
+        return batch.id
+
+    def poll(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def download(self, batch_id: str, dest_path: str):
+        batch = self.client.batches.retrieve(batch_id)
+        with open(dest_path, "w", encoding="utf-8") as f:
+            if batch.output_file_id:
+                f.write(self.client.files.content(batch.output_file_id).text)
+            if batch.error_file_id:
+                f.write(self.client.files.content(batch.error_file_id).text)
+
+
+class BatchJob:
+    """
+    A resumable batch job stored in a directory:
+    - requests.jsonl: Batch API input, one line per request
+    - manifest.json:  request metadata (custom_id -> VMs), backend batch id, status
+    - results.jsonl:  downloaded Batch API output
+    """
+
+    def __init__(self, job_dir: str):
+        self.job_dir = job_dir
+        self.requests_path = os.path.join(job_dir, "requests.jsonl")
+        self.results_path = os.path.join(job_dir, "results.jsonl")
+        self.manifest_path = os.path.join(job_dir, "manifest.json")
+        os.makedirs(job_dir, exist_ok=True)
+        self.manifest: Dict[str, Any] = {"status": "new", "batch_id": None, "requests": {}}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+            log.info("batch_job.resumed", job_dir=job_dir, status=self.manifest["status"],
+                     batch_id=self.manifest["batch_id"])
+
+    @property
+    def status(self) -> str:
+        return self.manifest["status"]
+
+    def _save(self):
+        write_json_atomic(self.manifest_path, self.manifest, indent=2)
+
+    def write_requests(self, requests: List[Dict[str, Any]]):
+        """
+        Write request entries ({'custom_id', 'body', 'meta'}) to the job file
+
+        Ignored when the job already has requests, so a resumed job keeps its
+        original inputs.
+        """
+        if self.status != "new":
+            return
+        with open(self.requests_path, "w", encoding="utf-8") as f:
+            for request in requests:
+                f.write(json.dumps({
+                    "custom_id": request["custom_id"],
+                    "method": "POST",
+                    "url": CHAT_COMPLETIONS_URL,
+                    "body": request["body"]
+                }) + "\n")
+                self.manifest["requests"][request["custom_id"]] = request.get("meta", {})
+        self.manifest["status"] = "prepared"
+        self._save()
+        log.info("batch_job.prepared", job_dir=self.job_dir, requests=len(requests))
+
+    def run(self, backend, poll_interval: float = 30.0, timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Submit (unless already submitted), poll until done and download results
+
+        Returns:
+            custom_id -> {'content', 'tokens_used', 'error', 'meta'}
+
+        Raises:
+            BatchJobError: If the batch fails, expires or is cancelled
+            TimeoutError: If timeout elapses before the batch completes
+        """
+        if self.status == "new":
+            raise BatchJobError("No requests written for this batch job")
+
+        if self.status == "prepared":
+            self.manifest["batch_id"] = backend.submit(self.requests_path)
+            self.manifest["status"] = "submitted"
+            self.manifest["submitted_at"] = time.time()
+            self._save()
+            log.info("batch_job.submitted", batch_id=self.manifest["batch_id"])
+
+        deadline = time.monotonic() + timeout if timeout else None
+        while self.status == "submitted":
+            state = backend.poll(self.manifest["batch_id"])
+            if state == "completed":
+                backend.download(self.manifest["batch_id"], self.results_path)
+                self.manifest["status"] = "completed"
+                self._save()
+                log.info("batch_job.completed", batch_id=self.manifest["batch_id"])
+            elif state in TERMINAL_STATES:
+                self.manifest["status"] = state
+                self._save()
+            elif deadline and time.monotonic() > deadline:
+                raise TimeoutError(f"Batch {self.manifest['batch_id']} still {state}")
+            else:
+                time.sleep(poll_interval)
+
+        if self.status != "completed":
+            raise BatchJobError(f"Batch {self.manifest['batch_id']} ended as {self.status}")
+        return self.results()
+
+    def results(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Parse downloaded results, keyed by custom_id
+
+        Every request in the manifest gets an entry: one without a result line
+        is reported with the error "no batch result" instead of being dropped.
+        """
+        parsed: Dict[str, Dict[str, Any]] = {}
+        with open(self.results_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                custom_id = entry["custom_id"]
+                response = entry.get("response") or {}
+                body = response.get("body") or {}
+                result = {"content": "", "tokens_used": 0, "error": None,
+                          "meta": self.manifest["requests"].get(custom_id, {})}
+                if entry.get("error") or response.get("status_code") != 200:
+                    result["error"] = json.dumps(entry.get("error") or body.get("error"))
+                else:
+                    result["content"] = body["choices"][0]["message"]["content"] or ""
+                    result["tokens_used"] = (body.get("usage") or {}).get("total_tokens", 0)
+                parsed[custom_id] = result
+        missing = [custom_id for custom_id in self.manifest["requests"] if custom_id not in parsed]
+        for custom_id in missing:
+            parsed[custom_id] = {"content": "", "tokens_used": 0, "error": "no batch result",
+                                 "meta": self.manifest["requests"][custom_id]}
+        if missing:
+            log.warning("batch_job.results_missing", batch_id=self.manifest["batch_id"], missing=missing)
+        return parsed
@@ -0,0 +1,124 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Clustering - Groups VMs with the same configuration so each shape is analyzed once
+
+Scale-set clones share size, region, image, tags and NSG rules. They get the same
+fingerprint, one representative is described to the LLM with a member count, and
+findings for the representative are fanned back out to every member.
+"""
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+# Tags that identify an individual instance rather than its configuration
+INSTANCE_TAG_KEYS = ("name", "hostname", "instance", "instanceid", "created", "createdon", "owner")
+
+
+@dataclass
+class VMCluster:
+    """A group of VMs sharing one configuration fingerprint"""
+    fingerprint: str
+    representative: Dict[str, Any]
+    members: List[str] = field(default_factory=list)
+
+    @property
+    def size(self) -> int:
+        return len(self.members)
+
+
+def _nsg_signature(nsg_data: Any) -> Any:
+    """Rule contents without per-resource ids, etags or NSG names"""
+    if not nsg_data:
+        return None
+    if nsg_data.get("error"):
+        return "error"
+    rules = []
+    for rule in nsg_data.get("value", []):
+        props = rule.get("properties", rule)
+        rules.append({
+            key: props.get(key)
+            for key in ("priority", "direction", "access", "protocol",
+                        "destinationPortRange", "destinationPortRanges", "sourceAddressPrefix")
+        })
+    return sorted(rules, key=lambda r: (r.get("priority") or 0, json.dumps(r, sort_keys=True)))
+
+
+def config_signature(vm: Dict[str, Any]) -> Dict[str, Any]:
+    """The configuration fields that decide a VM's diagnosis, without its identity"""
+    props = vm.get("properties", {})
+    storage = props.get("storageProfile", {})
+    tags = {
+        key: value for key, value in (vm.get("tags") or {}).items()
+        if key.lower() not in INSTANCE_TAG_KEYS
+    }
+    return {
+        "location": vm.get("location"),
+        "vmSize": props.get("hardwareProfile", {}).get("vmSize"),
+        "powerState": props.get("powerState"),
+        "provisioningState": props.get("provisioningState"),
+        "osType": storage.get("osDisk", {}).get("osType"),
+        "image": storage.get("imageReference"),
+        "tags": tags,
+        "nsg": _nsg_signature(vm.get("nsg")),
+    }
+
+
+def config_fingerprint(vm: Dict[str, Any]) -> str:
+    """Stable hash of a VM's configuration signature"""
+    canonical = json.dumps(config_signature(vm), sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def cluster_vms(vms: List[Dict[str, Any]]) -> List[VMCluster]:
+    """
+    Group VMs by configuration fingerprint
+
+    Clusters are returned in order of first appearance; the first VM seen for a
+    fingerprint is its representative.
+    """
+    clusters: Dict[str, VMCluster] = {}
+    for vm in vms:
+        fingerprint = config_fingerprint(vm)
+        cluster = clusters.get(fingerprint)
+        if cluster is None:
+            cluster = clusters[fingerprint] = VMCluster(fingerprint=fingerprint, representative=vm)
+        cluster.members.append(vm.get("name", "Unknown"))
+    return list(clusters.values())
+
+
+def fan_out_findings(findings: List[Dict[str, Any]], clusters: List[VMCluster]) -> List[Dict[str, Any]]:
+    """
+    Copy each finding about a cluster representative to every cluster member
+
+    Findings for VMs that are not representatives are passed through unchanged.
+    """
+    by_representative = {c.representative.get("name"): c for c in clusters}
+    expanded = []
+    for finding in findings:
+        cluster = by_representative.get(finding.get("vm"))
+        if cluster is None or cluster.size == 1:
+            expanded.append(finding)
+            continue
+        for member in cluster.members:
+            expanded.append(dict(finding, vm=member, cluster=cluster.fingerprint,
+                                 representative=finding.get("vm")))
+    return expanded
+
+
+def render_membership(clusters: List[VMCluster], limit: int = 10) -> str:
+    """Describe which VMs each analyzed representative stands for"""
+    lines = []
+    for cluster in clusters:
+        if cluster.size == 1:
+            continue
+        names = cluster.members[:limit]
+        extra = f", ... (+{cluster.size - limit} more)" if cluster.size > limit else ""
+        lines.append(f"- {cluster.representative.get('name')} represents {cluster.size} VMs: "
+                     f"{', '.join(names)}{extra}")
+    if not lines:
+        return ""
+    return "ℹ️ Findings for each representative apply to every VM in its group:\n" + "\n".join(lines)
@@ -5,15 +5,85 @@ Agentic AI for Azure Supportability Test
 """
 Diagnostic Agent - Analyzes Azure resource data using OpenAI
 """
-from openai import OpenAI
 import os
 import json
-from typing import Dict, Any
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
 
 # Import logger from utils
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.agents.clustering import VMCluster, cluster_vms, config_fingerprint, fan_out_findings, render_membership
+from src.agents.async_executor import AsyncLLMExecutor, LLMRequest, LLMResult
+from src.agents.finding_store import FindingStore
+from src.agents.model_router import ModelRouter
+from src.metrics import record_llm_usage
+from src.agents.schema import FINDINGS_SCHEMA, Finding, SchemaError, parse_findings, response_format
+from src.agents.triage import HEALTHY, classify_vm, degraded_report
+from src.services.circuit_breaker import CircuitOpenError, get_breaker
+from src.services.hedging import Hedger, LLMDeadlineExceeded
+from src.services.llm_client import get_openai_client, run_async
+from src.services.rate_limiter import get_rate_limiter
+from src.utils.deadline import Deadline
+from src.utils.health import quick_health_check
 from src.utils.logger import log
+from src.utils.nsg import nsg_issues
+from src.utils.tokens import (
+    BudgetResult, PromptBudgetExceeded, TokenBudgeter, count_message_tokens, get_context_window
+)
+
+SYSTEM_PROMPT = "You are an expert Azure cloud architect specializing in infrastructure diagnostics, performance optimization, and security."
+
+# Prompts keep all static text ahead of the fleet data so that every request
+# shares a byte-identical prefix the provider can serve from its prompt cache
+ANALYSIS_PROMPT = """
+You are an expert Azure Cloud Architect and Site Reliability Engineer.
+Analyze the Azure infrastructure data at the end of this message and provide a comprehensive diagnostic report.
+
+Please provide:
+1. Health Assessment: Overall health status of the infrastructure
+2. Configuration Issues: Any misconfigurations or suboptimal settings
+3. Performance Concerns: Potential performance bottlenecks
+4. Security Risks: Security vulnerabilities or compliance issues
+5. Cost Optimization: Opportunities to reduce costs
+6. Recommendations: Top 3-5 actionable recommendations
+
+Format your response in a clear, structured manner suitable for technical and non-technical stakeholders.
+
+Azure Resource Data:
+{data_summary}
+"""
+
+STRUCTURED_ANALYSIS_PROMPT = """
+You are an expert Azure Cloud Architect and Site Reliability Engineer.
+Analyze the Azure infrastructure data at the end of this message and return JSON findings.
+
+Return one finding per issue per VM as {{"findings": [...]}}. Each finding has:
+- vm: the VM name exactly as listed (for a configuration cluster, its representative)
+- category: one of availability, provisioning, network, security, performance, cost, configuration
+- severity: one of Critical, High, Medium, Low
+- root_cause: one sentence naming the cause
+- evidence: data points from the resource data that support the root cause
+
+Return {{"findings": []}} if no VM has an issue.
+
+Azure Resource Data:
+{data_summary}
+"""
+
+# Tokens held back for the "VMs omitted" note added when the prompt is truncated
+OMISSION_NOTE_TOKENS = 256
+
+
+@dataclass
+class AnalysisResult:
+    """A diagnostic report and which of its VMs the AI actually analyzed"""
+    text: str
+    # (VM names, report section) for every request that succeeded; VMs left
+    # out of the prompt or covered by a failed or degraded request are absent
+    analyzed: List[Tuple[List[str], str]] = field(default_factory=list)
+    failed: bool = False
 
 
 class DiagnosticAgent:
@@ -23,143 +93,536 @@ class DiagnosticAgent:
     """
     
     def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-        
-        self.client = OpenAI(api_key=api_key)
+        # Shared, pooled client - raises ValueError if OPENAI_API_KEY is missing
+        self.client = get_openai_client()
         self.model = "gpt-4o-mini"  # Using cost-effective model
+        self.max_tokens = 1500
+        self.context_window = get_context_window(self.model)
+        self.rate_limiter = get_rate_limiter()
+        # Slow calls get a duplicate at the hedge delay; past the hard deadline
+        # analyze() falls back to a rules-based report
+        self.hedger = Hedger(purpose="diagnostic")
+        # While OpenAI's breaker is open, analyze() skips straight to the rules-based report
+        self.breaker = get_breaker("openai")
+        # Model, max_tokens and temperature per request; the values above are the standard tier
+        self.router = ModelRouter("diagnostic", self.model, self.max_tokens, temperature=0.7)
+        self.enable_clustering = os.getenv("ENABLE_CLUSTERING", "true").lower() in ("1", "true", "yes")
+        # Fleets with more clusters than this are analyzed as concurrent chunks (0 = never)
+        self.chunk_size = int(os.getenv("ANALYSIS_CHUNK_SIZE", "0"))
+        # One agent serves concurrent requests (API threads, coordinator jobs), so
+        # per-call state - clusters and prompt budget - is returned, never kept on self
         
         log.info("diagnostic_agent.initialized", model=self.model)
     
-    def analyze(self, azure_data: Dict[str, Any]) -> str:
+    def analyze(self, azure_data: Dict[str, Any], deadline: Optional[Deadline] = None) -> str:
         """
         Analyze Azure resource data and provide diagnostic insights
         
         Args:
             azure_data: Dictionary containing Azure resource information
+            deadline: Time budget for this analysis; bounds the LLM call and its
+                output budget, and yields the degraded report once it passes
             
         Returns:
             AI-generated diagnostic analysis as string
         """
+        return self.analyze_result(azure_data, deadline=deadline).text
+    
+    def analyze_result(self, azure_data: Dict[str, Any], deadline: Optional[Deadline] = None) -> AnalysisResult:
+        """
+        analyze(), also reporting which VMs a successful AI request covered
+        
+        Failed and degraded analyses are flagged on the result, so callers that
+        cache findings do not have to recognize them from the report text.
+        """
         log.info("diagnostic_agent.analysis_start", 
                  resource_count=azure_data.get("count", 0),
                  simulation=azure_data.get("simulation", False))
         
-        # Prepare data for AI analysis
-        data_summary = self._prepare_data_summary(azure_data)
+        if self.chunk_size and not azure_data.get("error"):
+            clusters = self._group(azure_data.get("value", []))
+            if len(clusters) > self.chunk_size:
+                return run_async(self._analyze_chunks(azure_data, clusters=clusters, deadline=deadline))
         
-        # Create analysis prompt
-        prompt = f"""
-You are an expert Azure Cloud Architect and Site Reliability Engineer.
-Analyze the following Azure infrastructure data and provide a comprehensive diagnostic report.
-
-Azure Resource Data:
-{data_summary}
-
-Please provide:
-1. Health Assessment: Overall health status of the infrastructure
-2. Configuration Issues: Any misconfigurations or suboptimal settings
-3. Performance Concerns: Potential performance bottlenecks
-4. Security Risks: Security vulnerabilities or compliance issues
-5. Cost Optimization: Opportunities to reduce costs
-6. Recommendations: Top 3-5 actionable recommendations
-
-Format your response in a clear, structured manner suitable for technical and non-technical stakeholders.
-"""
+        if deadline is not None and deadline.expired:
+            return AnalysisResult(self.degraded_report(azure_data, f"{deadline.name} deadline exceeded"),
+                                  failed=True)
         
+        # Fit the fleet into the context window before paying for a round trip
+        budget = self._latency_budget(deadline)
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert Azure cloud architect specializing in infrastructure diagnostics, performance optimization, and security."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=1500
+            messages, _, budget_result = self._build_messages(azure_data)
+            input_tokens = count_message_tokens(messages, self.model)
+            route = self.router.route(input_tokens, self._issue_count(azure_data.get("value", [])),
+                                      latency_budget=budget)
+            if route.max_tokens > self.max_tokens:
+                # The large tier reserves more output than the prompt was fitted for - refit it
+                messages, _, budget_result = self._build_messages(azure_data, max_tokens=route.max_tokens)
+                input_tokens = count_message_tokens(messages, self.model)
+        except PromptBudgetExceeded as e:
+            log.error("diagnostic_agent.prompt_too_large", error=str(e), model=self.model)
+            return AnalysisResult(f"⚠️ Analysis failed: {str(e)}", failed=True)
+        
+        timeout = {"timeout": budget} if budget else {}
+        
+        def complete():
+            return self.breaker.call(
+                lambda: self.client.chat.completions.create(
+                    model=route.model,
+                    messages=messages,
+                    temperature=route.temperature,
+                    max_tokens=route.max_tokens,
+                    **timeout
+                ),
+                prepare=lambda: self.rate_limiter.acquire(input_tokens + route.max_tokens)
             )
+        
+        started = time.monotonic()
+        try:
+            response = self.hedger.call(complete, hard_deadline=budget)
             
             result = response.choices[0].message.content or ""
             
             # Safe token usage extraction
             tokens_used = getattr(response.usage, "total_tokens", 0) if response.usage else 0
+            cached_tokens = record_llm_usage("diagnostic", response.usage)
+            self.router.observe(route, time.monotonic() - started, tokens_used)
             
             log.info("diagnostic_agent.analysis_complete",
                      tokens_used=tokens_used,
-                     model=self.model)
+                     cached_tokens=cached_tokens,
+                     model=route.model)
             
-            return result
+            text = self._annotate(result, budget_result)
+            return AnalysisResult(text, analyzed=[(self._analyzed_vms(budget_result), text)])
             
+        except (LLMDeadlineExceeded, CircuitOpenError) as e:
+            self.router.observe(route, time.monotonic() - started, ok=False)
+            log.error("diagnostic_agent.degraded", error=str(e))
+            return AnalysisResult(self.degraded_report(azure_data, str(e)), failed=True)
         except Exception as e:
+            self.router.observe(route, time.monotonic() - started, ok=False)
             log.error("diagnostic_agent.analysis_failed", error=str(e))
-            return f"⚠️ Analysis failed: {str(e)}"
+            return AnalysisResult(f"⚠️ Analysis failed: {str(e)}", failed=True)
     
-    def _prepare_data_summary(self, azure_data: Dict[str, Any]) -> str:
-        """Prepare a formatted summary of Azure data for AI analysis"""
+    def _latency_budget(self, deadline: Optional[Deadline]) -> Optional[float]:
+        """Seconds one analysis call may take: the hedging hard deadline, cut to the run deadline"""
+        limits = [self.hedger.hard_deadline or None, deadline.remaining() if deadline else None]
+        limits = [limit for limit in limits if limit is not None]
+        return min(limits) if limits else None
+    
+    @staticmethod
+    def degraded_report(azure_data: Dict[str, Any], reason: str) -> str:
+        """
+        Rules-based report (quick_health_check + NSG triage) flagged as degraded
+        """
+        return degraded_report(azure_data, reason)
+    
+    def analyze_structured(self, azure_data: Dict[str, Any]) -> List[Finding]:
+        """
+        Analyze Azure resource data and return typed findings
         
-        if azure_data.get("error"):
-            return f"Error fetching data: {azure_data.get('message', 'Unknown error')}"
+        Findings about a cluster representative are copied to every member.
         
-        summary_parts = []
+        Args:
+            azure_data: Dictionary containing Azure resource information
+            
+        Returns:
+            Validated findings, one per issue per VM
+            
+        Raises:
+            PromptBudgetExceeded: If even the fixed prompt text cannot fit
+            SchemaError: If the model output does not match FINDINGS_SCHEMA
+            CircuitOpenError: If OpenAI's circuit breaker is open
+        """
+        messages, clusters, _ = self._build_messages(azure_data, prompt=STRUCTURED_ANALYSIS_PROMPT)
+        response = self.breaker.call(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.2,
+                max_tokens=self.max_tokens,
+                response_format=response_format("diagnostic_findings", FINDINGS_SCHEMA)
+            ),
+            prepare=lambda: self.rate_limiter.acquire(count_message_tokens(messages, self.model) + self.max_tokens)
+        )
         
-        # Add simulation mode indicator
-        if azure_data.get("simulation"):
-            summary_parts.append("⚠️ Running in SIMULATION MODE (using mock data)\n")
+        try:
+            findings = parse_findings(response.choices[0].message.content or "")
+        except SchemaError as e:
+            log.error("diagnostic_agent.invalid_structured_output", error=str(e))
+            raise
+        
+        expanded = fan_out_findings([f.as_dict() for f in findings], clusters)
+        log.info("diagnostic_agent.structured_analysis_complete",
+                 findings=len(findings), expanded=len(expanded),
+                 tokens_used=getattr(response.usage, "total_tokens", 0) if response.usage else 0,
+                 cached_tokens=record_llm_usage("diagnostic", response.usage))
+        return [Finding.from_dict(f) for f in expanded]
+    
+    async def analyze_chunked_async(
+        self,
+        azure_data: Dict[str, Any],
+        executor: Optional[AsyncLLMExecutor] = None,
+        clusters: Optional[List[VMCluster]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> str:
+        """
+        Analyze a large fleet as concurrent per-chunk requests
+        
+        Args:
+            azure_data: Dictionary containing Azure resource information
+            executor: Rate-limited executor to run the chunks on (created if omitted)
+            clusters: Pre-computed configuration clusters for azure_data
+            deadline: Chunks still running when it passes are reported as failed
+            
+        Returns:
+            Combined diagnostic report, one section per chunk
+        """
+        result = await self._analyze_chunks(azure_data, executor=executor, clusters=clusters, deadline=deadline)
+        return result.text
+    
+    async def _analyze_chunks(
+        self,
+        azure_data: Dict[str, Any],
+        executor: Optional[AsyncLLMExecutor] = None,
+        clusters: Optional[List[VMCluster]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> AnalysisResult:
+        try:
+            plans = self.plan_chunks(azure_data, clusters=clusters)
+        except PromptBudgetExceeded as e:
+            log.error("diagnostic_agent.prompt_too_large", error=str(e), model=self.model)
+            return AnalysisResult(f"⚠️ Analysis failed: {str(e)}", failed=True)
+        
+        executor = executor or AsyncLLMExecutor()
+        requests = [self.chunk_request(idx, messages) for idx, (_, messages, _) in enumerate(plans)]
+        log.info("diagnostic_agent.chunked_analysis_start", chunks=len(requests),
+                 clusters=sum(len(chunk) for chunk, _, _ in plans))
+        results = await executor.run_all(requests, timeout=deadline.remaining() if deadline else None)
+        
+        sections, analyzed = [], []
+        for idx, (result, (_, _, budget)) in enumerate(zip(results, plans), 1):
+            section = self.render_chunk(idx, len(plans), result, budget)
+            sections.append(section)
+            if result.ok:
+                analyzed.append((self._analyzed_vms(budget), section))
+        
+        log.info("diagnostic_agent.chunked_analysis_complete",
+                 tokens_used=sum(r.tokens_used for r in results), **executor.stats.as_dict())
+        return AnalysisResult("\n\n".join(sections), analyzed=analyzed, failed=len(analyzed) < len(plans))
+    
+    def plan_chunks(
+        self,
+        azure_data: Dict[str, Any],
+        clusters: Optional[List[VMCluster]] = None,
+        chunk_size: Optional[int] = None
+    ) -> List[Tuple[List[VMCluster], List[Dict[str, str]], BudgetResult]]:
+        """
+        Split the fleet's clusters into chunks and build each chunk's messages
+        
+        Returns:
+            (clusters, messages, budget) per chunk, in fleet order
+            
+        Raises:
+            PromptBudgetExceeded: If even the fixed prompt text cannot fit
+        """
+        if clusters is None:
+            clusters = self._group(azure_data.get("value", []))
+        size = chunk_size or self.chunk_size or len(clusters) or 1
+        plans = []
+        for idx in range(0, len(clusters), size):
+            chunk = clusters[idx:idx + size]
+            payload = dict(azure_data, value=[], count=sum(c.size for c in chunk))
+            messages, budget = self._plan(payload, chunk)
+            plans.append((chunk, messages, budget))
+        return plans
+    
+    def chunk_request(self, idx: int, messages: List[Dict[str, str]]) -> LLMRequest:
+        """Executor request for one planned chunk"""
+        return LLMRequest(messages=messages, model=self.model, max_tokens=self.max_tokens,
+                          temperature=0.7, key=idx, purpose="diagnostic")
+    
+    def render_chunk(self, idx: int, total: int, result: LLMResult, budget: BudgetResult) -> str:
+        """Report section for one chunk (idx is 1-based)"""
+        vm_count = sum(c.size for c in budget.kept) + sum(c.size for c in budget.dropped)
+        header = f"### Chunk {idx}/{total} ({vm_count} VMs)"
+        if result.ok:
+            return f"{header}\n{self._annotate(result.content, budget)}"
+        return f"{header}\n⚠️ Analysis failed: {result.error}"
+    
+    def build_batch_requests(
+        self,
+        azure_data: Dict[str, Any],
+        chunk_size: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Build per-chunk requests for an offline BatchJob
+        
+        Returns:
+            Entries with 'custom_id', chat completion 'body' and 'meta' listing
+            the VMs each request covers
+        """
+        requests = []
+        for idx, (chunk, messages, budget) in enumerate(
+                self.plan_chunks(azure_data, chunk_size=chunk_size or self.chunk_size or 25)):
+            requests.append({
+                "custom_id": f"diagnostic-{idx:05d}",
+                "body": {"model": self.model, "messages": messages,
+                         "temperature": 0.7, "max_tokens": self.max_tokens},
+                "meta": {"vms": [name for c in chunk for name in c.members],
+                         "notes": self._annotate("", budget).strip()}
+            })
+        return requests
+    
+    @staticmethod
+    def map_batch_results(results: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        """Map BatchJob results back to a report per VM (failed and missing results are flagged)"""
+        reports = {}
+        for result in results.values():
+            if result["error"]:
+                report = f"⚠️ Analysis failed: {result['error']}"
+            else:
+                notes = result["meta"].get("notes")
+                report = result["content"] + (f"\n\n{notes}" if notes else "")
+            for vm_name in result["meta"].get("vms", []):
+                reports[vm_name] = report
+        return reports
+    
+    def analyze_incremental(
+        self,
+        azure_data: Dict[str, Any],
+        store: FindingStore,
+        deadline: Optional[Deadline] = None,
+        prune: bool = True
+    ) -> str:
+        """
+        Analyze only VMs whose configuration changed or whose finding expired,
+        and merge the new analysis with cached findings for the rest
+        
+        Args:
+            azure_data: Dictionary containing Azure resource information
+            store: FindingStore holding fingerprints and findings from earlier runs
+            deadline: Time budget for analyzing the changed VMs
+            prune: Drop stored findings for VMs not in azure_data; pass False when
+                azure_data is only part of the fleet
+            
+        Returns:
+            Diagnostic report covering every VM in azure_data
+        """
+        if azure_data.get("error"):
+            return self.analyze(azure_data, deadline=deadline)
         
-        # Summarize VMs
         vms = azure_data.get("value", [])
-        summary_parts.append(f"Total VMs: {len(vms)}")
+        stale, cached = store.partition(vms)
+        log.info("diagnostic_agent.incremental_plan", changed=len(stale), cached=len(cached))
+        
+        sections = []
+        if stale:
+            payload = dict(azure_data, value=stale, count=len(stale))
+            result = self.analyze_result(payload, deadline=deadline)
+            # Only VMs a successful request covered are cached; the rest stay
+            # stale and are analyzed again next time
+            by_name = {vm.get("name", "Unknown"): vm for vm in stale}
+            for names, section in result.analyzed:
+                store.record([by_name[name] for name in names if name in by_name], section)
+            sections.append(f"🆕 Analysis of {len(stale)} new or changed VMs:\n{result.text}")
         
-        for idx, vm in enumerate(vms, 1):
-            vm_info = f"""
+        for cached_report, names in store.cached_reports(cached):
+            analyzed_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(cached_report["analyzed_at"]))
+            sections.append(
+                f"♻️ Cached findings from {analyzed_at} ({len(names)} unchanged VMs: "
+                f"{', '.join(names[:20])}{', ...' if len(names) > 20 else ''}):\n{cached_report['text']}"
+            )
+        
+        if prune:
+            store.prune([vm.get("name", "Unknown") for vm in vms])
+        store.save()
+        return "\n\n".join(sections) if sections else "No VMs to analyze."
+    
+    def _build_messages(
+        self,
+        azure_data: Dict[str, Any],
+        prompt: str = ANALYSIS_PROMPT,
+        max_tokens: Optional[int] = None
+    ) -> Tuple[List[Dict[str, str]], List[VMCluster], BudgetResult]:
+        """
+        Build chat messages for analysis
+        
+        Args:
+            azure_data: Fleet data to describe
+            prompt: Prompt template the fleet summary is formatted into
+            max_tokens: Output reservation to budget against (defaults to self.max_tokens)
+        
+        Returns:
+            (messages, clusters, budget); the caller annotates the report and
+            fans out findings with the clusters and budget of its own call
+        
+        Raises:
+            PromptBudgetExceeded: If even the fixed prompt text cannot fit
+        """
+        clusters = self._group(azure_data.get("value", []))
+        messages, budget = self._plan(azure_data, clusters, prompt, max_tokens=max_tokens)
+        return messages, clusters, budget
+    
+    def _plan(
+        self,
+        azure_data: Dict[str, Any],
+        clusters: List[VMCluster],
+        prompt: str = ANALYSIS_PROMPT,
+        max_tokens: Optional[int] = None
+    ) -> Tuple[List[Dict[str, str]], BudgetResult]:
+        """
+        Build chat messages with one entry per configuration cluster, dropping
+        healthy clusters first if the prompt would not fit the context window
+        alongside max_tokens
+        """
+        budgeter = TokenBudgeter(self.model, max_tokens or self.max_tokens, self.context_window,
+                                 safety_margin=64 + OMISSION_NOTE_TOKENS)
+        base_messages = self._messages_for(self._prepare_data_summary(azure_data, clusters=[]), prompt)
+        
+        budget = budgeter.fit(
+            clusters,
+            render=lambda cluster: self._describe_cluster(len(clusters), cluster),
+            base_tokens=count_message_tokens(base_messages, self.model),
+            priority=lambda cluster: self._vm_priority(cluster.representative)
+        )
+        
+        if budget.truncated:
+            dropped_vms = [name for cluster in budget.dropped for name in cluster.members]
+            log.warning("diagnostic_agent.prompt_truncated",
+                        kept=len(budget.kept),
+                        dropped=len(dropped_vms),
+                        dropped_vms=dropped_vms,
+                        budget_tokens=budget.budget_tokens)
+        
+        summary = self._prepare_data_summary(azure_data, clusters=budget.kept, omitted=budget.dropped)
+        return self._messages_for(summary, prompt), budget
+    
+    @staticmethod
+    def _analyzed_vms(budget: Optional[BudgetResult]) -> List[str]:
+        """VMs whose data made it into the prompt (all members of the kept clusters)"""
+        return [name for cluster in budget.kept for name in cluster.members] if budget else []
+    
+    def _annotate(self, result: str, budget: Optional[BudgetResult]) -> str:
+        """Append cluster membership and omitted-VM notes to an AI report"""
+        if budget is None:
+            return result
+        membership = render_membership(budget.kept)
+        if membership:
+            result += "\n\n" + membership
+        if budget.truncated:
+            result += "\n\n" + self._omission_note(budget.dropped)
+        return result
+    
+    def _messages_for(self, data_summary: str, prompt: str = ANALYSIS_PROMPT) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt.format(data_summary=data_summary)}
+        ]
+    
+    def _group(self, vms: List[Dict[str, Any]]) -> List[VMCluster]:
+        """
+        Cluster VMs by configuration, or one cluster per VM when disabled
+        
+        VMs are ordered by name first, so the prompt (and chunk boundaries) do
+        not change when the API returns the fleet in a different order.
+        """
+        vms = sorted(vms, key=lambda vm: str(vm.get("name", "")))
+        if self.enable_clustering:
+            clusters = cluster_vms(vms)
+            if len(clusters) < len(vms):
+                log.info("diagnostic_agent.vms_clustered", vms=len(vms), clusters=len(clusters))
+            return clusters
+        return [VMCluster(config_fingerprint(vm), vm, [vm.get("name", "Unknown")]) for vm in vms]
+    
+    @staticmethod
+    def _issue_count(vms: List[Dict[str, Any]]) -> int:
+        """
+        VMs triage would not call healthy (used for model routing)
+        
+        Ambiguous VMs count too - a running VM with no NSG data still needs a
+        full analysis, so only a truly all-healthy payload routes to the small tier.
+        """
+        return sum(1 for vm in vms if classify_vm(vm)["status"] != HEALTHY)
+    
+    @staticmethod
+    def _vm_priority(vm: Dict[str, Any]) -> int:
+        """Score a VM for prompt inclusion - VMs with issues outrank healthy ones"""
+        score = 0
+        if vm.get("properties", {}).get("powerState", "unknown") != "running":
+            score += 4
+        if nsg_issues(vm.get("nsg")):
+            score += 3
+        if str(vm.get("tags", {}).get("environment", "")).lower() in ("production", "prod"):
+            score += 2
+        return score
+    
+    @staticmethod
+    def _omission_note(dropped: List[VMCluster], limit: int = 20) -> str:
+        names = [name for cluster in dropped for name in cluster.members]
+        shown = ", ".join(names[:limit])
+        if len(names) > limit:
+            shown += f", ... (+{len(names) - limit} more)"
+        return f"ℹ️ {len(names)} lower-priority VMs omitted to fit the context window: {shown}"
+    
+    @staticmethod
+    def _describe_vm(idx: int, vm: Dict[str, Any]) -> str:
+        return f"""
 VM {idx}: {vm.get('name', 'Unknown')}
 - Location: {vm.get('location', 'N/A')}
 - Size: {vm.get('properties', {}).get('hardwareProfile', {}).get('vmSize', 'N/A')}
 - State: {vm.get('properties', {}).get('powerState', 'N/A')}
 - Tags: {json.dumps(vm.get('tags', {}), indent=2)}
 """
-            summary_parts.append(vm_info)
-        
-        return "\n".join(summary_parts)
     
-    def quick_health_check(self, azure_data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Perform a quick health check without AI (for testing/metrics)
-        """
-        vms = azure_data.get("value", [])
+    def _describe_cluster(self, idx: int, cluster: VMCluster, limit: int = 10) -> str:
+        description = self._describe_vm(idx, cluster.representative)
+        if cluster.size > 1:
+            others = [name for name in cluster.members if name != cluster.representative.get("name")]
+            shown = ", ".join(others[:limit])
+            if len(others) > limit:
+                shown += f", ... (+{len(others) - limit} more)"
+            description += f"- Identical configuration shared by {cluster.size} VMs (also: {shown})\n"
+        return description
+    
+    def _prepare_data_summary(
+        self,
+        azure_data: Dict[str, Any],
+        clusters: Optional[List[VMCluster]] = None,
+        omitted: Optional[List[VMCluster]] = None
+    ) -> str:
+        """Prepare a formatted summary of Azure data for AI analysis"""
         
-        health = {
-            "total_vms": len(vms),
-            "running_vms": 0,
-            "stopped_vms": 0,
-            "locations": set(),
-            "issues": []
-        }
-        
-        for vm in vms:
-            power_state = vm.get("properties", {}).get("powerState", "unknown")
-            if power_state == "running":
-                health["running_vms"] += 1
-            else:
-                health["stopped_vms"] += 1
-            
-            location = vm.get("location")
-            if location:
-                health["locations"].add(location)
+        if azure_data.get("error"):
+            return f"Error fetching data: {azure_data.get('message', 'Unknown error')}"
+        
+        summary_parts = []
+        
+        # Add simulation mode indicator
+        if azure_data.get("simulation"):
+            summary_parts.append("⚠️ Running in SIMULATION MODE (using mock data)\n")
         
-        health["locations"] = list(health["locations"])
+        # Summarize VMs, one entry per distinct configuration
+        all_vms = azure_data.get("value", [])
+        if clusters is None:
+            clusters = self._group(all_vms)
+        total_vms = len(all_vms) if all_vms else azure_data.get("count", 0)
+        summary_parts.append(f"Total VMs: {total_vms}")
+        if self.enable_clustering and clusters and len(clusters) < total_vms:
+            summary_parts.append(f"Distinct configurations described below: {len(clusters)}")
         
-        # Simple heuristics
-        if health["stopped_vms"] > 0:
-            health["issues"].append(f"{health['stopped_vms']} VMs are not running")
+        for idx, cluster in enumerate(clusters, 1):
+            summary_parts.append(self._describe_cluster(idx, cluster))
         
-        if len(health["locations"]) > 3:
-            health["issues"].append(f"Resources spread across {len(health['locations'])} regions - consider consolidation")
+        if omitted:
+            summary_parts.append(self._omission_note(omitted))
         
-        return health
+        return "\n".join(summary_parts)
+    
+    @staticmethod
+    def quick_health_check(azure_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Perform a quick health check without AI (for testing/metrics)
+        """
+        return quick_health_check(azure_data)
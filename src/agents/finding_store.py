@@ -0,0 +1,130 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Finding Store - Per-VM configuration fingerprints and last findings for incremental diagnosis
+
+Each VM maps to the fingerprint it had when last analyzed and the report that
+analysis produced. A VM is re-analyzed only when its fingerprint changes or its
+finding expires, so steady-state cost scales with churn instead of fleet size.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.agents.clustering import config_fingerprint
+from src.utils.files import write_json_atomic
+from src.utils.logger import log
+
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+class FindingStore:
+    """
+    JSON-file backed store of VM fingerprints and cached findings
+
+    Reports are stored once and referenced by every VM they cover, so a batch
+    analysis of many VMs is not duplicated per VM.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # Serializes file writes without blocking lookups on disk I/O
+        self._save_lock = threading.Lock()
+        self._vms: Dict[str, Dict[str, Any]] = {}
+        self._reports: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._vms = data.get("vms", {})
+            self._reports = data.get("reports", {})
+            log.info("finding_store.loaded", path=self.path, vms=len(self._vms))
+        except (OSError, ValueError) as e:
+            log.warning("finding_store.load_failed", path=self.path, error=str(e))
+
+    def save(self):
+        """Persist the store atomically (safe to call from concurrent API requests)"""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                data = {"vms": {name: dict(entry) for name, entry in self._vms.items()},
+                        "reports": {rid: dict(report) for rid, report in self._reports.items()}}
+            write_json_atomic(self.path, data)
+
+    def partition(
+        self,
+        vms: List[Dict[str, Any]],
+        now: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Split VMs into those needing analysis and those with a valid cached finding
+
+        Returns:
+            (stale VMs to analyze, names of VMs served from cache)
+        """
+        now = now if now is not None else time.time()
+        stale, cached = [], []
+        with self._lock:
+            for vm in vms:
+                name = vm.get("name", "Unknown")
+                entry = self._vms.get(name)
+                if (entry is None
+                        or entry["fingerprint"] != config_fingerprint(vm)
+                        or entry["report_id"] not in self._reports
+                        or now - entry["analyzed_at"] > self.ttl_seconds):
+                    stale.append(vm)
+                else:
+                    cached.append(name)
+        return stale, cached
+
+    def record(self, vms: List[Dict[str, Any]], report: str, now: Optional[float] = None):
+        """Store one report as the current finding for every VM it covered"""
+        now = now if now is not None else time.time()
+        report_id = uuid.uuid4().hex
+        with self._lock:
+            self._reports[report_id] = {"text": report, "analyzed_at": now}
+            for vm in vms:
+                self._vms[vm.get("name", "Unknown")] = {
+                    "fingerprint": config_fingerprint(vm),
+                    "report_id": report_id,
+                    "analyzed_at": now
+                }
+            self._drop_orphan_reports()
+
+    def cached_reports(self, names: List[str]) -> List[Tuple[Dict[str, Any], List[str]]]:
+        """Group cached VMs by the report that covers them, oldest report first"""
+        grouped: Dict[str, List[str]] = {}
+        with self._lock:
+            for name in names:
+                entry = self._vms.get(name)
+                if entry and entry["report_id"] in self._reports:
+                    grouped.setdefault(entry["report_id"], []).append(name)
+            result = [(self._reports[rid], members) for rid, members in grouped.items()]
+        return sorted(result, key=lambda item: item[0]["analyzed_at"])
+
+    def prune(self, current_names: List[str]):
+        """Forget VMs that no longer exist in the fleet"""
+        keep = set(current_names)
+        with self._lock:
+            for name in [n for n in self._vms if n not in keep]:
+                del self._vms[name]
+            self._drop_orphan_reports()
+
+    def _drop_orphan_reports(self):
+        referenced = {entry["report_id"] for entry in self._vms.values()}
+        for report_id in [rid for rid in self._reports if rid not in referenced]:
+            del self._reports[report_id]
@@ -0,0 +1,167 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Fix Signatures - Parameterized fix shapes and a cache of generated script templates
+
+Remediations fall into a few dozen recurring shapes ("open port 3389 on NSG X",
+"start VM Y"). A fix description is normalized into a signature by replacing
+per-resource values with placeholders (<vm>, <nsg>, <rg>, <port>, <source>).
+The LLM writes one script template per signature; per-resource values are
+filled in locally, so repeat fixes never leave the process.
+"""
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.utils.files import write_json_atomic
+from src.utils.logger import log
+
+# (placeholder, pattern) in extraction order; group 1 is the value when present.
+# NSGs go before VMs so that "vm-web-01-nsg" is not read as a VM name.
+PARAMETER_PATTERNS = [
+    ("source", re.compile(r"\b(\d{1,3}(?:\.\d{1,3}){3}(?:/\d{1,2})?)\b")),
+    ("nsg", re.compile(r"\b([\w.-]+-nsg)\b", re.IGNORECASE)),
+    ("nsg", re.compile(r"\bnsg\s+['\"]?([\w.-]+)", re.IGNORECASE)),
+    ("rg", re.compile(r"\bresource[- ]group\s+['\"]?([\w.-]+)", re.IGNORECASE)),
+    ("rg", re.compile(r"\b(rg-[\w.-]+)\b", re.IGNORECASE)),
+    ("port", re.compile(r"\bport\s+(\d{1,5})\b", re.IGNORECASE)),
+    ("vm", re.compile(r"\bvm\s+['\"]?([\w.-]+)", re.IGNORECASE)),
+    ("vm", re.compile(r"\b(vm-[\w.-]+)\b", re.IGNORECASE)),
+]
+
+_WHITESPACE = re.compile(r"\s+")
+# Keyword patterns ("VM <name>") must not capture ordinary words ("VM is stopped")
+_NAME_LIKE = re.compile(r"[\d_.-]")
+
+
+def _occurrences(value: str) -> "re.Pattern[str]":
+    """Whole-name matches of value: 'vm-1' must not match inside 'vm-10' or 'vm-1-nsg'"""
+    return re.compile(r"(?<![\w.-])" + re.escape(value) + r"(?![\w-]|\.\w)")
+
+
+def fix_signature(fix_description: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Normalize a fix description into a signature and its parameters
+
+    Returns:
+        (signature, params), e.g. for "Open port 3389 on NSG web-nsg":
+        ("open port <port> on nsg <nsg>", {"port": "3389", "nsg": "web-nsg"})
+    """
+    text = _WHITESPACE.sub(" ", fix_description.strip())
+    params: Dict[str, str] = {}
+    for name, pattern in PARAMETER_PATTERNS:
+        if name in params:
+            continue
+        match = next((m for m in pattern.finditer(text) if _NAME_LIKE.search(m.group(1))), None)
+        if not match:
+            continue
+        value = match.group(1).rstrip(".")
+        params[name] = value
+        start = match.start(1)
+        end = start + len(value)
+        text = text[:start] + f"<{name}>" + text[end:]
+        # The same value may appear again ("start vm-1 and verify vm-1")
+        text = _occurrences(value).sub(f"<{name}>", text)
+    return text.lower().rstrip("."), params
+
+
+def parameterize(text: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Replace every resource name in text with a numbered placeholder
+
+    Unlike fix_signature, which keeps one value per kind, each distinct value
+    gets its own placeholder in order of appearance, so texts about several
+    resources only share a signature when they differ in nothing but names.
+
+    Returns:
+        (signature, params), e.g. for "Start vm-a-01, then vm-a-02":
+        ("start <vm1>, then <vm2>", {"vm1": "vm-a-01", "vm2": "vm-a-02"})
+    """
+    text = _WHITESPACE.sub(" ", text.strip())
+    params: Dict[str, str] = {}
+    counts: Dict[str, int] = {}
+    for name, pattern in PARAMETER_PATTERNS:
+        while True:
+            match = next((m for m in pattern.finditer(text) if _NAME_LIKE.search(m.group(1))), None)
+            if not match:
+                break
+            value = match.group(1).rstrip(".")
+            counts[name] = counts.get(name, 0) + 1
+            placeholder = f"{name}{counts[name]}"
+            params[placeholder] = value
+            start = match.start(1)
+            text = text[:start] + f"<{placeholder}>" + text[start + len(value):]
+            text = _occurrences(value).sub(f"<{placeholder}>", text)
+    return text.lower().rstrip("."), params
+
+
+def templatize(text: str, params: Dict[str, str]) -> str:
+    """Inverse of fill_template: replace each parameter value in text with its placeholder"""
+    for name, value in sorted(params.items(), key=lambda item: len(item[1]), reverse=True):
+        text = _occurrences(value).sub(f"<{name}>", text)
+    return text
+
+
+def fill_template(template: str, params: Dict[str, str]) -> str:
+    """Substitute known parameters into a script template; unknown placeholders stay"""
+    for name, value in params.items():
+        template = template.replace(f"<{name}>", value)
+    return template
+
+
+class FixTemplateCache:
+    """
+    Thread-safe signature -> script template cache, optionally persisted as JSON
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        # Serializes file writes without blocking get/put on disk I/O
+        self._save_lock = threading.Lock()
+        self._templates: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._templates = json.load(f)
+                log.info("fix_template_cache.loaded", path=path, templates=len(self._templates))
+            except (OSError, ValueError) as e:
+                log.warning("fix_template_cache.load_failed", path=path, error=str(e))
+
+    def get(self, signature: str) -> Optional[str]:
+        with self._lock:
+            template = self._templates.get(signature)
+            if template is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return template
+
+    def put(self, signature: str, template: str):
+        with self._lock:
+            self._templates[signature] = template
+
+    def save(self):
+        """Persist the cache atomically (safe to call from concurrent script generation)"""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                data = dict(self._templates)
+            write_json_atomic(self.path, data, indent=2)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"templates": len(self._templates), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._templates)
@@ -0,0 +1,203 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Resolution Knowledge Base - Local BM25 retrieval over past findings and resolutions
+
+Each entry is one finding text and its reviewed resolution. Every resource
+name in the finding is replaced by a numbered placeholder (see
+fix_signatures.parameterize), and the resolution is stored as a template over
+the same placeholders. A stored resolution is reused only for a finding with
+exactly the same signature and structured keys (category, port) - the same
+incident on other resources - and is re-filled with the current resources.
+Anything less exact is only retrieved (BM25) as few-shot context for the LLM.
+
+The index is an in-memory inverted index; persistence is an append-only JSONL
+file, so adding an entry never rewrites the store.
+"""
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.agents.fix_signatures import fill_template, parameterize, templatize
+from src.agents.schema import CATEGORIES
+from src.utils.logger import log
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# In indexes of at least PRUNE_MIN_ENTRIES, terms in more than this share of
+# entries (report boilerplate) barely move BM25 scores but dominate scoring
+# time, so they are skipped
+MAX_DOC_FREQUENCY = 0.5
+PRUNE_MIN_ENTRIES = 100
+# Once this many entries have scored, remaining (more common) query terms only
+# update existing candidates instead of walking their whole posting lists
+MAX_CANDIDATES = 100
+
+_TOKEN = re.compile(r"<\w+>|[a-z]{2,}|\d{2,5}")
+_PORT = re.compile(r"\bport\s+(\d{1,5})\b", re.IGNORECASE)
+STOPWORDS = frozenset(
+    "the and for are was were has have had not but with this that from into onto its any all "
+    "can could should would will may might been being their there which when what who how "
+    "due per via our you your".split()
+)
+
+
+def derive_keys(text: str) -> List[str]:
+    """Structured keys found in free text (category names and port numbers)"""
+    lowered = text.lower()
+    keys = [f"category:{c}" for c in CATEGORIES if c in lowered]
+    keys += sorted({f"port:{p}" for p in _PORT.findall(text)})
+    return keys
+
+
+def _terms(signature: str) -> List[str]:
+    return [t for t in _TOKEN.findall(signature) if t not in STOPWORDS]
+
+
+@dataclass
+class KnowledgeMatch:
+    """A stored incident retrieved for a query"""
+    entry_id: int
+    score: float
+    confidence: float
+    finding: str
+    resolution: str
+    # Same signature and keys as the query: the resolution can be reused as-is
+    exact: bool = False
+
+    def adapted(self, text: str) -> str:
+        """The stored resolution with resources from the given finding text filled in"""
+        return fill_template(self.resolution, parameterize(text)[1])
+
+
+class KnowledgeBase:
+    """
+    Thread-safe BM25 index of resolved incidents
+
+    Only an exact match (same signature and keys) may be reused without the
+    LLM. For other matches, BM25 ranks and confidence reports the Jaccard
+    overlap between the query's and the entry's term sets.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: List[Dict[str, Any]] = []
+        self._term_sets: List[frozenset] = []
+        self._lengths: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._by_key: Dict[Tuple[str, Tuple[str, ...]], int] = {}
+        self._total_length = 0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+            log.info("knowledge_base.loaded", path=self.path, entries=len(self._entries))
+        except (OSError, ValueError) as e:
+            log.warning("knowledge_base.load_failed", path=self.path, error=str(e))
+
+    def _index(self, entry: Dict[str, Any]):
+        entry_id = len(self._entries)
+        signature = entry.get("signature")
+        terms = _terms(signature or parameterize(entry["finding"])[0]) + entry.get("keys", [])
+        self._entries.append(entry)
+        self._term_sets.append(frozenset(terms))
+        # Entries written before signatures were stored use another placeholder
+        # scheme in their templates, so they only serve as examples
+        if signature is not None:
+            self._by_key[(signature, tuple(entry.get("keys", [])))] = entry_id
+        self._lengths.append(len(terms))
+        self._total_length += len(terms)
+        for term, count in Counter(terms).items():
+            self._postings.setdefault(term, {})[entry_id] = count
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def add(self, finding: str, resolution: str, keys: Optional[List[str]] = None) -> int:
+        """
+        Index a reviewed resolution and append it to the store
+
+        The resolution is stored as a template: resource names the finding
+        mentions are replaced with their <placeholders>. Only add resolutions
+        that were reviewed or applied - exact matches are reused without the LLM.
+        """
+        signature, params = parameterize(finding)
+        entry = {"finding": finding, "signature": signature, "resolution": templatize(resolution, params),
+                 "keys": sorted(keys if keys is not None else derive_keys(finding)), "added_at": time.time()}
+        with self._lock:
+            self._index(entry)
+            entry_id = len(self._entries) - 1
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+        log.info("knowledge_base.added", entry_id=entry_id, keys=entry["keys"])
+        return entry_id
+
+    def _match(self, entry_id: int, score: float, confidence: float, exact: bool = False) -> KnowledgeMatch:
+        entry = self._entries[entry_id]
+        return KnowledgeMatch(entry_id, score, confidence, entry["finding"], entry["resolution"], exact)
+
+    def search(self, text: str, limit: int = 3, keys: Optional[List[str]] = None) -> List[KnowledgeMatch]:
+        """
+        Top matches for a finding, best first
+
+        A stored entry with exactly the query's signature and keys (the same
+        incident on other resources) is returned alone, flagged exact, without
+        scoring the index.
+        """
+        signature, _ = parameterize(text)
+        keys = sorted(keys if keys is not None else derive_keys(text))
+        query = Counter(_terms(signature) + keys)
+        query_set = frozenset(query)
+        with self._lock:
+            count = len(self._entries)
+            if not count:
+                return []
+            exact = self._by_key.get((signature, tuple(keys)))
+            if exact is not None:
+                return [self._match(exact, float("inf"), 1.0, exact=True)]
+            avg_length = self._total_length / count
+            # Rarest (highest idf) terms first, so candidates are chosen by the most telling terms
+            max_postings = MAX_DOC_FREQUENCY * count if count >= PRUNE_MIN_ENTRIES else count
+            posting_lists = sorted(
+                (p for p in map(self._postings.get, query) if p and len(p) <= max_postings),
+                key=len
+            )
+            scores: Dict[int, float] = {}
+            for postings in posting_lists:
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                if len(scores) >= MAX_CANDIDATES:
+                    pairs = [(entry_id, postings[entry_id]) for entry_id in scores.keys() & postings.keys()]
+                else:
+                    pairs = postings.items()
+                for entry_id, tf in pairs:
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[entry_id] / avg_length)
+                    scores[entry_id] = scores.get(entry_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+            best = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+            matches = []
+            for entry_id, score in best:
+                entry_terms = self._term_sets[entry_id]
+                confidence = len(query_set & entry_terms) / len(query_set | entry_terms)
+                matches.append(self._match(entry_id, score, confidence))
+        return matches
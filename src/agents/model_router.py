@@ -0,0 +1,135 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Model Router - Picks model, output budget and temperature per request
+
+Requests are routed to one of three tiers from the prompt size, the number of
+issues they cover and the caller's latency budget:
+- small:    nothing to diagnose (all-healthy input) - short, deterministic answer
+- standard: the agent's own model and max_tokens
+- large:    many issues or a very large prompt - larger model and output budget
+
+The latency budget caps max_tokens at what the model can generate in time. A
+large-tier request keeps the larger model with its output budget cut to the
+cap, and only drops to the standard tier when the cap is below even the
+standard tier's budget. Every decision is
+logged, and observe() logs it again with the measured latency so thresholds
+can be tuned from the logs.
+"""
+import os
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.utils.logger import log
+
+TIER_SMALL = "small"
+TIER_STANDARD = "standard"
+TIER_LARGE = "large"
+
+SMALL_MAX_TOKENS_FACTOR = 0.3
+LARGE_MAX_TOKENS_FACTOR = 2.0
+SMALL_TEMPERATURE = 0.2
+LARGE_TEMPERATURE = 0.3
+MIN_MAX_TOKENS = 200
+# Share of the latency budget that may be spent generating output
+LATENCY_HEADROOM = 0.8
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    """Model settings chosen for one request, with the inputs that chose them"""
+    purpose: str
+    tier: str
+    model: str
+    max_tokens: int
+    temperature: float
+    input_tokens: int
+    issue_count: int
+    latency_budget: Optional[float] = None
+
+
+class ModelRouter:
+    """
+    Routes one agent's requests across the small/standard/large tiers
+
+    The standard tier is the agent's configured model, max_tokens and
+    temperature. Thresholds default to ENABLE_MODEL_ROUTING, LLM_LARGE_MODEL,
+    ROUTER_LARGE_ISSUE_THRESHOLD, ROUTER_LARGE_INPUT_TOKENS and
+    LLM_OUTPUT_TOKENS_PER_SECOND.
+    """
+
+    def __init__(
+        self,
+        purpose: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        large_model: Optional[str] = None,
+        large_issue_threshold: Optional[int] = None,
+        large_input_tokens: Optional[int] = None,
+        output_tokens_per_second: Optional[float] = None,
+        enabled: Optional[bool] = None
+    ):
+        self.purpose = purpose
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.large_model = large_model or os.getenv("LLM_LARGE_MODEL", "gpt-4o")
+        self.large_issue_threshold = large_issue_threshold if large_issue_threshold is not None else \
+            int(os.getenv("ROUTER_LARGE_ISSUE_THRESHOLD", "10"))
+        self.large_input_tokens = large_input_tokens if large_input_tokens is not None else \
+            int(os.getenv("ROUTER_LARGE_INPUT_TOKENS", "20000"))
+        self.output_tokens_per_second = output_tokens_per_second if output_tokens_per_second is not None else \
+            float(os.getenv("LLM_OUTPUT_TOKENS_PER_SECOND", "60"))
+        self.enabled = enabled if enabled is not None else \
+            os.getenv("ENABLE_MODEL_ROUTING", "true").lower() in ("1", "true", "yes")
+
+    def _tier(self, input_tokens: int, issue_count: int) -> str:
+        if not self.enabled:
+            return TIER_STANDARD
+        if issue_count == 0:
+            return TIER_SMALL
+        if issue_count >= self.large_issue_threshold or input_tokens >= self.large_input_tokens:
+            return TIER_LARGE
+        return TIER_STANDARD
+
+    def route(self, input_tokens: int, issue_count: int, latency_budget: Optional[float] = None) -> RouteDecision:
+        """
+        Choose model settings for a request
+
+        Args:
+            input_tokens: Prompt size in tokens
+            issue_count: Issues (VMs or findings) the request covers
+            latency_budget: Seconds the caller can wait, if bounded
+        """
+        tier = self._tier(input_tokens, issue_count)
+        model, max_tokens, temperature = self.model, self.max_tokens, self.temperature
+        if tier == TIER_SMALL:
+            max_tokens = max(MIN_MAX_TOKENS, int(self.max_tokens * SMALL_MAX_TOKENS_FACTOR))
+            temperature = min(temperature, SMALL_TEMPERATURE)
+        elif tier == TIER_LARGE:
+            model = self.large_model
+            max_tokens = int(self.max_tokens * LARGE_MAX_TOKENS_FACTOR)
+            temperature = min(temperature, LARGE_TEMPERATURE)
+
+        if self.enabled and latency_budget:
+            cap = max(MIN_MAX_TOKENS, int(latency_budget * LATENCY_HEADROOM * self.output_tokens_per_second))
+            if tier == TIER_LARGE and cap < self.max_tokens:
+                # Not even a standard-size answer would arrive in time - stay on the faster standard model
+                tier, model, temperature = TIER_STANDARD, self.model, self.temperature
+                max_tokens = self.max_tokens
+            max_tokens = min(max_tokens, cap)
+
+        decision = RouteDecision(self.purpose, tier, model, max_tokens, temperature,
+                                 input_tokens, issue_count, latency_budget)
+        log.info("model_router.decision", **asdict(decision))
+        return decision
+
+    def observe(self, decision: RouteDecision, latency_seconds: float, tokens_used: int = 0, ok: bool = True):
+        """Log a decision together with how the request actually went"""
+        log.info("model_router.observed", latency_seconds=round(latency_seconds, 3),
+                 tokens_used=tokens_used, ok=ok, **asdict(decision))
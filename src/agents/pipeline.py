@@ -0,0 +1,133 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Diagnose/Resolve Pipeline - Overlaps diagnostic analysis with resolution generation
+
+Instead of waiting for the full diagnostic report before asking for fixes, each
+diagnostic chunk hands its findings to the ResolutionAgent as soon as it
+completes. Known issues from triage need no diagnosis, so their resolution
+starts immediately. End-to-end time becomes roughly the slowest
+chunk's diagnose + resolve instead of the sum of both phases.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.agents.async_executor import AsyncLLMExecutor
+from src.agents.diagnostic_agent import DiagnosticAgent
+from src.agents.resolution_agent import ResolutionAgent
+from src.agents.triage import TriageReport
+from src.utils.deadline import Deadline
+from src.utils.logger import log
+from src.utils.tokens import PromptBudgetExceeded
+
+
+@dataclass
+class PipelineStage:
+    """One unit of pipelined work: a diagnosis (or triage finding) and its fixes"""
+    title: str
+    diagnosis: str = ""
+    resolution: str = ""
+    diagnosed_at: float = 0.0
+    resolved_at: float = 0.0
+
+
+@dataclass
+class PipelineReport:
+    """Merged output of a pipelined run"""
+    stages: List[PipelineStage] = field(default_factory=list)
+    duration_seconds: float = 0.0
+
+    @property
+    def diagnostic_summary(self) -> str:
+        return "\n\n".join(f"{s.title}\n{s.diagnosis}" for s in self.stages if s.diagnosis)
+
+    @property
+    def resolution_steps(self) -> str:
+        return "\n\n".join(f"{s.title}\n{s.resolution}" for s in self.stages if s.resolution)
+
+
+async def diagnose_and_resolve(
+    azure_data: Dict[str, Any],
+    diagnostic_agent: DiagnosticAgent,
+    resolution_agent: ResolutionAgent,
+    triage: Optional[TriageReport] = None,
+    executor: Optional[AsyncLLMExecutor] = None,
+    deadline: Optional[Deadline] = None
+) -> PipelineReport:
+    """
+    Run diagnosis and resolution as a per-chunk pipeline on one executor
+
+    Args:
+        azure_data: VMs to analyze (the triage AI payload when triage is used)
+        diagnostic_agent: Agent that plans and renders diagnostic chunks
+        resolution_agent: Agent that turns each chunk's findings into fixes
+        triage: Rules-based triage whose known issues are resolved without diagnosis
+        executor: Rate-limited executor shared by both agents (created if omitted)
+        deadline: Stages unfinished when it passes are cancelled and reported as such
+
+    Returns:
+        PipelineReport with stages in fleet order (triage findings first)
+    """
+    executor = executor or AsyncLLMExecutor()
+    started = time.monotonic()
+    stages: List[PipelineStage] = []
+    tasks = []
+
+    async def resolve(stage: PipelineStage):
+        result = await executor.run(resolution_agent.fix_request(stage.diagnosis, key=stage.title))
+        stage.resolution = result.content if result.ok else f"⚠️ Resolution generation failed: {result.error}"
+        stage.resolved_at = time.monotonic() - started
+
+    async def diagnose_then_resolve(stage: PipelineStage, idx: int, total: int, messages, budget):
+        result = await executor.run(diagnostic_agent.chunk_request(idx, messages))
+        stage.diagnosis = diagnostic_agent.render_chunk(idx, total, result, budget).split("\n", 1)[1]
+        stage.diagnosed_at = time.monotonic() - started
+        if result.ok:
+            await resolve(stage)
+
+    if triage and triage.known_issues:
+        stage = PipelineStage(title="### Rules-based findings", diagnosis=triage.render())
+        stages.append(stage)
+        tasks.append(resolve(stage))
+
+    vms = azure_data.get("value", [])
+    if vms and not azure_data.get("error"):
+        try:
+            plans = diagnostic_agent.plan_chunks(azure_data)
+        except PromptBudgetExceeded as e:
+            log.error("pipeline.prompt_too_large", error=str(e))
+            stages.append(PipelineStage(title="### AI analysis", diagnosis=f"⚠️ Analysis failed: {str(e)}"))
+            plans = []
+        for idx, (chunk, messages, budget) in enumerate(plans, 1):
+            stage = PipelineStage(title=f"### Chunk {idx}/{len(plans)} ({sum(c.size for c in chunk)} VMs)")
+            stages.append(stage)
+            tasks.append(diagnose_then_resolve(stage, idx, len(plans), messages, budget))
+
+    log.info("pipeline.start", stages=len(stages), vms=len(vms))
+    futures = [asyncio.ensure_future(task) for task in tasks]
+    timeout = deadline.remaining() if deadline else None
+    done, pending = await asyncio.wait(futures, timeout=timeout) if futures else (set(), set())
+    if pending:
+        for future in pending:
+            future.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        log.warning("pipeline.deadline_exceeded", cancelled=len(pending), timeout_seconds=timeout)
+        for stage in stages:
+            if not stage.diagnosis:
+                stage.diagnosis = "⚠️ Analysis failed: deadline exceeded"
+            elif not stage.resolution and not stage.diagnosis.startswith("⚠️"):
+                stage.resolution = "⚠️ Resolution generation failed: deadline exceeded"
+    for future in done:
+        future.result()  # re-raise unexpected errors, as gather would
+
+    report = PipelineReport(stages=stages, duration_seconds=time.monotonic() - started)
+    log.info("pipeline.complete", stages=len(stages), duration_seconds=report.duration_seconds,
+             **executor.stats.as_dict())
+    return report
@@ -5,14 +5,70 @@ Agentic AI for Azure Supportability Test
 """
 Resolution Agent - Generates actionable fixes and remediation steps
 """
-from openai import OpenAI
+import json
 import os
-from typing import Dict, Any, List
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Iterator, List, Optional
 
 # Import logger
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.agents.async_executor import AsyncLLMExecutor, LLMRequest
+from src.agents.fix_signatures import FixTemplateCache, fill_template, fix_signature
+from src.agents.knowledge_base import KnowledgeBase, KnowledgeMatch
+from src.agents.model_router import ModelRouter
+from src.agents.prioritizer import PRIORITY_ORDER, prioritize, score_text
+from src.metrics import record_llm_usage
+from src.agents.schema import ACTIONS_SCHEMA, Action, Finding, SchemaError, parse_actions, response_format
+from src.services.circuit_breaker import CircuitOpenError, get_breaker
+from src.services.llm_client import get_openai_client
+from src.services.rate_limiter import get_rate_limiter
+from src.utils.deadline import Deadline
 from src.utils.logger import log
+from src.utils.tokens import count_message_tokens
+
+SYSTEM_PROMPT = "You are an expert DevOps engineer specializing in Azure infrastructure automation, remediation, and optimization."
+
+# Static instructions come before the variable diagnostic text (stable prompt-cache prefix)
+RESOLUTION_PROMPT = """
+You are an expert DevOps Engineer and Azure Solutions Architect.
+Based on the diagnostic analysis at the end of this message, provide detailed, actionable resolution steps.
+
+Please provide:
+1. Immediate Actions: Steps that can be taken right now to address critical issues
+2. Short-term Fixes (1-7 days): Tactical improvements
+3. Long-term Solutions (1-3 months): Strategic improvements
+4. Automation Opportunities: Tasks that can be automated
+5. Implementation Steps: Detailed step-by-step instructions for each fix
+
+For each recommendation, include:
+- Priority level (Critical/High/Medium/Low)
+- Estimated effort (hours/days)
+- Required tools or services
+- Expected impact
+- Potential risks
+
+Format your response clearly with numbered steps and bullet points.
+
+Diagnostic Analysis:
+{diagnostic_summary}
+"""
+
+STRUCTURED_RESOLUTION_PROMPT = """
+You are an expert DevOps Engineer and Azure Solutions Architect.
+Based on the diagnostic findings (JSON) at the end of this message, return JSON remediation actions.
+
+Return actions as {{"actions": [...]}}, ordered by priority. Each action has:
+- title: short imperative description of the fix
+- vm: the affected VM name
+- priority: one of Critical, High, Medium, Low
+- effort_hours: estimated effort in hours
+- commands: Azure CLI commands that carry out the fix, with <placeholders> for unknown values
+
+Diagnostic Findings:
+{findings}
+"""
 
 
 class ResolutionAgent:
@@ -22,112 +78,297 @@ class ResolutionAgent:
     """
     
     def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-        
-        self.client = OpenAI(api_key=api_key)
+        # Shared, pooled client - raises ValueError if OPENAI_API_KEY is missing
+        self.client = get_openai_client()
         self.model = "gpt-4o-mini"
+        self.max_tokens = 2000
+        self.rate_limiter = get_rate_limiter()
+        self.breaker = get_breaker("openai")
+        self.router = ModelRouter("resolution", self.model, self.max_tokens, temperature=0.7)
+        # Script templates per fix signature (persisted only when a path is configured)
+        self.script_cache = FixTemplateCache(os.getenv("FIX_TEMPLATE_CACHE_PATH") or None)
+        # Past incidents consulted before the LLM (persisted only when a path is configured)
+        self.knowledge_base: Optional[KnowledgeBase] = None
+        if os.getenv("ENABLE_KNOWLEDGE_BASE", "true").lower() in ("1", "true", "yes"):
+            self.knowledge_base = KnowledgeBase(os.getenv("KNOWLEDGE_BASE_PATH") or None)
         
         log.info("resolution_agent.initialized", model=self.model)
     
-    def suggest_fixes(self, diagnostic_summary: str) -> str:
+    def suggest_fixes(self, diagnostic_summary: str, deadline: Optional[Deadline] = None) -> str:
         """
         Generate resolution steps based on diagnostic findings
         
+        The knowledge base is consulted first: an exact match (the same
+        incident on other resources) returns its stored resolution adapted to
+        the current resources and labelled as reused, without an LLM call;
+        otherwise the closest matches are passed as examples. While
+        OpenAI's circuit breaker is open, or once the deadline has passed, the
+        closest match is returned flagged as degraded instead of waiting on the API.
+        
         Args:
             diagnostic_summary: The diagnostic analysis from DiagnosticAgent
+            deadline: Time budget; bounds the LLM call and its output budget
             
         Returns:
             AI-generated resolution steps and fixes
         """
         log.info("resolution_agent.generation_start")
         
-        prompt = f"""
-You are an expert DevOps Engineer and Azure Solutions Architect.
-Based on the following diagnostic analysis, provide detailed, actionable resolution steps.
-
-Diagnostic Analysis:
-{diagnostic_summary}
-
-Please provide:
-1. Immediate Actions: Steps that can be taken right now to address critical issues
-2. Short-term Fixes (1-7 days): Tactical improvements
-3. Long-term Solutions (1-3 months): Strategic improvements
-4. Automation Opportunities: Tasks that can be automated
-5. Implementation Steps: Detailed step-by-step instructions for each fix
-
-For each recommendation, include:
-- Priority level (Critical/High/Medium/Low)
-- Estimated effort (hours/days)
-- Required tools or services
-- Expected impact
-- Potential risks
-
-Format your response clearly with numbered steps and bullet points.
-"""
+        examples: List[KnowledgeMatch] = []
+        if self.knowledge_base is not None:
+            examples = self.knowledge_base.search(diagnostic_summary)
+            if examples and examples[0].exact:
+                log.info("resolution_agent.knowledge_base_hit", entry_id=examples[0].entry_id)
+                return (f"📚 KNOWLEDGE BASE RESOLUTION - reused from past incident #{examples[0].entry_id} "
+                        "with current resource names filled in; review before applying.\n\n"
+                        + examples[0].adapted(diagnostic_summary))
+        
+        if deadline is not None and deadline.expired:
+            return self._fallback_resolution(diagnostic_summary, examples, f"{deadline.name} deadline exceeded")
         
+        messages = self._build_messages(diagnostic_summary, examples)
+        input_tokens = count_message_tokens(messages, self.model)
+        budget = deadline.remaining() if deadline else None
+        route = self.router.route(input_tokens, self._issue_count(diagnostic_summary), latency_budget=budget)
+        timeout = {"timeout": max(1.0, budget)} if budget is not None else {}
+        
+        started = time.monotonic()
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert DevOps engineer specializing in Azure infrastructure automation, remediation, and optimization."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=2000
+            response = self.breaker.call(
+                lambda: self.client.chat.completions.create(
+                    model=route.model,
+                    messages=messages,
+                    temperature=route.temperature,
+                    max_tokens=route.max_tokens,
+                    **timeout
+                ),
+                prepare=lambda: self.rate_limiter.acquire(input_tokens + route.max_tokens)
             )
             
             result = response.choices[0].message.content or ""
             
             # Safe token usage extraction
             tokens_used = getattr(response.usage, "total_tokens", 0) if response.usage else 0
+            cached_tokens = record_llm_usage("resolution", response.usage)
+            self.router.observe(route, time.monotonic() - started, tokens_used)
             
             log.info("resolution_agent.generation_complete",
                      tokens_used=tokens_used,
-                     model=self.model)
+                     cached_tokens=cached_tokens,
+                     model=route.model,
+                     examples=len(examples))
             
             return result
             
+        except CircuitOpenError as e:
+            self.router.observe(route, time.monotonic() - started, ok=False)
+            log.error("resolution_agent.circuit_open", error=str(e), examples=len(examples))
+            return self._fallback_resolution(diagnostic_summary, examples, str(e))
         except Exception as e:
+            self.router.observe(route, time.monotonic() - started, ok=False)
             log.error("resolution_agent.generation_failed", error=str(e))
             return f"⚠️ Resolution generation failed: {str(e)}"
     
+    def record_resolution(self, diagnostic_summary: str, resolution: str) -> Optional[int]:
+        """
+        Store a reviewed resolution for reuse on repeat incidents
+        
+        LLM answers are not stored automatically: an entry is reused without
+        the LLM on an exact match, so only add resolutions that were reviewed
+        or successfully applied.
+        
+        Returns:
+            The knowledge base entry id, or None if the knowledge base is disabled
+        """
+        if self.knowledge_base is None:
+            return None
+        return self.knowledge_base.add(diagnostic_summary, resolution)
+    
+    def suggest_fixes_structured(self, findings: List[Finding]) -> List[Action]:
+        """
+        Generate typed remediation actions for typed findings
+        
+        Args:
+            findings: Findings from DiagnosticAgent.analyze_structured or triage
+            
+        Returns:
+            Validated actions, highest priority first
+            
+        Raises:
+            SchemaError: If the model output does not match ACTIONS_SCHEMA
+            CircuitOpenError: If OpenAI's circuit breaker is open
+        """
+        if not findings:
+            return []
+        payload = json.dumps([f.as_dict() for f in findings], indent=1)
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": STRUCTURED_RESOLUTION_PROMPT.format(findings=payload)}
+        ]
+        response = self.breaker.call(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.2,
+                max_tokens=self.max_tokens,
+                response_format=response_format("resolution_actions", ACTIONS_SCHEMA)
+            ),
+            prepare=lambda: self.rate_limiter.acquire(count_message_tokens(messages, self.model) + self.max_tokens)
+        )
+        
+        try:
+            record_llm_usage("resolution", response.usage)
+            actions = parse_actions(response.choices[0].message.content or "")
+        except SchemaError as e:
+            log.error("resolution_agent.invalid_structured_output", error=str(e))
+            raise
+        
+        log.info("resolution_agent.structured_generation_complete", findings=len(findings), actions=len(actions))
+        return actions
+    
+    async def suggest_fixes_many_async(
+        self,
+        diagnostic_summaries: List[str],
+        executor: Optional[AsyncLLMExecutor] = None
+    ) -> List[str]:
+        """
+        Generate resolution steps for many diagnostic summaries concurrently
+        
+        Args:
+            diagnostic_summaries: One diagnostic analysis per chunk or finding
+            executor: Rate-limited executor to run the requests on (created if omitted)
+            
+        Returns:
+            Resolution steps in the same order as the summaries
+        """
+        executor = executor or AsyncLLMExecutor()
+        requests = [self.fix_request(summary, key=idx) for idx, summary in enumerate(diagnostic_summaries)]
+        results = await executor.run_all(requests)
+        
+        log.info("resolution_agent.batch_generation_complete",
+                 requests=len(requests),
+                 tokens_used=sum(r.tokens_used for r in results))
+        return [
+            r.content if r.ok else f"⚠️ Resolution generation failed: {r.error}"
+            for r in results
+        ]
+    
+    def fix_request(self, diagnostic_summary: str, key: Any = None) -> LLMRequest:
+        """Executor request for resolution steps for one diagnostic summary"""
+        return LLMRequest(messages=self._build_messages(diagnostic_summary), model=self.model,
+                          max_tokens=self.max_tokens, temperature=0.7, key=key, purpose="resolution")
+    
+    def build_batch_requests(self, diagnostic_summaries: Dict[str, str]) -> List[Dict[str, Any]]:
+        """
+        Build requests for an offline BatchJob, one per keyed diagnostic summary
+        (e.g. keyed by the diagnostic batch custom_id)
+        """
+        return [
+            {
+                "custom_id": f"resolution-{idx:05d}",
+                "body": {"model": self.model, "messages": self._build_messages(summary),
+                         "temperature": 0.7, "max_tokens": self.max_tokens},
+                "meta": {"key": key}
+            }
+            for idx, (key, summary) in enumerate(diagnostic_summaries.items())
+        ]
+    
+    @staticmethod
+    def map_batch_results(results: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        """Map BatchJob results back to resolution steps per summary key (failed and missing results are flagged)"""
+        return {
+            result["meta"]["key"]: (
+                f"⚠️ Resolution generation failed: {result['error']}" if result["error"] else result["content"]
+            )
+            for result in results.values()
+        }
+    
+    @staticmethod
+    def _fallback_resolution(diagnostic_summary: str, examples: List[KnowledgeMatch], reason: str) -> str:
+        """Closest stored resolution flagged as degraded, for when the LLM cannot be used"""
+        if not examples:
+            return f"⚠️ Resolution generation failed: {reason}"
+        return (f"⚠️ DEGRADED RESOLUTION - AI unavailable ({reason}). Closest past resolution "
+                f"(confidence {examples[0].confidence:.2f}); review before applying.\n\n"
+                + examples[0].adapted(diagnostic_summary))
+    
+    @staticmethod
+    def _issue_count(diagnostic_summary: str) -> int:
+        """Lines of the summary that read as High or Critical issues (used for model routing)"""
+        return sum(1 for line in diagnostic_summary.splitlines()
+                   if line.strip() and score_text(line)[0] <= PRIORITY_ORDER["High"])
+
+    def _build_messages(
+        self,
+        diagnostic_summary: str,
+        examples: Optional[List[KnowledgeMatch]] = None
+    ) -> List[Dict[str, str]]:
+        content = RESOLUTION_PROMPT.format(diagnostic_summary=diagnostic_summary)
+        if examples:
+            content += "\nPreviously resolved similar incidents (adapt them; resources may differ):\n"
+            for idx, match in enumerate(examples, 1):
+                content += f"\n--- Example {idx} ---\nFindings:\n{match.finding}\n\nResolution:\n{match.resolution}\n"
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": content}
+        ]
+    
     def generate_automation_script(self, fix_description: str) -> Dict[str, Any]:
         """
         Generate automation scripts for a specific fix
-        (Future enhancement)
+        
+        The fix is reduced to a parameterized signature (see fix_signatures); the
+        LLM is only called for signatures without a cached template, and the
+        fix's own resource names are filled in locally.
         """
-        log.info("resolution_agent.automation_generation", fix=fix_description)
+        signature, params = fix_signature(fix_description)
+        template = self.script_cache.get(signature)
+        if template is not None:
+            log.info("resolution_agent.automation_cache_hit", signature=signature)
+            return {"script": fill_template(template, params), "status": "generated",
+                    "signature": signature, "cached": True}
         
-        prompt = f"""
-Generate Azure CLI or PowerShell commands to implement this fix:
-{fix_description}
+        log.info("resolution_agent.automation_generation", fix=fix_description, signature=signature)
+        placeholders = ", ".join(f"<{name}>" for name in params)
+        prompt = """
+Generate Azure CLI or PowerShell commands to implement the fix at the end of this message.
 
 Provide:
 1. The exact commands
 2. Required permissions
 3. Rollback procedure
+"""
+        if placeholders:
+            prompt += f"""
+Keep the placeholders {placeholders} exactly as written wherever those values are needed.
+"""
+        prompt += f"""
+Fix:
+{signature}
 """
         
+        messages = [{"role": "user", "content": prompt}]
+        
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=1000
+            response = self.breaker.call(
+                lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=1000
+                ),
+                prepare=lambda: self.rate_limiter.acquire(count_message_tokens(messages, self.model) + 1000)
             )
             
-            script_content = response.choices[0].message.content or ""
+            record_llm_usage("automation_script", response.usage)
+            template = response.choices[0].message.content or ""
+            self.script_cache.put(signature, template)
+            self.script_cache.save()
             return {
-                "script": script_content,
-                "status": "generated"
+                "script": fill_template(template, params),
+                "status": "generated",
+                "signature": signature,
+                "cached": False
             }
             
         except Exception as e:
@@ -137,30 +378,69 @@ Provide:
                 "status": "failed"
             }
     
-    def prioritize_fixes(self, fixes: List[str]) -> List[Dict[str, Any]]:
+    def generate_automation_scripts(
+        self,
+        fix_descriptions: List[str],
+        max_workers: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
         """
-        Prioritize a list of fixes based on impact and urgency
-        """
-        log.info("resolution_agent.prioritization_start", fix_count=len(fixes))
-        
-        prioritized = []
-        for fix in fixes:
-            # Simple heuristic prioritization
-            priority = "Medium"
-            if any(word in fix.lower() for word in ["critical", "security", "down", "failed"]):
-                priority = "Critical"
-            elif any(word in fix.lower() for word in ["performance", "slow", "timeout"]):
-                priority = "High"
-            elif any(word in fix.lower() for word in ["cost", "optimize", "unused"]):
-                priority = "Low"
+        Generate automation scripts for many fixes, yielding results as they complete
+        
+        Fixes are grouped by signature so each distinct fix shape costs at most
+        one LLM call; the first fix of each group is generated on a bounded
+        thread pool sharing this agent's client and rate limiter, and the rest
+        of the group is filled in from the cached template.
+        
+        Args:
+            fix_descriptions: Fix descriptions, duplicates allowed
+            max_workers: Concurrent generations (default SCRIPT_MAX_WORKERS or 8)
             
-            prioritized.append({
-                "fix": fix,
-                "priority": priority
-            })
+        Yields:
+            generate_automation_script results plus 'index' (position in
+            fix_descriptions), 'fix', 'deduplicated', 'seconds' (time to produce
+            this item) and 'elapsed' (seconds since the batch started)
+        """
+        started = time.perf_counter()
+        groups: Dict[str, List[int]] = {}
+        for idx, fix in enumerate(fix_descriptions):
+            groups.setdefault(fix_signature(fix)[0], []).append(idx)
+        workers = max_workers or int(os.getenv("SCRIPT_MAX_WORKERS", "8"))
+        log.info("resolution_agent.script_batch_start", fixes=len(fix_descriptions),
+                 signatures=len(groups), workers=workers)
+        
+        def timed(fix: str):
+            begin = time.perf_counter()
+            result = self.generate_automation_script(fix)
+            return result, time.perf_counter() - begin
         
-        # Sort by priority
-        priority_order = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3}
-        prioritized.sort(key=lambda x: priority_order.get(x["priority"], 4))
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="script-gen")
+        try:
+            futures = {pool.submit(timed, fix_descriptions[indices[0]]): indices for indices in groups.values()}
+            for future in as_completed(futures):
+                indices = futures[future]
+                result, seconds = future.result()
+                for position, idx in enumerate(indices):
+                    if position:
+                        begin = time.perf_counter()
+                        if result["status"] == "generated":
+                            result = self.generate_automation_script(fix_descriptions[idx])
+                        seconds = time.perf_counter() - begin
+                    yield dict(result, index=idx, fix=fix_descriptions[idx], deduplicated=position > 0,
+                               seconds=seconds, elapsed=time.perf_counter() - started)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
         
-        return prioritized
+        log.info("resolution_agent.script_batch_complete", fixes=len(fix_descriptions),
+                 signatures=len(groups), duration_seconds=time.perf_counter() - started,
+                 **self.script_cache.stats())
+    
+    def prioritize_fixes(self, fixes: List[Any], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Prioritize a list of fixes based on impact and urgency
+        
+        Args:
+            fixes: Fix descriptions, or dicts with 'fix' and optional 'vms'/'tags'
+            top_k: Return only the K most urgent fixes
+        """
+        log.info("resolution_agent.prioritization_start", fix_count=len(fixes), top_k=top_k)
+        return prioritize(fixes, top_k=top_k)
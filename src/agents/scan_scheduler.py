@@ -0,0 +1,188 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Tiered Scan Scheduler - Decides which VMs each daemon cycle scans
+
+VMs are tiered by tag weight (environment=production, criticality=critical
+and so on, see prioritizer.TAG_WEIGHTS) and promoted one tier while they have
+had an incident within the incident window. Each tier has its own scan
+interval - critical every minute, the long tail hourly - and VMs wait in a
+priority queue keyed by when they are next due. A cycle takes at most the
+per-cycle budget of due VMs, most critical first; VMs left over stay due and
+are served first on the next cycle. Critical VMs are therefore seen within a
+minute while the number of VMs scanned (and NSG/LLM calls made) per cycle
+stays bounded.
+"""
+import heapq
+import itertools
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.agents.prioritizer import tag_weight
+from src.metrics import scan_backlog, scan_overdue, scan_tier_vms, vm_scans
+from src.utils.logger import log
+
+TIER_CRITICAL = "critical"
+TIER_STANDARD = "standard"
+TIER_LOW = "low"
+
+# Most urgent first; promotion moves a VM one step towards the front
+TIERS = (TIER_CRITICAL, TIER_STANDARD, TIER_LOW)
+TIER_RANK = {tier: rank for rank, tier in enumerate(TIERS)}
+
+# Minimum tag weight for each tier (production or criticality=critical -> critical)
+TIER_TAG_WEIGHTS = {TIER_CRITICAL: 3, TIER_STANDARD: 1}
+
+DEFAULT_INTERVALS = {TIER_CRITICAL: 60.0, TIER_STANDARD: 900.0, TIER_LOW: 3600.0}
+
+
+class TieredScanScheduler:
+    """
+    Priority queue of VMs ordered by next scan time
+
+    Settings default to SCAN_INTERVAL_CRITICAL_SECONDS, SCAN_INTERVAL_STANDARD_SECONDS,
+    SCAN_INTERVAL_LOW_SECONDS, SCAN_BUDGET_PER_CYCLE (0 = unbounded) and
+    INCIDENT_WINDOW_SECONDS.
+    """
+
+    def __init__(
+        self,
+        intervals: Optional[Dict[str, float]] = None,
+        budget: Optional[int] = None,
+        incident_window: Optional[float] = None
+    ):
+        self.intervals = intervals or {
+            tier: float(os.getenv(f"SCAN_INTERVAL_{tier.upper()}_SECONDS", str(default)))
+            for tier, default in DEFAULT_INTERVALS.items()
+        }
+        self.budget = budget if budget is not None else int(os.getenv("SCAN_BUDGET_PER_CYCLE", "50"))
+        self.incident_window = incident_window if incident_window is not None else \
+            float(os.getenv("INCIDENT_WINDOW_SECONDS", "86400"))
+        # name -> {"vm", "tier", "next_due", "last_scanned"}
+        self._vms: Dict[str, Dict[str, Any]] = {}
+        self._incidents: Dict[str, float] = {}
+        # (next_due, seq, name); entries whose next_due no longer matches _vms are stale
+        self._queue: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+
+    def tier_for(self, vm: Dict[str, Any], now: Optional[float] = None) -> str:
+        """Tier from the VM's tags, promoted one step after a recent incident"""
+        now = time.monotonic() if now is None else now
+        weight = tag_weight(vm.get("tags"))
+        tier = next((t for t, minimum in TIER_TAG_WEIGHTS.items() if weight >= minimum), TIER_LOW)
+        incident_at = self._incidents.get(vm.get("name", ""))
+        if incident_at is not None and now - incident_at <= self.incident_window:
+            tier = TIERS[max(0, TIER_RANK[tier] - 1)]
+        return tier
+
+    def record_incidents(self, names: Iterable[str], now: Optional[float] = None):
+        """Mark VMs found with issues; they are scanned one tier more often for the incident window"""
+        now = time.monotonic() if now is None else now
+        for name in names:
+            self._incidents[name] = now
+            entry = self._vms.get(name)
+            if entry is not None:
+                self._retier(entry, now)
+
+    def sync(self, vms: Iterable[Dict[str, Any]], now: Optional[float] = None):
+        """Track the current fleet: new VMs are due immediately, removed VMs are dropped"""
+        now = time.monotonic() if now is None else now
+        seen = set()
+        for vm in vms:
+            name = vm.get("name")
+            if not name:
+                continue
+            seen.add(name)
+            entry = self._vms.get(name)
+            if entry is None:
+                self._vms[name] = entry = {"vm": vm, "tier": self.tier_for(vm, now),
+                                           "next_due": now, "last_scanned": None}
+                self._push(entry, name)
+            else:
+                entry["vm"] = vm
+                self._retier(entry, now)
+        for name in set(self._vms) - seen:
+            del self._vms[name]
+            self._incidents.pop(name, None)
+        for tier, count in self.tier_counts().items():
+            scan_tier_vms.labels(tier=tier).set(count)
+
+    def next_batch(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Pop the VMs to scan this cycle and schedule their next scan
+
+        Returns:
+            Up to the budget of due VMs, most critical tier first, then most overdue
+        """
+        now = time.monotonic() if now is None else now
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            next_due, _, name = heapq.heappop(self._queue)
+            entry = self._vms.get(name)
+            if entry is not None and entry["next_due"] == next_due:
+                due.append((TIER_RANK[entry["tier"]], next_due, name))
+
+        limit = self.budget if self.budget > 0 else len(due)
+        selected = heapq.nsmallest(limit, due)
+        deferred = len(due) - len(selected)
+        chosen = {name for _, _, name in selected}
+        for _, _, name in due:
+            if name not in chosen:
+                # Still due: keeps its original due time, so it is served first next cycle
+                self._push(self._vms[name], name)
+
+        batch = []
+        for _, next_due, name in selected:
+            entry = self._vms[name]
+            scan_overdue.labels(tier=entry["tier"]).observe(now - next_due)
+            vm_scans.labels(tier=entry["tier"]).inc()
+            entry["last_scanned"] = now
+            entry["next_due"] = now + self.intervals[entry["tier"]]
+            self._push(entry, name)
+            batch.append(entry["vm"])
+        scan_backlog.set(deferred)
+
+        if deferred:
+            log.warning("scan_scheduler.budget_exhausted", scanned=len(batch), deferred=deferred,
+                        budget=self.budget)
+        log.info("scan_scheduler.batch", scanned=len(batch), deferred=deferred,
+                 critical=sum(1 for rank, _, _ in selected if rank == TIER_RANK[TIER_CRITICAL]))
+        return batch
+
+    def plan(self, azure_data: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+        """Copy of azure_data restricted to the VMs due for a scan this cycle"""
+        self.sync(azure_data.get("value", []), now)
+        batch = self.next_batch(now)
+        payload = dict(azure_data)
+        payload["value"] = batch
+        payload["count"] = len(batch)
+        return payload
+
+    def tier_counts(self) -> Dict[str, int]:
+        counts = {tier: 0 for tier in TIERS}
+        for entry in self._vms.values():
+            counts[entry["tier"]] += 1
+        return counts
+
+    def _retier(self, entry: Dict[str, Any], now: float):
+        """Re-derive the tier; a more urgent tier pulls the next scan forward"""
+        tier = self.tier_for(entry["vm"], now)
+        if tier == entry["tier"]:
+            return
+        entry["tier"] = tier
+        if entry["last_scanned"] is not None:
+            next_due = max(now, entry["last_scanned"] + self.intervals[tier])
+            if next_due < entry["next_due"]:
+                entry["next_due"] = next_due
+                self._push(entry, entry["vm"]["name"])
+
+    def _push(self, entry: Dict[str, Any], name: str):
+        heapq.heappush(self._queue, (entry["next_due"], next(self._seq), name))
+
+    def __len__(self) -> int:
+        return len(self._vms)
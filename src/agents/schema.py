@@ -0,0 +1,157 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Structured Output Schema - Typed findings and actions exchanged between agents
+
+The JSON schemas below are sent to the model as a strict response_format and
+re-checked locally on the way back, so malformed output fails fast with a
+SchemaError naming the offending field instead of propagating as prose.
+Findings share the shape of rules-based triage findings.
+"""
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+SEVERITIES = ("Critical", "High", "Medium", "Low")
+CATEGORIES = ("availability", "provisioning", "network", "security", "performance", "cost", "configuration")
+
+FINDING_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "vm": {"type": "string"},
+        "category": {"type": "string", "enum": list(CATEGORIES)},
+        "severity": {"type": "string", "enum": list(SEVERITIES)},
+        "root_cause": {"type": "string"},
+        "evidence": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["vm", "category", "severity", "root_cause", "evidence"],
+    "additionalProperties": False,
+}
+
+ACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "vm": {"type": "string"},
+        "priority": {"type": "string", "enum": list(SEVERITIES)},
+        "effort_hours": {"type": "number"},
+        "commands": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["title", "vm", "priority", "effort_hours", "commands"],
+    "additionalProperties": False,
+}
+
+FINDINGS_SCHEMA = {
+    "type": "object",
+    "properties": {"findings": {"type": "array", "items": FINDING_SCHEMA}},
+    "required": ["findings"],
+    "additionalProperties": False,
+}
+
+ACTIONS_SCHEMA = {
+    "type": "object",
+    "properties": {"actions": {"type": "array", "items": ACTION_SCHEMA}},
+    "required": ["actions"],
+    "additionalProperties": False,
+}
+
+_TYPES = {"object": dict, "array": list, "string": str, "number": (int, float)}
+
+
+class SchemaError(ValueError):
+    """Raised when model output does not match the expected schema"""
+
+
+def response_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """OpenAI strict structured-output response_format for a schema"""
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+def validate(instance: Any, schema: Dict[str, Any], path: str = "$"):
+    """
+    Check instance against the subset of JSON Schema used in this module
+
+    Raises:
+        SchemaError: On the first mismatch, with a path like $.findings[2].severity
+    """
+    expected = _TYPES[schema["type"]]
+    if not isinstance(instance, expected) or isinstance(instance, bool):
+        raise SchemaError(f"{path}: expected {schema['type']}, got {type(instance).__name__}")
+    if "enum" in schema and instance not in schema["enum"]:
+        raise SchemaError(f"{path}: {instance!r} is not one of {schema['enum']}")
+    if schema["type"] == "array":
+        for idx, item in enumerate(instance):
+            validate(item, schema["items"], f"{path}[{idx}]")
+    elif schema["type"] == "object":
+        for key in schema.get("required", []):
+            if key not in instance:
+                raise SchemaError(f"{path}: missing required field '{key}'")
+        properties = schema.get("properties", {})
+        for key, value in instance.items():
+            if key in properties:
+                validate(value, properties[key], f"{path}.{key}")
+            elif schema.get("additionalProperties") is False:
+                raise SchemaError(f"{path}: unexpected field '{key}'")
+
+
+def _load(text: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        data = json.loads(text)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise SchemaError(f"$: not valid JSON ({e})") from e
+    validate(data, schema)
+    return data
+
+
+@dataclass
+class Finding:
+    """One diagnosed issue on one VM"""
+    vm: str
+    category: str
+    severity: str
+    root_cause: str
+    evidence: List[str] = field(default_factory=list)
+    source: str = "ai"
+    cluster: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Finding":
+        """Build from a triage or model finding; fan-out fields are kept, unknown ones ignored"""
+        validate({k: data[k] for k in FINDING_SCHEMA["required"] if k in data}, FINDING_SCHEMA)
+        return cls(vm=data["vm"], category=data["category"], severity=data["severity"],
+                   root_cause=data["root_cause"], evidence=list(data["evidence"]),
+                   source=data.get("source", "ai"), cluster=data.get("cluster"))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class Action:
+    """One remediation step, with the commands that carry it out"""
+    title: str
+    vm: str
+    priority: str
+    effort_hours: float
+    commands: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Action":
+        validate(data, ACTION_SCHEMA)
+        return cls(title=data["title"], vm=data["vm"], priority=data["priority"],
+                   effort_hours=float(data["effort_hours"]), commands=list(data["commands"]))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def parse_findings(text: str) -> List[Finding]:
+    """Parse a {'findings': [...]} model response"""
+    return [Finding.from_dict(item) for item in _load(text, FINDINGS_SCHEMA)["findings"]]
+
+
+def parse_actions(text: str) -> List[Action]:
+    """Parse an {'actions': [...]} model response"""
+    return [Action.from_dict(item) for item in _load(text, ACTIONS_SCHEMA)["actions"]]
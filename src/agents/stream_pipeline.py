@@ -0,0 +1,300 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Streaming Pipeline - collect → triage → diagnose → resolve → report over bounded queues
+
+The fleet flows through the stages in batches of VMs instead of as one list.
+Collection first builds the NSG/instance-view/resource-group indexes - each
+list call follows every ARM page, so they cover the whole subscription and are
+O(fleet) - then reads VMs one page at a time and joins each page against them.
+Every stage hands its output to the next through an asyncio.Queue of bounded
+size, so when diagnosis or resolution falls behind the stages before it block
+on put() instead of buffering the estate. The report stage writes each batch's
+section to a sink as soon as it is resolved and keeps only counters, so beyond
+the indexes memory is bounded by page size plus queue sizes times batch size
+however many VMs the subscription holds.
+
+Triage, diagnose and resolve run a configurable number of workers; collection
+(ARM paging is sequential) and reporting run one each. Diagnosis and resolution
+share one AsyncLLMExecutor, so its rate limiter and concurrency cap still apply.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.agents.async_executor import AsyncLLMExecutor, LLMResult
+from src.agents.diagnostic_agent import DiagnosticAgent
+from src.agents.resolution_agent import ResolutionAgent
+from src.agents.triage import TriageReport, triage_fleet
+from src.metrics import stream_item_duration, stream_items, stream_queue_depth, stream_stage_errors
+from src.services.fleet_collector import collect_fleet
+from src.utils.deadline import Deadline
+from src.utils.logger import log
+from src.utils.tokens import PromptBudgetExceeded
+
+STAGES = ("collect", "triage", "diagnose", "resolve", "report")
+
+# Sentinel passed down a queue once per downstream worker when a stage is done
+_DONE = object()
+
+
+@dataclass
+class StreamConfig:
+    """
+    Batch, queue and worker sizes
+
+    Defaults come from STREAM_BATCH_SIZE, STREAM_QUEUE_SIZE and
+    STREAM_<STAGE>_WORKERS for triage, diagnose and resolve.
+    """
+    batch_size: int = 25
+    queue_size: int = 4
+    workers: Dict[str, int] = field(default_factory=lambda: {"triage": 1, "diagnose": 4, "resolve": 4})
+
+    @classmethod
+    def from_env(cls) -> "StreamConfig":
+        defaults = cls()
+        return cls(
+            batch_size=int(os.getenv("STREAM_BATCH_SIZE", str(defaults.batch_size))),
+            queue_size=int(os.getenv("STREAM_QUEUE_SIZE", str(defaults.queue_size))),
+            workers={stage: max(1, int(os.getenv(f"STREAM_{stage.upper()}_WORKERS", str(count))))
+                     for stage, count in defaults.workers.items()}
+        )
+
+
+@dataclass
+class StreamBatch:
+    """One batch of VMs and what each stage produced for it"""
+    index: int
+    vms: List[Dict[str, Any]]
+    triage: Optional[TriageReport] = None
+    diagnosis: str = ""
+    resolution: str = ""
+    # Set when the AI analysis part of the diagnosis failed; the diagnosis may
+    # still open with triage findings, so it is not detectable from the text
+    analysis_failed: bool = False
+
+    @property
+    def title(self) -> str:
+        return f"### Batch {self.index} ({len(self.vms)} VMs)"
+
+
+@dataclass
+class StreamSummary:
+    """Counters from a streaming run (batch contents are not retained)"""
+    vms: int = 0
+    batches: int = 0
+    batches_with_issues: int = 0
+    failed_batches: int = 0
+    errors: List[str] = field(default_factory=list)
+    processed: Dict[str, int] = field(default_factory=lambda: {stage: 0 for stage in STAGES})
+    duration_seconds: float = 0.0
+
+
+class StreamPipeline:
+    """
+    Runs one streaming pass over a subscription
+
+    Args:
+        azure_client: AzureClient used for collection
+        diagnostic_agent: Plans and renders each batch's diagnosis
+        resolution_agent: Turns each batch's findings into fixes
+        sink: Receives each batch's report section as soon as it is ready
+        config: Batch, queue and worker sizes (StreamConfig.from_env() by default)
+        executor: Shared rate-limited executor (created if omitted)
+    """
+
+    def __init__(
+        self,
+        azure_client,
+        diagnostic_agent: DiagnosticAgent,
+        resolution_agent: ResolutionAgent,
+        sink: Callable[[str], None] = print,
+        config: Optional[StreamConfig] = None,
+        executor: Optional[AsyncLLMExecutor] = None
+    ):
+        self.azure_client = azure_client
+        self.diagnostic_agent = diagnostic_agent
+        self.resolution_agent = resolution_agent
+        self.sink = sink
+        self.config = config or StreamConfig.from_env()
+        self.executor = executor
+        self.summary = StreamSummary()
+        self.deadline = Deadline()
+
+    async def run(self, deadline: Optional[Deadline] = None) -> StreamSummary:
+        """
+        Stream the whole subscription through every stage
+
+        Args:
+            deadline: Collection stops and LLM calls are skipped once it has passed;
+                batches already collected are still reported
+        """
+        started = time.monotonic()
+        self.summary = StreamSummary()
+        self.deadline = deadline or Deadline()
+        self.executor = self.executor or AsyncLLMExecutor()
+        workers = dict(self.config.workers, collect=1, report=1)
+        queues = {stage: asyncio.Queue(maxsize=self.config.queue_size) for stage in STAGES[1:]}
+        handlers = {"triage": self._triage, "diagnose": self._diagnose,
+                    "resolve": self._resolve, "report": self._report}
+
+        log.info("stream.start", batch_size=self.config.batch_size, queue_size=self.config.queue_size,
+                 workers=workers)
+        tasks = [asyncio.ensure_future(self._collect(queues["triage"], workers["triage"]))]
+        for position, stage in enumerate(STAGES[1:], 1):
+            downstream = STAGES[position + 1] if position + 1 < len(STAGES) else None
+            tasks.append(asyncio.ensure_future(self._stage(
+                stage, handlers[stage], workers[stage], queues[stage],
+                queues.get(downstream), workers.get(downstream, 0))))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            for stage in queues:
+                stream_queue_depth.labels(stage=stage).set(0)
+
+        self.summary.duration_seconds = time.monotonic() - started
+        log.info("stream.complete", vms=self.summary.vms, batches=self.summary.batches,
+                 issues=self.summary.batches_with_issues, failed_batches=self.summary.failed_batches,
+                 duration_seconds=round(self.summary.duration_seconds, 3), **self.executor.stats.as_dict())
+        return self.summary
+
+    async def _put(self, stage: str, queue: asyncio.Queue, item):
+        # Blocks while the downstream stage is full: this is the backpressure
+        await queue.put(item)
+        stream_queue_depth.labels(stage=stage).set(queue.qsize())
+
+    async def _stage(self, name: str, handler: Callable[[StreamBatch], Awaitable[Optional[StreamBatch]]],
+                     workers: int, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue], downstream_workers: int):
+        downstream = STAGES[STAGES.index(name) + 1] if outbox is not None else None
+
+        async def worker():
+            while True:
+                item = await inbox.get()
+                stream_queue_depth.labels(stage=name).set(inbox.qsize())
+                if item is _DONE:
+                    return
+                started = time.monotonic()
+                try:
+                    result = await handler(item)
+                except Exception as e:
+                    stream_stage_errors.labels(stage=name).inc()
+                    self.summary.errors.append(f"{name} batch {item.index}: {e}")
+                    log.error("stream.stage_failed", stage=name, batch=item.index, error=str(e))
+                    continue
+                stream_items.labels(stage=name).inc()
+                stream_item_duration.labels(stage=name).observe(time.monotonic() - started)
+                self.summary.processed[name] += 1
+                if outbox is not None and result is not None:
+                    await self._put(downstream, outbox, result)
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        if outbox is not None:
+            for _ in range(downstream_workers):
+                await outbox.put(_DONE)
+
+    async def _collect(self, outbox: asyncio.Queue, downstream_workers: int):
+        """
+        Index NSGs/instance views/resource groups, then page through VMs in batches
+
+        The indexes are fetched in full (all ARM pages) before the first VM page,
+        since any VM page may reference any NSG or instance view; they are the
+        only fleet-sized state the pipeline holds.
+        """
+        try:
+            indexes = await asyncio.to_thread(collect_fleet, self.azure_client, self.deadline,
+                                              ["resource_groups", "nsgs", "instance_views"])
+            pages = self.azure_client.iter_vm_pages(deadline=self.deadline)
+            while not self.deadline.expired:
+                started = time.monotonic()
+                page = await asyncio.to_thread(next, pages, None)
+                if page is None:
+                    break
+                if page.get("error"):
+                    self.summary.errors.append(f"collect: {page.get('message') or page['error']}")
+                    stream_stage_errors.labels(stage="collect").inc()
+                    break
+                vms = indexes.join(page.get("value", []))
+                stream_item_duration.labels(stage="collect").observe(time.monotonic() - started)
+                for start in range(0, len(vms), self.config.batch_size):
+                    self.summary.batches += 1
+                    batch = StreamBatch(index=self.summary.batches, vms=vms[start:start + self.config.batch_size])
+                    self.summary.vms += len(batch.vms)
+                    stream_items.labels(stage="collect").inc()
+                    self.summary.processed["collect"] += 1
+                    await self._put("triage", outbox, batch)
+            if self.deadline.expired:
+                log.warning("stream.collect_stopped", reason="deadline exceeded", vms=self.summary.vms)
+        finally:
+            for _ in range(downstream_workers):
+                await outbox.put(_DONE)
+
+    async def _triage(self, batch: StreamBatch) -> StreamBatch:
+        batch.triage = triage_fleet({"value": batch.vms})
+        return batch
+
+    async def _diagnose(self, batch: StreamBatch) -> StreamBatch:
+        needs_ai = batch.triage.needs_ai if batch.triage else batch.vms
+        sections = [batch.triage.render()] if batch.triage and batch.triage.known_issues else []
+        if needs_ai:
+            sections.append(await self._analyze(batch, needs_ai))
+        batch.diagnosis = "\n\n".join(sections)
+        return batch
+
+    async def _analyze(self, batch: StreamBatch, vms: List[Dict[str, Any]]) -> str:
+        if self.deadline.expired:
+            batch.analysis_failed = True
+            return "⚠️ Analysis failed: deadline exceeded"
+        payload = {"value": vms, "count": len(vms)}
+        try:
+            plans = self.diagnostic_agent.plan_chunks(payload, chunk_size=len(vms))
+        except PromptBudgetExceeded as e:
+            batch.analysis_failed = True
+            return f"⚠️ Analysis failed: {str(e)}"
+        _, messages, budget = plans[0]
+        result = await self._llm(self.diagnostic_agent.chunk_request(batch.index, messages))
+        batch.analysis_failed = not result.ok
+        return self.diagnostic_agent.render_chunk(1, 1, result, budget).split("\n", 1)[1]
+
+    async def _resolve(self, batch: StreamBatch) -> StreamBatch:
+        diagnosis = batch.diagnosis
+        if batch.analysis_failed:
+            # Skip the failed AI section but still remediate the rules-based findings
+            diagnosis = batch.triage.render() if batch.triage and batch.triage.known_issues else ""
+        if batch.triage and not batch.triage.has_issues:
+            batch.resolution = "No issues detected - no remediation required."
+        elif not diagnosis:
+            batch.resolution = ""
+        elif self.deadline.expired:
+            batch.resolution = "⚠️ Resolution generation failed: deadline exceeded"
+        else:
+            result = await self._llm(self.resolution_agent.fix_request(diagnosis, key=batch.index))
+            batch.resolution = result.content if result.ok else f"⚠️ Resolution generation failed: {result.error}"
+        return batch
+
+    async def _llm(self, request):
+        """Run one executor request, abandoning it when the deadline passes"""
+        remaining = self.deadline.remaining()
+        try:
+            return await asyncio.wait_for(self.executor.run(request), timeout=remaining)
+        except asyncio.TimeoutError:
+            return LLMResult(request=request, error="deadline exceeded")
+
+    async def _report(self, batch: StreamBatch) -> None:
+        has_issues = batch.triage.has_issues if batch.triage else True
+        if has_issues:
+            self.summary.batches_with_issues += 1
+        if batch.analysis_failed or batch.resolution.startswith("⚠️"):
+            self.summary.failed_batches += 1
+        if not has_issues:
+            self.sink(f"{batch.title}\n✓ All VMs healthy")
+        else:
+            self.sink(f"{batch.title}\n{batch.diagnosis}\n\n🔧 Fixes:\n{batch.resolution or 'None generated'}")
+        return None
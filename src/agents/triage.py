@@ -0,0 +1,203 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Triage - Deterministic rules-first classification of VMs before AI analysis
+
+Each VM is classified as:
+- healthy:     running, provisioned and NSG rules allow RDP - nothing to analyze
+- known_issue: matches a rule with a templated finding - no LLM call needed
+- needs_ai:    ambiguous state the rules cannot explain (including VMs with no
+               NSG data to check RDP against) - sent to DiagnosticAgent
+"""
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.utils.health import quick_health_check
+from src.utils.logger import log
+from src.utils.nsg import RDP_PORT, nsg_issues
+
+HEALTHY = "healthy"
+KNOWN_ISSUE = "known_issue"
+NEEDS_AI = "needs_ai"
+
+STOPPED_STATES = ("stopped", "deallocated", "deallocating", "stopping")
+
+
+@dataclass
+class TriageReport:
+    """Result of triaging a fleet"""
+    healthy: List[Dict[str, Any]] = field(default_factory=list)
+    known_issues: List[Dict[str, Any]] = field(default_factory=list)
+    known_issue_vms: List[Dict[str, Any]] = field(default_factory=list)
+    needs_ai: List[Dict[str, Any]] = field(default_factory=list)
+    health: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def has_issues(self) -> bool:
+        return bool(self.known_issues or self.needs_ai)
+
+    def ai_payload(self, azure_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of azure_data restricted to the VMs that need AI analysis"""
+        payload = dict(azure_data)
+        payload["value"] = list(self.needs_ai)
+        payload["count"] = len(self.needs_ai)
+        return payload
+
+    def render(self) -> str:
+        """Format templated findings as a report section"""
+        lines = [
+            f"Rules-based triage: {len(self.healthy)} healthy, "
+            f"{len(self.known_issue_vms)} with known issues ({len(self.known_issues)} findings), "
+            f"{len(self.needs_ai)} need AI analysis"
+        ]
+        for idx, finding in enumerate(self.known_issues, 1):
+            lines.append(
+                f"\n{idx}. [{finding['severity']}] {finding['vm']} - {finding['root_cause']}"
+                f"\n   Category: {finding['category']}"
+                f"\n   Evidence: {'; '.join(finding['evidence'])}"
+            )
+        return "\n".join(lines)
+
+
+def _is_production(vm: Dict[str, Any]) -> bool:
+    return str(vm.get("tags", {}).get("environment", "")).lower() in ("production", "prod")
+
+
+def _finding(vm: Dict[str, Any], category: str, severity: str,
+             root_cause: str, evidence: List[str]) -> Dict[str, Any]:
+    # Production VMs are escalated one level
+    if _is_production(vm) and severity == "High":
+        severity = "Critical"
+    return {
+        "vm": vm.get("name", "Unknown"),
+        "category": category,
+        "severity": severity,
+        "root_cause": root_cause,
+        "evidence": evidence,
+        "source": "rules"
+    }
+
+
+def classify_vm(vm: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Classify a single VM with deterministic rules
+
+    Returns:
+        Dictionary with 'status' (healthy/known_issue/needs_ai), 'findings'
+        (templated findings for known issues) and 'reasons' (for needs_ai)
+    """
+    props = vm.get("properties", {})
+    power_state = str(props.get("powerState", "unknown")).lower()
+    provisioning = str(props.get("provisioningState", "Succeeded"))
+    findings = []
+    reasons = []
+
+    if power_state in STOPPED_STATES:
+        findings.append(_finding(
+            vm, "availability", "High",
+            f"VM is {power_state} - RDP cannot connect until it is started",
+            [f"powerState={power_state}"]
+        ))
+    elif power_state != "running":
+        reasons.append(f"unrecognized power state '{power_state}'")
+
+    if provisioning.lower() == "failed":
+        findings.append(_finding(
+            vm, "provisioning", "High",
+            "Last provisioning operation failed",
+            [f"provisioningState={provisioning}"]
+        ))
+    elif provisioning.lower() != "succeeded":
+        reasons.append(f"provisioning state '{provisioning}'")
+
+    nsg_data = vm.get("nsg")
+    if not nsg_data:
+        # RDP reachability was never checked, so the VM cannot be called healthy
+        reasons.append("no NSG data - RDP reachability not checked")
+    elif nsg_data.get("error"):
+        reasons.append("NSG rules unavailable")
+    else:
+        for issue in nsg_issues(nsg_data, RDP_PORT):
+            findings.append(_finding(
+                vm, "network", "High",
+                f"NSG blocks RDP (port {RDP_PORT})",
+                [issue]
+            ))
+
+    if findings:
+        status = KNOWN_ISSUE
+    elif reasons:
+        status = NEEDS_AI
+    else:
+        status = HEALTHY
+    return {"status": status, "findings": findings, "reasons": reasons}
+
+
+def triage_fleet(
+    azure_data: Dict[str, Any],
+    nsg_by_vm: Optional[Dict[str, Dict[str, Any]]] = None
+) -> TriageReport:
+    """
+    Triage every VM in azure_data
+
+    Args:
+        azure_data: VM list as returned by AzureClient.get_vm_list
+        nsg_by_vm: Optional NSG data (get_nsg_rules output) keyed by VM name,
+                   used for VMs that do not already carry an 'nsg' entry
+
+    Returns:
+        TriageReport with VMs split into healthy, known-issue and needs-AI
+    """
+    report = TriageReport(health=quick_health_check(azure_data))
+    nsg_by_vm = nsg_by_vm or {}
+
+    for vm in azure_data.get("value", []):
+        if "nsg" not in vm and vm.get("name") in nsg_by_vm:
+            vm = dict(vm, nsg=nsg_by_vm[vm["name"]])
+
+        verdict = classify_vm(vm)
+        if verdict["status"] == KNOWN_ISSUE:
+            report.known_issues.extend(verdict["findings"])
+            report.known_issue_vms.append(vm)
+        elif verdict["status"] == NEEDS_AI:
+            report.needs_ai.append(vm)
+        else:
+            report.healthy.append(vm)
+
+    log.info("triage.completed",
+             healthy=len(report.healthy),
+             known_issue_vms=len(report.known_issue_vms),
+             findings=len(report.known_issues),
+             needs_ai=len(report.needs_ai))
+    return report
+
+
+def degraded_report(azure_data: Dict[str, Any], reason: str) -> str:
+    """
+    Rules-only diagnostic report used when AI analysis cannot complete in time
+
+    Built from quick_health_check and NSG/power-state triage; the header flags it
+    as degraded so readers and downstream agents do not mistake it for AI output.
+    """
+    triage = triage_fleet(azure_data)
+    health = triage.health
+    lines = [
+        f"⚠️ DEGRADED REPORT - AI analysis unavailable ({reason}). "
+        f"Rules-based health check and NSG evaluation only; re-run for a full diagnosis.",
+        "",
+        f"Health: {health['total_vms']} VMs, {health['running_vms']} running, "
+        f"{health['stopped_vms']} not running, regions: {', '.join(sorted(health['locations'])) or 'n/a'}",
+    ]
+    lines += [f"- {issue}" for issue in health["issues"]]
+    lines += ["", triage.render()]
+    if triage.needs_ai:
+        names = ", ".join(vm.get("name", "Unknown") for vm in triage.needs_ai)
+        lines.append(f"\nNot analyzed (rules cannot explain their state): {names}")
+    log.warning("triage.degraded_report", reason=reason, vms=health["total_vms"],
+                findings=len(triage.known_issues))
+    return "\n".join(lines)
@@ -0,0 +1,293 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Diagnostics API - Long-running HTTP service for on-demand diagnosis
+
+Endpoints (GET or POST):
+    /diagnose/vm/<name>                 one VM
+    /diagnose/resource-group/<name>     every VM in a resource group
+    /diagnose/fleet                     the whole subscription
+    /healthz                            liveness
+
+The Azure client, agents, finding store and pooled OpenAI connections are
+created once and stay warm between requests, and the joined fleet snapshot is
+reused for API_SNAPSHOT_TTL_SECONDS. Concurrent identical requests are
+coalesced: a burst of calls for the same VM runs one analysis and every caller
+gets its result ("coalesced": true for the ones that waited).
+
+Run with:
+    python src/api.py --port 8081
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.agents.diagnostic_agent import DiagnosticAgent
+from src.agents.finding_store import FindingStore
+from src.agents.resolution_agent import ResolutionAgent
+from src.agents.triage import triage_fleet
+from src.metrics import api_coalesced_requests, api_request_duration, api_requests
+from src.services.azure_client import AzureClient
+from src.services.fleet_collector import collect_fleet
+from src.services.mock_openai_server import MockOpenAIConfig, MockOpenAIServer
+from src.utils.deadline import Deadline
+from src.utils.logger import log
+from src.utils.singleflight import SingleFlight
+
+load_dotenv()
+
+SCOPE_VM = "vm"
+SCOPE_RESOURCE_GROUP = "resource-group"
+SCOPE_FLEET = "fleet"
+SCOPES = (SCOPE_VM, SCOPE_RESOURCE_GROUP, SCOPE_FLEET)
+
+
+class DiagnosticService:
+    """
+    Warm agents plus a short-lived fleet snapshot, shared by all API requests
+
+    Settings default to API_SNAPSHOT_TTL_SECONDS and API_BUDGET_SECONDS (time
+    budget per diagnosis, 0 = unbounded). Each budget is split between fetch,
+    diagnosis and resolution by STAGE_FETCH_SHARE and STAGE_DIAGNOSE_SHARE,
+    as for a run.
+    """
+
+    def __init__(
+        self,
+        azure_client: Optional[AzureClient] = None,
+        diagnostic_agent: Optional[DiagnosticAgent] = None,
+        resolution_agent: Optional[ResolutionAgent] = None,
+        finding_store: Optional[FindingStore] = None,
+        snapshot_ttl: Optional[float] = None,
+        budget_seconds: Optional[float] = None
+    ):
+        self.azure_client = azure_client or AzureClient()
+        self.diagnostic_agent = diagnostic_agent or DiagnosticAgent()
+        self.resolution_agent = resolution_agent or ResolutionAgent()
+        self.finding_store = finding_store
+        self.snapshot_ttl = snapshot_ttl if snapshot_ttl is not None else \
+            float(os.getenv("API_SNAPSHOT_TTL_SECONDS", "30"))
+        self.budget_seconds = budget_seconds if budget_seconds is not None else \
+            float(os.getenv("API_BUDGET_SECONDS", "60"))
+        # Split of each request's budget, shared with main's run_cycle
+        self.fetch_share = float(os.getenv("STAGE_FETCH_SHARE", "0.2"))
+        self.diagnose_share = float(os.getenv("STAGE_DIAGNOSE_SHARE", "0.6"))
+        self.flights = SingleFlight()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._snapshot_at = 0.0
+        self._snapshot_lock = threading.Lock()
+
+    def diagnose(self, scope: str, target: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Diagnose a VM, resource group or the fleet, joining an identical request in flight
+
+        Raises:
+            ValueError: Unknown scope or missing target
+            LookupError: No VMs match the target
+        """
+        if scope not in SCOPES:
+            raise ValueError(f"unknown scope '{scope}'")
+        if scope != SCOPE_FLEET and not target:
+            raise ValueError(f"scope '{scope}' needs a target name")
+        key = (scope, (target or "").lower())
+        result, shared = self.flights.do(key, lambda: self._diagnose(scope, target))
+        if shared:
+            api_coalesced_requests.labels(scope=scope).inc()
+            log.info("api.request_coalesced", scope=scope, target=target)
+        return dict(result, coalesced=shared)
+
+    def fleet(self, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """
+        Joined fleet snapshot, refreshed at most once per snapshot TTL
+
+        Args:
+            deadline: Bounds the ARM calls of a refresh (requests joining a
+                refresh already in flight share the first caller's deadline)
+        """
+        with self._snapshot_lock:
+            if self._snapshot is not None and time.monotonic() - self._snapshot_at < self.snapshot_ttl:
+                return self._snapshot
+        vm_data, _ = self.flights.do("snapshot",
+                                     lambda: collect_fleet(self.azure_client, deadline=deadline).vm_data())
+        if not vm_data.get("error"):
+            with self._snapshot_lock:
+                self._snapshot, self._snapshot_at = vm_data, time.monotonic()
+        return vm_data
+
+    def _select(self, vms: List[Dict[str, Any]], scope: str, target: Optional[str]) -> List[Dict[str, Any]]:
+        if scope == SCOPE_FLEET:
+            return vms
+        wanted = (target or "").lower()
+        field = "name" if scope == SCOPE_VM else "resourceGroup"
+        return [vm for vm in vms if str(vm.get(field, "")).lower() == wanted]
+
+    def _diagnose(self, scope: str, target: Optional[str]) -> Dict[str, Any]:
+        started = time.monotonic()
+        deadline = Deadline(self.budget_seconds or None, name="api")
+        fleet = self.fleet(deadline.stage("fetch", self.fetch_share))
+        if fleet.get("error"):
+            raise RuntimeError(f"Azure data unavailable: {fleet.get('message') or fleet['error']}")
+        vms = self._select(fleet.get("value", []), scope, target)
+        if not vms:
+            raise LookupError(f"no VMs found for {scope} '{target}'")
+        vm_data = dict(fleet, value=vms, count=len(vms))
+
+        triage = triage_fleet(vm_data)
+        diagnosis = triage.render()
+        if triage.needs_ai:
+            ai_data = triage.ai_payload(vm_data)
+            stage = deadline.stage("diagnose", self.diagnose_share)
+            if self.finding_store is not None:
+                analysis = self.diagnostic_agent.analyze_incremental(ai_data, self.finding_store, deadline=stage,
+                                                                     prune=False)
+            else:
+                analysis = self.diagnostic_agent.analyze(ai_data, deadline=stage)
+            diagnosis = diagnosis + "\n\n" + analysis if triage.known_issues else analysis
+
+        if triage.has_issues:
+            resolution = self.resolution_agent.suggest_fixes(diagnosis, deadline=deadline.stage("resolve"))
+        else:
+            resolution = "No issues detected - no remediation required."
+
+        return {
+            "scope": scope,
+            "target": target,
+            "vms": [vm.get("name") for vm in vms],
+            "triage": {"healthy": len(triage.healthy), "known_issue_vms": len(triage.known_issue_vms),
+                       "needs_ai": len(triage.needs_ai)},
+            "diagnosis": diagnosis,
+            "resolution": resolution,
+            "stale_data": bool(fleet.get("stale")),
+            "duration_seconds": round(time.monotonic() - started, 3),
+        }
+
+
+class _APIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_APIHTTPServer"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parts = [unquote(part) for part in self.path.split("?", 1)[0].strip("/").split("/") if part]
+        if parts == ["healthz"]:
+            self._send_json(200, {"status": "ok"})
+            return
+        if len(parts) < 2 or parts[0] != "diagnose" or parts[1] not in SCOPES:
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        scope, target = parts[1], "/".join(parts[2:]) or None
+        started = time.monotonic()
+        status = 200
+        try:
+            payload = self.server.service.diagnose(scope, target)
+        except ValueError as e:
+            status, payload = 400, {"error": str(e)}
+        except LookupError as e:
+            status, payload = 404, {"error": str(e)}
+        except Exception as e:
+            log.error("api.request_failed", scope=scope, target=target, error=str(e))
+            status, payload = 500, {"error": f"⚠️ Diagnosis failed: {str(e)}"}
+        api_requests.labels(scope=scope, status=str(status)).inc()
+        api_request_duration.labels(scope=scope).observe(time.monotonic() - started)
+        self._send_json(status, payload)
+
+    def do_POST(self):
+        # Bodies are not used; drain them so keep-alive connections stay in sync
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.do_GET()
+
+
+class _APIHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service: DiagnosticService):
+        super().__init__(address, _APIHandler)
+        self.service = service
+
+
+class DiagnosticsAPI:
+    """
+    In-process diagnostics API server
+
+    Usage:
+        with DiagnosticsAPI(DiagnosticService(), port=8081) as api:
+            requests.get(f"{api.base_url}/diagnose/vm/vm-web-01")
+    """
+
+    def __init__(self, service: DiagnosticService, host: str = "127.0.0.1", port: int = 0):
+        self.service = service
+        self._httpd = _APIHTTPServer((host, port), service)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "DiagnosticsAPI":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        log.info("api.started", base_url=self.base_url)
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        log.info("api.stopped")
+
+    def __enter__(self) -> "DiagnosticsAPI":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="On-demand Azure RDP diagnostics API")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8081")))
+    args = parser.parse_args()
+
+    if os.getenv("MOCK_OPENAI", "0").lower() in ("1", "true", "yes"):
+        mock_openai = MockOpenAIServer(MockOpenAIConfig.from_env()).start()
+        os.environ["OPENAI_BASE_URL"] = mock_openai.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "mock-openai-key")
+        print(f"📦 MOCK OPENAI: Agents use local mock server at {mock_openai.base_url}")
+
+    finding_store = None
+    if os.getenv("ENABLE_INCREMENTAL", "true").lower() in ("1", "true", "yes"):
+        finding_store = FindingStore(os.getenv("FINDINGS_STORE_PATH", ".agent_state/findings.json"),
+                                     float(os.getenv("FINDING_TTL_SECONDS", "86400")))
+    api = DiagnosticsAPI(DiagnosticService(finding_store=finding_store), args.host, args.port).start()
+    print(f"Diagnostics API listening on {api.base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        api.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Coordinator - Multi-tenant scanning on a pool of worker processes
+
+One process is bound by the GIL for JSON parsing, prompt building and rule
+evaluation, so scans of many tenants/subscriptions are spread over a process
+pool. Each worker keeps its own warm AzureClient per tenant/subscription and
+one pair of agents (with their pooled OpenAI connections) for as long as the
+pool lives; the coordinator only submits ScanJobs and aggregates the results.
+The OpenAI rate limits are divided between workers so the pool as a whole
+stays within OPENAI_RPM_LIMIT / OPENAI_TPM_LIMIT.
+
+Jobs come from a JSON file (TENANTS_FILE) holding a list of:
+    {"name": "contoso-prod", "subscription_id": "...", "tenant_id": "...",
+     "client_id": "...", "client_secret_env": "CONTOSO_CLIENT_SECRET"}
+Secrets are never stored in the file; client_secret_env names the variable
+holding each one. A job that names any credential must name all three and have
+its secret set, or it fails; it never falls back to the AZURE_* environment, a
+CLI login or MOCK data. A job without credentials must set "auth_mode" (MOCK,
+CLI or SERVICE_PRINCIPAL from the AZURE_* environment) instead of relying on
+auto-detection. Either way a failed login fails the job rather than falling
+back to MOCK. Run with:
+    python src/coordinator.py --tenants-file tenants.json --workers 8 [--interval 300]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.metrics import coordinator_job_duration, coordinator_jobs
+from src.utils.logger import log
+
+load_dotenv()
+
+
+@dataclass(frozen=True)
+class ScanJob:
+    """One tenant/subscription to scan; the client secret is read from client_secret_env in the worker"""
+    name: str
+    subscription_id: str
+    tenant_id: Optional[str] = None
+    client_id: Optional[str] = None
+    client_secret_env: Optional[str] = None
+    auth_mode: Optional[str] = None
+
+    @property
+    def names_credentials(self) -> bool:
+        """Whether the job names its own service principal (then all of it is required)"""
+        return any((self.tenant_id, self.client_id, self.client_secret_env))
+
+    @property
+    def client_key(self) -> Tuple[Optional[str], str, Optional[str]]:
+        return self.tenant_id, self.subscription_id, self.client_id
+
+
+@dataclass
+class CoordinatorReport:
+    """Aggregated results of one pass over every job"""
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    duration_seconds: float = 0.0
+
+    @property
+    def failed(self) -> List[Dict[str, Any]]:
+        return [result for result in self.results if result.get("error")]
+
+    @property
+    def total_vms(self) -> int:
+        return sum(len(result.get("vms", [])) for result in self.results)
+
+    def render(self) -> str:
+        lines = [f"{len(self.results)} subscriptions, {self.total_vms} VMs, "
+                 f"{len(self.failed)} failed in {self.duration_seconds:.2f}s"]
+        for result in sorted(self.results, key=lambda r: r["job"]):
+            if result.get("error"):
+                lines.append(f"  ❌ {result['job']}: {result['error']}")
+                continue
+            triage = result.get("triage", {})
+            lines.append(f"  ✓ {result['job']}: {len(result['vms'])} VMs ({triage.get('healthy', 0)} healthy, "
+                         f"{triage.get('known_issue_vms', 0)} known issues, {triage.get('needs_ai', 0)} AI-analyzed) "
+                         f"in {result['duration_seconds']:.2f}s [pid {result['worker_pid']}]")
+        return "\n".join(lines)
+
+
+def load_jobs(path: str) -> List[ScanJob]:
+    """Read ScanJobs from a JSON list of tenant/subscription entries"""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    return [ScanJob(**entry) for entry in entries]
+
+
+# Per-worker-process state: DiagnosticService per tenant/subscription, sharing one agent pair
+_services: Dict[Tuple[Optional[str], str, Optional[str]], Any] = {}
+_agents: Optional[Tuple[Any, Any]] = None
+
+
+def _init_worker(rpm_share: float, tpm_share: float):
+    """Process pool initializer: per-worker rate-limit share and fresh shared clients"""
+    from src.services.circuit_breaker import reset_breakers
+    from src.services.llm_client import reset_clients
+    from src.services.rate_limiter import reset_rate_limiter
+
+    os.environ["OPENAI_RPM_LIMIT"] = str(rpm_share)
+    os.environ["OPENAI_TPM_LIMIT"] = str(tpm_share)
+    # Anything inherited through fork belongs to the parent's threads and sockets
+    reset_clients()
+    reset_breakers()
+    reset_rate_limiter()
+    log.info("coordinator.worker_started", pid=os.getpid(), rpm=rpm_share, tpm=tpm_share)
+
+
+def _job_secret(job: ScanJob) -> str:
+    """
+    The client secret for a job that names its credentials
+
+    Raises:
+        ValueError: A credential field is missing or the secret variable is unset
+    """
+    missing = [field_name for field_name in ("tenant_id", "client_id", "client_secret_env")
+               if not getattr(job, field_name)]
+    if missing:
+        raise ValueError(f"incomplete credentials, missing {', '.join(missing)}")
+    secret = os.getenv(job.client_secret_env)
+    if not secret:
+        raise ValueError(f"client secret variable {job.client_secret_env} is not set")
+    return secret
+
+
+def _service_for(job: ScanJob):
+    global _agents
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    from src.agents.resolution_agent import ResolutionAgent
+    from src.api import DiagnosticService
+    from src.services.azure_client import AzureClient
+
+    service = _services.get(job.client_key)
+    if service is None:
+        if job.names_credentials:
+            # A job that names its own service principal is scanned with it or
+            # not at all - never with the AZURE_* environment, a CLI login or MOCK data
+            client = AzureClient(
+                subscription_id=job.subscription_id,
+                tenant_id=job.tenant_id,
+                client_id=job.client_id,
+                client_secret=_job_secret(job),
+                auth_mode=job.auth_mode or "SERVICE_PRINCIPAL",
+                allow_fallback=False
+            )
+        else:
+            # Auto-detection would scan with whatever identity the worker's environment holds
+            if not job.auth_mode or job.auth_mode.upper() == "AUTO":
+                raise ValueError("no credentials named, so auth_mode (MOCK, CLI or SERVICE_PRINCIPAL) is required")
+            client = AzureClient(subscription_id=job.subscription_id, auth_mode=job.auth_mode,
+                                 allow_fallback=False)
+        if _agents is None:
+            _agents = (DiagnosticAgent(), ResolutionAgent())
+        # Scans always read fresh fleet data; the warm part is the clients and agents
+        service = _services[job.client_key] = DiagnosticService(client, *_agents, snapshot_ttl=0)
+    return service
+
+
+def scan_job(job: ScanJob) -> Dict[str, Any]:
+    """Worker entry point: diagnose one subscription's fleet; failures are returned, not raised"""
+    started = time.monotonic()
+    base = {"job": job.name, "subscription_id": job.subscription_id, "worker_pid": os.getpid()}
+    try:
+        result = dict(base, **_service_for(job).diagnose("fleet"))
+        result["duration_seconds"] = time.monotonic() - started
+        return result
+    except Exception as e:
+        log.error("coordinator.job_failed", job=job.name, error=str(e), error_type=type(e).__name__)
+        return dict(base, vms=[], error=f"⚠️ Scan failed: {str(e)}", duration_seconds=time.monotonic() - started)
+
+
+class Coordinator:
+    """
+    Distributes ScanJobs over a pool of warm worker processes
+
+    Args:
+        jobs: Tenants/subscriptions to scan on every pass
+        workers: Pool size (defaults to COORDINATOR_WORKERS, then the CPU count)
+        start_method: multiprocessing start method (WORKER_START_METHOD, default 'spawn',
+            which avoids inheriting the parent's threads and open connections)
+    """
+
+    def __init__(self, jobs: List[ScanJob], workers: Optional[int] = None, start_method: Optional[str] = None):
+        self.jobs = list(jobs)
+        self.workers = workers or int(os.getenv("COORDINATOR_WORKERS", "0")) or os.cpu_count() or 1
+        self.workers = max(1, min(self.workers, len(self.jobs) or 1))
+        rpm = float(os.getenv("OPENAI_RPM_LIMIT", "500")) / self.workers
+        tpm = float(os.getenv("OPENAI_TPM_LIMIT", "200000")) / self.workers
+        context = multiprocessing.get_context(start_method or os.getenv("WORKER_START_METHOD", "spawn"))
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                         initializer=_init_worker, initargs=(rpm, tpm))
+
+    def run_once(self) -> CoordinatorReport:
+        """Scan every job once and aggregate the results"""
+        started = time.monotonic()
+        report = CoordinatorReport()
+        log.info("coordinator.pass_started", jobs=len(self.jobs), workers=self.workers)
+        futures = {self._pool.submit(scan_job, job): job for job in self.jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. killed); the pool may need restarting
+                result = {"job": job.name, "subscription_id": job.subscription_id, "worker_pid": None,
+                          "vms": [], "error": f"⚠️ Worker failed: {str(e)}", "duration_seconds": 0.0}
+            status = "failed" if result.get("error") else "success"
+            coordinator_jobs.labels(status=status).inc()
+            coordinator_job_duration.observe(result["duration_seconds"])
+            report.results.append(result)
+        report.duration_seconds = time.monotonic() - started
+        log.info("coordinator.pass_complete", jobs=len(report.results), failed=len(report.failed),
+                 vms=report.total_vms, duration_seconds=round(report.duration_seconds, 3))
+        return report
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "Coordinator":
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan many tenants/subscriptions on a worker process pool")
+    parser.add_argument("--tenants-file", default=os.getenv("TENANTS_FILE", "tenants.json"))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--interval", type=float, default=0.0,
+                        help="Repeat every N seconds with the same warm workers (0 = run once)")
+    parser.add_argument("--output", default=None, help="Write aggregated results as JSON to this file")
+    args = parser.parse_args()
+
+    jobs = load_jobs(args.tenants_file)
+    if os.getenv("MOCK_OPENAI", "0").lower() in ("1", "true", "yes"):
+        from src.services.mock_openai_server import MockOpenAIConfig, MockOpenAIServer
+        # Started before the pool so spawned workers inherit OPENAI_BASE_URL
+        mock_openai = MockOpenAIServer(MockOpenAIConfig.from_env()).start()
+        os.environ["OPENAI_BASE_URL"] = mock_openai.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "mock-openai-key")
+        print(f"📦 MOCK OPENAI: Workers use local mock server at {mock_openai.base_url}")
+    with Coordinator(jobs, workers=args.workers) as coordinator:
+        print(f"🏢 Scanning {len(jobs)} subscriptions on {coordinator.workers} worker processes")
+
+        def scan_pass():
+            report = coordinator.run_once()
+            print(report.render())
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    json.dump({"duration_seconds": report.duration_seconds, "results": report.results}, f, indent=2)
+
+        if args.interval > 0:
+            from src.scheduler import CycleScheduler
+            scheduler = CycleScheduler(scan_pass, args.interval)
+            scheduler.install_signal_handlers()
+            scheduler.run()
+        else:
+            scan_pass()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,8 +10,9 @@ import os
 import sys
 import time
 import codecs
+from typing import Optional
 from dotenv import load_dotenv
-from prometheus_client import start_http_server, Counter, Gauge, Histogram
+from prometheus_client import REGISTRY, start_http_server, Counter, Gauge, Histogram
 
 # Fix Windows console encoding for Unicode support
 if sys.platform == 'win32':
@@ -23,7 +24,18 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from src.agents.diagnostic_agent import DiagnosticAgent
 from src.agents.resolution_agent import ResolutionAgent
+from src.agents.finding_store import FindingStore
+from src.agents.pipeline import diagnose_and_resolve
+from src.agents.scan_scheduler import TieredScanScheduler
+from src.agents.stream_pipeline import StreamPipeline
+from src.agents.triage import triage_fleet
+from src.metrics import REGISTRY as AGENT_REGISTRY
+from src.scheduler import CycleScheduler
 from src.services.azure_client import AzureClient
+from src.services.fleet_collector import collect_fleet
+from src.services.llm_client import run_async
+from src.services.mock_openai_server import MockOpenAIConfig, MockOpenAIServer
+from src.utils.deadline import Deadline
 from src.utils.logger import log
 
 # Load environment variables
@@ -32,10 +44,44 @@ load_dotenv()
 # Check if running in mock mode
 MOCK_MODE = os.getenv('MOCK_MODE', '0').lower() in ('1', 'true', 'yes')
 
+# Run the AI path against a local mock OpenAI server (no network, no API key)
+MOCK_OPENAI = os.getenv('MOCK_OPENAI', '0').lower() in ('1', 'true', 'yes')
+
+# Rules-first triage: only VMs the rules cannot explain are sent to the LLM
+ENABLE_TRIAGE = os.getenv('ENABLE_TRIAGE', 'true').lower() in ('1', 'true', 'yes')
+
+# Incremental diagnosis: reuse cached findings for VMs whose configuration is unchanged
+ENABLE_INCREMENTAL = os.getenv('ENABLE_INCREMENTAL', 'true').lower() in ('1', 'true', 'yes')
+FINDINGS_STORE_PATH = os.getenv('FINDINGS_STORE_PATH', '.agent_state/findings.json')
+FINDING_TTL_SECONDS = float(os.getenv('FINDING_TTL_SECONDS', '86400'))
+
+# Pipelined mode: resolution for each diagnostic chunk starts as soon as that chunk is done
+ENABLE_PIPELINE = os.getenv('ENABLE_PIPELINE', 'false').lower() in ('1', 'true', 'yes')
+
+# Streaming mode: collect → triage → diagnose → resolve → report in VM batches over bounded
+# queues (STREAM_* sizes), so large estates run in constant memory; reports are per batch
+ENABLE_STREAMING = os.getenv('ENABLE_STREAMING', 'false').lower() in ('1', 'true', 'yes')
+
+# Per-run time budget (RUN_BUDGET_SECONDS, 0 = unbounded): each stage gets a share of
+# the time still left when it starts; resolution gets whatever remains
+STAGE_FETCH_SHARE = float(os.getenv('STAGE_FETCH_SHARE', '0.2'))
+STAGE_DIAGNOSE_SHARE = float(os.getenv('STAGE_DIAGNOSE_SHARE', '0.6'))
+
+# Daemon mode: repeat the cycle every CYCLE_INTERVAL_SECONDS (plus up to CYCLE_JITTER_SECONDS)
+# instead of running once; each cycle's budget is capped at the interval
+DAEMON_MODE = os.getenv('DAEMON_MODE', 'false').lower() in ('1', 'true', 'yes')
+CYCLE_INTERVAL_SECONDS = float(os.getenv('CYCLE_INTERVAL_SECONDS', '300'))
+CYCLE_JITTER_SECONDS = float(os.getenv('CYCLE_JITTER_SECONDS', '15'))
+
+# Tiered scans (daemon mode): each cycle only scans the VMs due under their tier's interval,
+# up to SCAN_BUDGET_PER_CYCLE; set CYCLE_INTERVAL_SECONDS to the critical tier's interval
+ENABLE_TIERED_SCANS = os.getenv('ENABLE_TIERED_SCANS', 'false').lower() in ('1', 'true', 'yes')
+
 # Prometheus Metrics
 agent_runs = Counter('agent_runs_total', 'Total times the agent has run')
 agent_errors = Counter('agent_errors_total', 'Total errors encountered')
 vms_monitored = Gauge('azure_vms_monitored', 'Number of Azure VMs being monitored')
+llm_calls_skipped = Counter('triage_llm_calls_skipped_total', 'AI analyses skipped because triage resolved every VM')
 analysis_duration = Histogram('analysis_duration_seconds', 'Time spent on AI analysis')
 
 
@@ -57,6 +103,262 @@ def print_section(title: str):
     print('='*70)
 
 
+def fetch_vm_nsgs(azure_client: AzureClient, vm_data: dict, deadline: Optional[Deadline] = None) -> dict:
+    """Fetch the '<vm>-nsg' NSG for each VM; VMs without one, or left when the deadline passes, are left out"""
+    nsg_by_vm = {}
+    for vm in vm_data.get("value", []):
+        if deadline is not None and deadline.expired:
+            log.warning("azure.nsg_fetch_partial", fetched=len(nsg_by_vm), vms=len(vm_data.get("value", [])))
+            break
+        name = vm.get("name", "")
+        parts = vm.get("id", "").split("/")
+        resource_group = parts[parts.index("resourceGroups") + 1] if "resourceGroups" in parts else "rg-demo"
+        nsg = azure_client.get_nsg_rules(resource_group=resource_group, nsg_name=f"{name}-nsg", deadline=deadline)
+        if not nsg.get("error"):
+            nsg_by_vm[name] = nsg
+    return nsg_by_vm
+
+
+def run_cycle(
+    azure_client: AzureClient,
+    diagnostic_agent: Optional[DiagnosticAgent],
+    resolution_agent: Optional[ResolutionAgent],
+    finding_store: Optional[FindingStore],
+    budget_seconds: Optional[float] = None,
+    scan_scheduler: Optional[TieredScanScheduler] = None
+):
+    """
+    One fetch -> triage -> diagnose -> resolve pass over the subscription
+    
+    Args:
+        budget_seconds: Time budget for the pass (defaults to RUN_BUDGET_SECONDS)
+        scan_scheduler: When given, only the VMs it reports due are scanned
+    """
+    agent_runs.inc()
+    run_deadline = Deadline(budget_seconds, name="run") if budget_seconds is not None else Deadline.from_env()
+    
+    if ENABLE_STREAMING and not MOCK_MODE and diagnostic_agent and resolution_agent:
+        run_streaming(azure_client, diagnostic_agent, resolution_agent, run_deadline)
+        return
+    
+    # Fetch Azure Data
+    print_section("[AZURE] Fetching Azure Resource Data")
+    
+    start_time = time.time()
+    fetch_deadline = run_deadline.stage("fetch", STAGE_FETCH_SHARE)
+    
+    subscription_info = azure_client.get_subscription_info()
+    log.info("azure.subscription_info", info=subscription_info)
+    
+    # VMs, resource groups, NSGs and instance views are fetched concurrently and joined
+    snapshot = collect_fleet(azure_client, deadline=fetch_deadline)
+    vm_data = snapshot.vm_data()
+    fetch_duration = time.time() - start_time
+    
+    # Initialize vm_count with default value
+    vm_count = 0
+    
+    if vm_data.get("error"):
+        print(f"[ERROR] Error fetching VMs: {vm_data.get('message')}")
+        log.error("azure.fetch_failed", error=vm_data)
+    else:
+        vm_count = len(vm_data.get("value", []))
+        vms_monitored.set(vm_count)
+        
+        is_simulation = vm_data.get("simulation", False)
+        mode_indicator = "🔵 SIMULATION MODE" if is_simulation else "🟢 LIVE DATA"
+        
+        print(f"{mode_indicator}")
+        print(f"[OK] Fetched {vm_count} VMs in {fetch_duration:.2f}s")
+        print("   Sources: " + ", ".join(f"{source} {seconds:.2f}s" + (" (failed)" if source in snapshot.errors else "")
+                                        for source, seconds in snapshot.timings.items()))
+        
+        log.info("azure.data_fetched", 
+                 vm_count=vm_count,
+                 simulation=is_simulation,
+                 duration_seconds=fetch_duration)
+        
+        if scan_scheduler is not None:
+            vm_data = scan_scheduler.plan(vm_data)
+            tiers = ", ".join(f"{count} {tier}" for tier, count in scan_scheduler.tier_counts().items())
+            print(f"[SCAN] {len(vm_data['value'])} of {vm_count} VMs due this cycle (tiers: {tiers})")
+            if not vm_data["value"]:
+                log.info("system.completed", status="nothing_due", vms_monitored=vm_count)
+                return
+        
+    # Quick health analysis
+    if MOCK_MODE:
+        health = {"total": 2, "running": 1, "stopped": 1, "issues": 1}
+    else:
+        health = diagnostic_agent.quick_health_check(vm_data) if diagnostic_agent else {}
+        print(f"\n[INFO] Quick Health Check:")
+        print(f"   Total VMs: {health['total_vms']}")
+        print(f"   Running: {health['running_vms']}")
+        print(f"   Stopped: {health['stopped_vms']}")
+        print(f"   Regions: {', '.join(health['locations'])}")
+        if health['issues']:
+            print(f"   [WARNING] Issues found: {len(health['issues'])}")
+    
+    # Rules-first triage
+    triage = None
+    if ENABLE_TRIAGE and not vm_data.get("error"):
+        print_section("[TRIAGE] Rules-Based Pre-Triage")
+        # Per-VM NSG lookups only when the subscription-wide NSG list failed
+        nsg_by_vm = fetch_vm_nsgs(azure_client, vm_data, fetch_deadline) if "nsgs" in snapshot.errors else None
+        triage = triage_fleet(vm_data, nsg_by_vm)
+        print(triage.render())
+        if scan_scheduler is not None:
+            scan_scheduler.record_incidents(vm["name"] for vm in triage.known_issue_vms + triage.needs_ai)
+    
+    # AI Diagnostic Analysis
+    print_section("🧠 Running AI Diagnostic Analysis")
+    
+    resolution_steps = None
+    if MOCK_MODE:
+        print("📦 MOCK MODE: Using simulated AI analysis...")
+        diagnostic_summary = "Mock diagnostic analysis completed. Found 1 VM stopped (vm-db-01) and potential NSG issues for RDP access on vm-web-01."
+    elif triage and not triage.needs_ai:
+        print("✓ Triage explained every VM - no AI analysis needed")
+        llm_calls_skipped.inc()
+        diagnostic_summary = triage.render()
+    else:
+        ai_data = triage.ai_payload(vm_data) if triage else vm_data
+        print(f"⏳ Analyzing {len(ai_data.get('value', []))} VMs with OpenAI GPT-4o-mini...")
+        with analysis_duration.time():
+            if not diagnostic_agent:
+                diagnostic_summary = "No diagnostic agent available"
+            elif ENABLE_PIPELINE and resolution_agent:
+                print("⏳ Pipelined mode: generating fixes per chunk as findings arrive...")
+                pipeline = run_async(diagnose_and_resolve(ai_data, diagnostic_agent, resolution_agent, triage,
+                                                            deadline=run_deadline.stage("pipeline")))
+                diagnostic_summary = pipeline.diagnostic_summary
+                resolution_steps = pipeline.resolution_steps
+                print(f"✓ Diagnosis and resolution finished in {pipeline.duration_seconds:.2f}s")
+            elif finding_store:
+                # Findings of VMs left out by the scan scheduler or triage are still
+                # valid, so only a pass over the whole fleet may prune the store
+                diagnostic_summary = diagnostic_agent.analyze_incremental(
+                    ai_data, finding_store, deadline=run_deadline.stage("diagnose", STAGE_DIAGNOSE_SHARE),
+                    prune=len(ai_data.get("value", [])) == vm_count)
+            else:
+                diagnostic_summary = diagnostic_agent.analyze(
+                    ai_data, deadline=run_deadline.stage("diagnose", STAGE_DIAGNOSE_SHARE))
+        if triage and triage.known_issues and resolution_steps is None:
+            diagnostic_summary = triage.render() + "\n\n" + diagnostic_summary
+    
+    print("\n" + "─" * 70)
+    print("📋 DIAGNOSTIC REPORT")
+    print("─" * 70)
+    print(diagnostic_summary)
+    print("─" * 70)
+    
+    log.info("diagnostic.completed", summary_length=len(diagnostic_summary))
+    
+    # Generate Resolution Steps
+    print_section("🔧 Generating Resolution Steps")
+    
+    if MOCK_MODE:
+        print("📦 MOCK MODE: Using simulated resolution steps...")
+        resolution_steps = "Mock resolution steps: 1) Start vm-db-01 if needed, 2) Add NSG rule for RDP (port 3389) on vm-web-01, 3) Validate connectivity."
+    elif resolution_steps is not None:
+        print("✓ Resolution steps already generated by the pipeline")
+    elif triage and not triage.has_issues:
+        print("✓ All VMs healthy - no fixes required")
+        resolution_steps = "No issues detected - no remediation required."
+    else:
+        print("⏳ Generating fixes with AI...")
+        resolution_steps = resolution_agent.suggest_fixes(
+            diagnostic_summary, deadline=run_deadline.stage("resolve")) if resolution_agent else "No resolution agent available"
+    
+    print("\n" + "─" * 70)
+    print("[ACTION PLAN] RECOMMENDED FIXES & ACTION PLAN")
+    print("─" * 70)
+    print(resolution_steps)
+    print("─" * 70)
+    
+    log.info("resolution.completed", steps_length=len(resolution_steps))
+    
+    # Summary
+    print_section("[SUMMARY] Execution Summary")
+    print(f"✓ Azure data fetched successfully")
+    print(f"✓ AI diagnostic analysis completed")
+    print(f"✓ Resolution steps generated")
+    if run_deadline.expired:
+        print(f"⚠️ Run budget exhausted after {run_deadline.elapsed:.0f}s - results above are partial")
+    print(f"\n[METRICS] Metrics available at: http://localhost:8000")
+    print(f"📝 All actions logged in JSON format")
+    
+    log.info("system.completed",
+             status="success",
+             vms_analyzed=vm_count,
+             total_duration_seconds=time.time() - start_time,
+             deadline_expired=run_deadline.expired)
+
+
+def run_streaming(
+    azure_client: AzureClient,
+    diagnostic_agent: DiagnosticAgent,
+    resolution_agent: ResolutionAgent,
+    run_deadline: Deadline
+):
+    """One pass as a staged stream of VM batches; each batch's report is printed when ready"""
+    print_section("[STREAM] Staged Streaming Run")
+    pipeline = StreamPipeline(azure_client, diagnostic_agent, resolution_agent,
+                              sink=lambda section: print("\n" + section + "\n" + "─" * 70))
+    config = pipeline.config
+    print(f"⏳ Batches of {config.batch_size} VMs, queues of {config.queue_size}, workers: "
+          + ", ".join(f"{stage} {count}" for stage, count in config.workers.items()))
+    summary = run_async(pipeline.run(deadline=run_deadline))
+    vms_monitored.set(summary.vms)
+    
+    print_section("[SUMMARY] Execution Summary")
+    print(f"✓ {summary.vms} VMs in {summary.batches} batches streamed in {summary.duration_seconds:.2f}s")
+    print(f"✓ {summary.batches_with_issues} batches with issues, {summary.failed_batches} with failed AI stages")
+    for error in summary.errors:
+        print(f"⚠️ {error}")
+    if run_deadline.expired:
+        print(f"⚠️ Run budget exhausted after {run_deadline.elapsed:.0f}s - results above are partial")
+    
+    log.info("system.completed",
+             status="success" if not summary.errors else "partial",
+             mode="streaming",
+             vms_analyzed=summary.vms,
+             batches=summary.batches,
+             total_duration_seconds=summary.duration_seconds,
+             deadline_expired=run_deadline.expired)
+
+
+def run_daemon(
+    azure_client: AzureClient,
+    diagnostic_agent: Optional[DiagnosticAgent],
+    resolution_agent: Optional[ResolutionAgent],
+    finding_store: Optional[FindingStore]
+):
+    """Run cycles on a fixed cadence until SIGINT/SIGTERM, finishing the cycle in progress"""
+    budget = min(float(os.getenv('RUN_BUDGET_SECONDS', '300')) or CYCLE_INTERVAL_SECONDS, CYCLE_INTERVAL_SECONDS)
+    scan_scheduler = TieredScanScheduler() if ENABLE_TIERED_SCANS else None
+    
+    def cycle():
+        try:
+            run_cycle(azure_client, diagnostic_agent, resolution_agent, finding_store, budget_seconds=budget,
+                      scan_scheduler=scan_scheduler)
+        except Exception:
+            agent_errors.inc()
+            raise
+    
+    scheduler = CycleScheduler(cycle, CYCLE_INTERVAL_SECONDS, CYCLE_JITTER_SECONDS)
+    scheduler.install_signal_handlers()
+    print_section("[DAEMON] Continuous Monitoring")
+    print(f"🔄 Running every {CYCLE_INTERVAL_SECONDS:.0f}s (+ up to {CYCLE_JITTER_SECONDS:.0f}s jitter), "
+          f"{budget:.0f}s budget per cycle. Press Ctrl+C to stop after the current cycle.")
+    if scan_scheduler is not None:
+        intervals = ", ".join(f"{tier} every {seconds:.0f}s" for tier, seconds in scan_scheduler.intervals.items())
+        print(f"🎯 Tiered scans: {intervals}, at most {scan_scheduler.budget or 'all'} VMs per cycle")
+    scheduler.run()
+    print(f"\n\n👋 Shut down after {scheduler.cycles} cycles ({scheduler.skipped} skipped)")
+    log.info("system.shutdown", reason="Daemon stopped", cycles=scheduler.cycles, skipped=scheduler.skipped)
+
+
 def main():
     """Main application entry point"""
     
@@ -67,6 +369,8 @@ def main():
     # Start Prometheus metrics server
     try:
         metrics_port = 8000
+        # Serve the agent registry (LLM, breaker and cycle metrics) alongside the defaults
+        REGISTRY.register(AGENT_REGISTRY)
         start_http_server(metrics_port)
         log.info("metrics.started", port=metrics_port)
         print(f"\n[METRICS] Server started on http://localhost:{metrics_port}")
@@ -77,6 +381,12 @@ def main():
     # Initialize components
     print_section("[INIT] Initializing Components")
     
+    if MOCK_OPENAI and not MOCK_MODE:
+        mock_openai = MockOpenAIServer(MockOpenAIConfig.from_env()).start()
+        os.environ["OPENAI_BASE_URL"] = mock_openai.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "mock-openai-key")
+        print(f"📦 MOCK OPENAI: Agents use local mock server at {mock_openai.base_url}")
+    
     try:
         azure_client = AzureClient()
         print(f"[OK] Azure Client initialized")
@@ -95,6 +405,8 @@ def main():
             resolution_agent = ResolutionAgent()
             print(f"✅ Resolution Agent initialized (Model: {resolution_agent.model})")
         
+        finding_store = FindingStore(FINDINGS_STORE_PATH, FINDING_TTL_SECONDS) if ENABLE_INCREMENTAL else None
+        
     except Exception as e:
         log.error("initialization.failed", error=str(e))
         print(f"\n❌ Initialization failed: {e}")
@@ -103,105 +415,13 @@ def main():
         print("  2. Azure credentials are set (or run 'az login')")
         return
     
-    # Main execution loop
+    if DAEMON_MODE:
+        run_daemon(azure_client, diagnostic_agent, resolution_agent, finding_store)
+        return
+    
+    # Single run
     try:
-        agent_runs.inc()
-        
-        # Fetch Azure Data
-        print_section("[AZURE] Fetching Azure Resource Data")
-        
-        start_time = time.time()
-        
-        subscription_info = azure_client.get_subscription_info()
-        log.info("azure.subscription_info", info=subscription_info)
-        
-        vm_data = azure_client.get_vm_list()
-        fetch_duration = time.time() - start_time
-        
-        # Initialize vm_count with default value
-        vm_count = 0
-        
-        if vm_data.get("error"):
-            print(f"[ERROR] Error fetching VMs: {vm_data.get('message')}")
-            log.error("azure.fetch_failed", error=vm_data)
-        else:
-            vm_count = len(vm_data.get("value", []))
-            vms_monitored.set(vm_count)
-            
-            is_simulation = vm_data.get("simulation", False)
-            mode_indicator = "🔵 SIMULATION MODE" if is_simulation else "🟢 LIVE DATA"
-            
-            print(f"{mode_indicator}")
-            print(f"[OK] Fetched {vm_count} VMs in {fetch_duration:.2f}s")
-            
-            log.info("azure.data_fetched", 
-                     vm_count=vm_count,
-                     simulation=is_simulation,
-                     duration_seconds=fetch_duration)
-            
-            # Quick health check
-            # Quick health analysis
-        if MOCK_MODE:
-            health = {"total": 2, "running": 1, "stopped": 1, "issues": 1}
-        else:
-            health = diagnostic_agent.quick_health_check(vm_data) if diagnostic_agent else {}
-            print(f"\n[INFO] Quick Health Check:")
-            print(f"   Total VMs: {health['total_vms']}")
-            print(f"   Running: {health['running_vms']}")
-            print(f"   Stopped: {health['stopped_vms']}")
-            print(f"   Regions: {', '.join(health['locations'])}")
-            if health['issues']:
-                print(f"   [WARNING] Issues found: {len(health['issues'])}")
-        
-        # AI Diagnostic Analysis
-        print_section("🧠 Running AI Diagnostic Analysis")
-        
-        if MOCK_MODE:
-            print("📦 MOCK MODE: Using simulated AI analysis...")
-            diagnostic_summary = "Mock diagnostic analysis completed. Found 1 VM stopped (vm-db-01) and potential NSG issues for RDP access on vm-web-01."
-        else:
-            print("⏳ Analyzing with OpenAI GPT-4o-mini...")
-            with analysis_duration.time():
-                diagnostic_summary = diagnostic_agent.analyze(vm_data) if diagnostic_agent else "No diagnostic agent available"
-        
-        print("\n" + "─" * 70)
-        print("📋 DIAGNOSTIC REPORT")
-        print("─" * 70)
-        print(diagnostic_summary)
-        print("─" * 70)
-        
-        log.info("diagnostic.completed", summary_length=len(diagnostic_summary))
-        
-        # Generate Resolution Steps
-        print_section("🔧 Generating Resolution Steps")
-        
-        if MOCK_MODE:
-            print("📦 MOCK MODE: Using simulated resolution steps...")
-            resolution_steps = "Mock resolution steps: 1) Start vm-db-01 if needed, 2) Add NSG rule for RDP (port 3389) on vm-web-01, 3) Validate connectivity."
-        else:
-            print("⏳ Generating fixes with AI...")
-            resolution_steps = resolution_agent.suggest_fixes(diagnostic_summary) if resolution_agent else "No resolution agent available"
-        
-        print("\n" + "─" * 70)
-        print("[ACTION PLAN] RECOMMENDED FIXES & ACTION PLAN")
-        print("─" * 70)
-        print(resolution_steps)
-        print("─" * 70)
-        
-        log.info("resolution.completed", steps_length=len(resolution_steps))
-        
-        # Summary
-        print_section("[SUMMARY] Execution Summary")
-        print(f"✓ Azure data fetched successfully")
-        print(f"✓ AI diagnostic analysis completed")
-        print(f"✓ Resolution steps generated")
-        print(f"\n[METRICS] Metrics available at: http://localhost:8000")
-        print(f"📝 All actions logged in JSON format")
-        
-        log.info("system.completed",
-                 status="success",
-                 vms_analyzed=vm_count,
-                 total_duration_seconds=time.time() - start_time)
+        run_cycle(azure_client, diagnostic_agent, resolution_agent, finding_store)
         
     except KeyboardInterrupt:
         log.info("system.interrupted", reason="User interrupted")
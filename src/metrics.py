@@ -100,6 +100,240 @@ openai_api_latency = Histogram(
     registry=REGISTRY
 )
 
+llm_queue_depth = Gauge(
+    'llm_queue_depth',
+    'LLM requests submitted but not yet dispatched',
+    registry=REGISTRY
+)
+
+llm_queue_wait = Histogram(
+    'llm_queue_wait_seconds',
+    'Time LLM requests spent waiting for concurrency and rate-limit capacity',
+    buckets=[0.01, 0.1, 0.5, 1, 5, 15, 60],
+    registry=REGISTRY
+)
+
+llm_rate_limited = Counter(
+    'llm_rate_limited_total',
+    'LLM requests rejected with HTTP 429 by the provider',
+    registry=REGISTRY
+)
+
+llm_prompt_tokens = Counter(
+    'llm_prompt_tokens_total',
+    'Prompt tokens sent to the LLM',
+    ['purpose'],
+    registry=REGISTRY
+)
+
+llm_cached_prompt_tokens = Counter(
+    'llm_cached_prompt_tokens_total',
+    'Prompt tokens served from the provider prompt cache',
+    ['purpose'],
+    registry=REGISTRY
+)
+
+
+llm_slo_requests = Counter(
+    'llm_slo_requests_total',
+    'Blocking LLM calls run under the hedging latency SLO',
+    ['purpose'],
+    registry=REGISTRY
+)
+
+llm_hedged_requests = Counter(
+    'llm_hedged_requests_total',
+    'LLM calls that exceeded the hedge delay and got a duplicate request',
+    ['purpose'],
+    registry=REGISTRY
+)
+
+llm_hedge_wins = Counter(
+    'llm_hedge_wins_total',
+    'Hedged LLM calls where the duplicate request returned first',
+    ['purpose'],
+    registry=REGISTRY
+)
+
+llm_deadline_exceeded = Counter(
+    'llm_deadline_exceeded_total',
+    'LLM calls abandoned at the hard deadline (degraded fallback used)',
+    ['purpose'],
+    registry=REGISTRY
+)
+
+
+circuit_breaker_state = Gauge(
+    'circuit_breaker_state',
+    'Dependency circuit breaker state (0=closed, 1=half-open, 2=open)',
+    ['dependency'],
+    registry=REGISTRY
+)
+
+circuit_breaker_rejections = Counter(
+    'circuit_breaker_rejections_total',
+    'Calls rejected without reaching the dependency because its breaker was open',
+    ['dependency'],
+    registry=REGISTRY
+)
+
+
+agent_cycles = Counter(
+    'agent_cycles_total',
+    'Daemon-mode fetch/diagnose/resolve cycles run',
+    ['status'],
+    registry=REGISTRY
+)
+
+agent_cycle_duration = Histogram(
+    'agent_cycle_duration_seconds',
+    'Duration of one daemon-mode cycle',
+    buckets=[5, 15, 30, 60, 120, 300, 600],
+    registry=REGISTRY
+)
+
+agent_cycle_lag = Gauge(
+    'agent_cycle_lag_seconds',
+    'How late the last cycle started relative to its scheduled time',
+    registry=REGISTRY
+)
+
+agent_cycles_skipped = Counter(
+    'agent_cycles_skipped_total',
+    'Scheduled cycles skipped because the previous cycle overran its interval',
+    registry=REGISTRY
+)
+
+
+scan_tier_vms = Gauge(
+    'scan_tier_vms',
+    'VMs currently assigned to each scan tier',
+    ['tier'],
+    registry=REGISTRY
+)
+
+vm_scans = Counter(
+    'vm_scans_total',
+    'VMs scanned by the tiered scan scheduler',
+    ['tier'],
+    registry=REGISTRY
+)
+
+scan_overdue = Histogram(
+    'vm_scan_overdue_seconds',
+    'How long a VM had been due for a scan when it was scanned',
+    ['tier'],
+    buckets=[1, 15, 60, 120, 300, 900, 3600],
+    registry=REGISTRY
+)
+
+scan_backlog = Gauge(
+    'scan_backlog_vms',
+    'Due VMs deferred to a later cycle by the per-cycle scan budget',
+    registry=REGISTRY
+)
+
+
+collection_duration = Histogram(
+    'azure_collection_duration_seconds',
+    'Time taken by each ARM source during concurrent fleet collection',
+    ['source'],
+    buckets=[0.1, 0.5, 1, 2, 5, 10, 30],
+    registry=REGISTRY
+)
+
+collection_errors = Counter(
+    'azure_collection_errors_total',
+    'ARM sources that returned an error during fleet collection',
+    ['source'],
+    registry=REGISTRY
+)
+
+
+stream_queue_depth = Gauge(
+    'stream_queue_depth',
+    'Batches waiting in the bounded queue in front of each streaming stage',
+    ['stage'],
+    registry=REGISTRY
+)
+
+stream_items = Counter(
+    'stream_batches_processed_total',
+    'VM batches completed by each streaming stage (rate() gives stage throughput)',
+    ['stage'],
+    registry=REGISTRY
+)
+
+stream_item_duration = Histogram(
+    'stream_batch_duration_seconds',
+    'Time a streaming stage spent on one VM batch (collect: one ARM page)',
+    ['stage'],
+    buckets=[0.01, 0.1, 0.5, 1, 5, 15, 60],
+    registry=REGISTRY
+)
+
+stream_stage_errors = Counter(
+    'stream_stage_errors_total',
+    'VM batches dropped by a streaming stage because it raised',
+    ['stage'],
+    registry=REGISTRY
+)
+
+
+api_requests = Counter(
+    'api_requests_total',
+    'Diagnostics API requests by scope and HTTP status',
+    ['scope', 'status'],
+    registry=REGISTRY
+)
+
+api_coalesced_requests = Counter(
+    'api_coalesced_requests_total',
+    'Diagnostics API requests answered by joining an identical request already in flight',
+    ['scope'],
+    registry=REGISTRY
+)
+
+api_request_duration = Histogram(
+    'api_request_duration_seconds',
+    'Diagnostics API request latency',
+    ['scope'],
+    buckets=[0.1, 0.5, 1, 5, 15, 30, 60],
+    registry=REGISTRY
+)
+
+
+coordinator_jobs = Counter(
+    'coordinator_jobs_total',
+    'Tenant/subscription scan jobs completed by the worker pool',
+    ['status'],
+    registry=REGISTRY
+)
+
+coordinator_job_duration = Histogram(
+    'coordinator_job_duration_seconds',
+    'Time a worker process spent scanning one tenant/subscription',
+    buckets=[1, 5, 15, 30, 60, 120, 300],
+    registry=REGISTRY
+)
+
+
+def record_llm_usage(purpose: str, usage) -> int:
+    """
+    Record prompt and cached-prompt tokens from a chat completion's usage
+
+    Returns:
+        Cached prompt tokens (0 when the provider reports none)
+    """
+    if usage is None:
+        return 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) or 0
+    llm_prompt_tokens.labels(purpose=purpose).inc(getattr(usage, "prompt_tokens", 0) or 0)
+    llm_cached_prompt_tokens.labels(purpose=purpose).inc(cached)
+    return cached
+
+
 # System Health Metrics
 active_incidents = Gauge(
     'active_incidents',
@@ -0,0 +1,106 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Cycle Scheduler - Runs the fetch→diagnose→resolve cycle continuously
+
+Cycles start on a fixed cadence (interval plus random jitter, so many agents do
+not hit ARM and OpenAI in lockstep) and run one at a time on the calling
+thread, so they can never overlap. A cycle that overruns its interval causes
+the ticks it covered to be skipped rather than queued, and the next cycle
+starts on the following tick; the lag gauge then shows how far behind
+schedule the agent is running. stop() (or SIGINT/SIGTERM) lets the current
+cycle finish and then exits.
+"""
+import os
+import random
+import signal
+import threading
+import time
+from typing import Callable, Optional
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.metrics import agent_cycle_duration, agent_cycle_lag, agent_cycles, agent_cycles_skipped
+from src.utils.logger import log
+
+
+class CycleScheduler:
+    """
+    Fixed-cadence, non-overlapping runner for a cycle function
+
+    Args:
+        cycle: The work to run each tick; exceptions are logged and counted,
+            and do not stop the scheduler
+        interval: Seconds between scheduled cycle starts
+        jitter: Up to this many seconds of random delay added to each start
+    """
+
+    def __init__(self, cycle: Callable[[], None], interval: float, jitter: float = 0.0,
+                 rng: Optional[random.Random] = None):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.cycle = cycle
+        self.interval = interval
+        self.jitter = max(0.0, jitter)
+        self.cycles = 0
+        self.skipped = 0
+        self._rng = rng or random.Random()
+        self._stop = threading.Event()
+
+    def stop(self, *_):
+        """Request shutdown; usable as a signal handler"""
+        if not self._stop.is_set():
+            log.info("scheduler.stop_requested")
+        self._stop.set()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def install_signal_handlers(self):
+        """Stop gracefully on SIGINT/SIGTERM (main thread only)"""
+        signal.signal(signal.SIGINT, self.stop)
+        if hasattr(signal, "SIGTERM"):
+            signal.signal(signal.SIGTERM, self.stop)
+
+    def run(self, max_cycles: Optional[int] = None):
+        """Run cycles until stop() is called (or max_cycles have run)"""
+        log.info("scheduler.started", interval_seconds=self.interval, jitter_seconds=self.jitter)
+        next_tick = time.monotonic()
+        # The earliest tick not yet served: lag includes jitter and any skipped ticks
+        due = next_tick
+        while not self._stop.is_set() and (max_cycles is None or self.cycles < max_cycles):
+            scheduled = next_tick + self._rng.uniform(0, self.jitter)
+            if self._stop.wait(max(0.0, scheduled - time.monotonic())):
+                break
+
+            started = time.monotonic()
+            lag = started - due
+            agent_cycle_lag.set(lag)
+            status = "success"
+            try:
+                self.cycle()
+            except Exception as e:
+                status = "failed"
+                log.error("scheduler.cycle_failed", error=str(e), error_type=type(e).__name__)
+            duration = time.monotonic() - started
+            self.cycles += 1
+            agent_cycles.labels(status=status).inc()
+            agent_cycle_duration.observe(duration)
+
+            # Skip ticks that passed while the cycle was running instead of catching up
+            next_tick += self.interval
+            due = next_tick
+            now = time.monotonic()
+            if now > next_tick:
+                missed = int((now - next_tick) // self.interval) + 1
+                next_tick += missed * self.interval
+                self.skipped += missed
+                agent_cycles_skipped.inc(missed)
+                log.warning("scheduler.cycles_skipped", missed=missed, duration_seconds=round(duration, 3))
+            log.info("scheduler.cycle_complete", cycle=self.cycles, status=status,
+                     duration_seconds=round(duration, 3), lag_seconds=round(lag, 3),
+                     next_in_seconds=round(next_tick - now, 3))
+        log.info("scheduler.stopped", cycles=self.cycles, skipped=self.skipped)
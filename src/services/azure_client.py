@@ -7,16 +7,35 @@ Azure Client Service - Multi-Mode Authentication Support
 Supports 3 modes: MOCK (offline), CLI (az login), SERVICE_PRINCIPAL (secrets)
 """
 import os
+import sys
+import threading
+import time
 import requests
 import subprocess
 from dotenv import load_dotenv
 from azure.identity import AzureCliCredential, ClientSecretCredential
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
 import structlog
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.services.circuit_breaker import CircuitOpenError, get_breaker
+from src.utils.deadline import Deadline
+
 load_dotenv()
 logger = structlog.get_logger()
 
+ARM_SCOPE = "https://management.azure.com/.default"
+# Refresh cached ARM tokens this long before they expire
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+
+class ArmRequestError(Exception):
+    """An ARM list page could not be fetched (no token or a non-200 response)"""
+
+    def __init__(self, message: str, text: str = ""):
+        super().__init__(message)
+        self.text = text
+
 
 class AzureClient:
     """
@@ -32,14 +51,36 @@ class AzureClient:
     - AZURE_AUTH_MODE=AUTO (default - auto-detect)
     """
     
-    def __init__(self):
-        self.subscription_id = os.getenv("AZURE_SUBSCRIPTION_ID", "demo-subscription-12345")
-        self.tenant_id = os.getenv("AZURE_TENANT_ID")
-        self.client_id = os.getenv("AZURE_CLIENT_ID")
-        self.client_secret = os.getenv("AZURE_CLIENT_SECRET")
+    def __init__(
+        self,
+        subscription_id: Optional[str] = None,
+        tenant_id: Optional[str] = None,
+        client_id: Optional[str] = None,
+        client_secret: Optional[str] = None,
+        auth_mode: Optional[str] = None,
+        allow_fallback: bool = True
+    ):
+        # Arguments override the AZURE_* environment (one client per tenant/subscription)
+        self.subscription_id = subscription_id or os.getenv("AZURE_SUBSCRIPTION_ID", "demo-subscription-12345")
+        self.tenant_id = tenant_id or os.getenv("AZURE_TENANT_ID")
+        self.client_id = client_id or os.getenv("AZURE_CLIENT_ID")
+        self.client_secret = client_secret or os.getenv("AZURE_CLIENT_SECRET")
+        # ARM calls fail fast while the breaker is open; reads then fall back
+        # to the last successful response for the same resource. Each
+        # subscription has its own breaker, so one failing tenant does not
+        # cut off the others sharing the process.
+        self.breaker = get_breaker("arm", scope=self.subscription_id)
+        # False: a failed CLI/Service Principal login or an unknown mode raises
+        # instead of silently falling back to MOCK data
+        self.allow_fallback = allow_fallback
+        self._last_good: Dict[str, Dict[str, Any]] = {}
+        # Concurrent collection shares one token instead of each call re-acquiring
+        # it (an 'az' subprocess per call in CLI mode)
+        self._token = None
+        self._token_lock = threading.Lock()
         
         # Determine authentication mode
-        self.mode = os.getenv("AZURE_AUTH_MODE", "AUTO").upper()
+        self.mode = (auth_mode or os.getenv("AZURE_AUTH_MODE", "AUTO")).upper()
         
         if self.mode == "AUTO":
             self.mode = self._detect_mode()
@@ -53,6 +94,8 @@ class AzureClient:
             self._init_cli_mode()
         elif self.mode == "SERVICE_PRINCIPAL":
             self._init_service_principal_mode()
+        elif not self.allow_fallback:
+            raise ValueError(f"Unknown Azure auth mode '{self.mode}'")
         else:
             logger.warning(f"⚠️  Unknown mode '{self.mode}', falling back to MOCK")
             self._init_mock_mode()
@@ -105,6 +148,8 @@ class AzureClient:
         except Exception as e:
             logger.error(f"❌ Azure CLI authentication failed: {e}")
             logger.warning("💡 Run 'az login' first, then try again")
+            if not self.allow_fallback:
+                raise
             logger.warning("Falling back to MOCK mode")
             self._init_mock_mode()
     
@@ -125,21 +170,82 @@ class AzureClient:
                 raise Exception("Token acquisition failed")
         except Exception as e:
             logger.error(f"❌ Service Principal authentication failed: {e}")
+            if not self.allow_fallback:
+                raise
             logger.warning("Falling back to MOCK mode")
             self._init_mock_mode()
     
     def _get_token(self) -> Optional[str]:
-        """Get Azure access token."""
+        """Get Azure access token, reusing it until shortly before it expires."""
         if self.credential:
-            try:
-                token = self.credential.get_token("https://management.azure.com/.default")
-                return token.token
-            except Exception as e:
-                logger.error(f"❌ Token acquisition failed: {e}")
-                return None
+            with self._token_lock:
+                if self._token is not None and self._token.expires_on - TOKEN_REFRESH_MARGIN_SECONDS > time.time():
+                    return self._token.token
+                try:
+                    self._token = self.credential.get_token(ARM_SCOPE)
+                    return self._token.token
+                except Exception as e:
+                    logger.error(f"❌ Token acquisition failed: {e}")
+                    return None
         return None
     
-    def get_vm_list(self) -> Dict[str, Any]:
+    def _arm_request(self, method: str, url: str, timeout: float = 30,
+                     deadline: Optional[Deadline] = None, **kwargs) -> requests.Response:
+        """
+        Call ARM through the circuit breaker; 5xx and 429 responses count as failures
+        
+        The timeout is shortened to the deadline's remaining time; DeadlineExceeded
+        is raised without calling ARM once it has passed.
+        """
+        if deadline is not None:
+            timeout = deadline.timeout(timeout)
+        return self.breaker.call(
+            lambda: requests.request(method, url, timeout=timeout, **kwargs),
+            is_failure=lambda response: response.status_code >= 500 or response.status_code == 429
+        )
+    
+    def _arm_pages(self, url: str, deadline: Optional[Deadline] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every page of an ARM list call, following nextLink until the last page
+        
+        Raises:
+            ArmRequestError: If a token cannot be acquired or a page returns non-200
+            CircuitOpenError: If ARM's breaker is open (other request errors propagate too)
+        """
+        while url:
+            token = self._get_token()
+            if not token:
+                raise ArmRequestError("Authentication failed")
+            response = self._arm_request("GET", url, headers={"Authorization": f"Bearer {token}"},
+                                         timeout=30, deadline=deadline)
+            if response.status_code != 200:
+                raise ArmRequestError(f"Azure API returned {response.status_code}", response.text)
+            data = response.json()
+            url = data.pop("nextLink", None)
+            yield data
+    
+    def _arm_list(self, url: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """Fetch all pages of an ARM list call, merged into one response"""
+        merged: Dict[str, Any] = {"value": []}
+        for page in self._arm_pages(url, deadline=deadline):
+            merged["value"].extend(page.pop("value", []))
+            merged.update(page)
+        return merged
+    
+    def _remember(self, key: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        self._last_good[key] = {"data": data, "at": time.time()}
+        return data
+    
+    def _fallback(self, key: str, error: CircuitOpenError) -> Optional[Dict[str, Any]]:
+        """Last successful response for key, flagged stale, while ARM's breaker is open"""
+        cached = self._last_good.get(key)
+        if cached is None:
+            logger.error(f"❌ ARM circuit open and no cached data for {key}: {error}")
+            return None
+        logger.warning(f"⚠️ ARM circuit open - serving cached {key} from {time.ctime(cached['at'])}")
+        return dict(cached["data"], stale=True, cached_at=cached["at"])
+    
+    def get_vm_list(self, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """Fetch list of VMs in the subscription."""
         # MOCK MODE - Return simulated data
         if self.mode == "MOCK" or not self.credential:
@@ -183,35 +289,33 @@ class AzureClient:
             }
         
         # REAL AZURE MODE - Call Azure API
-        token = self._get_token()
-        if not token:
+        if not self._get_token():
             logger.error("❌ Failed to get Azure token")
             return {"error": "Authentication failed", "simulation": False}
         
         url = f"https://management.azure.com/subscriptions/{self.subscription_id}/providers/Microsoft.Compute/virtualMachines?api-version=2023-09-01"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
         
         try:
             logger.info("🌐 Calling Azure API to fetch VMs...")
-            response = requests.get(url, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                data["simulation"] = False
-                data["mode"] = self.mode
-                vm_count = len(data.get("value", []))
-                logger.info(f"✅ Successfully fetched {vm_count} VMs from Azure")
-                return data
-            else:
-                logger.error(f"❌ Azure API returned {response.status_code}: {response.text}")
-                return {
-                    "error": f"Azure API returned {response.status_code}",
-                    "message": response.text,
-                    "simulation": False
-                }
+            data = self._arm_list(url, deadline=deadline)
+            data["simulation"] = False
+            data["mode"] = self.mode
+            vm_count = len(data.get("value", []))
+            logger.info(f"✅ Successfully fetched {vm_count} VMs from Azure")
+            return self._remember("vms", data)
+        except ArmRequestError as e:
+            logger.error(f"❌ {e}: {e.text}")
+            return {
+                "error": str(e),
+                "message": e.text,
+                "simulation": False
+            }
+        except CircuitOpenError as e:
+            return self._fallback("vms", e) or {
+                "error": "Failed to fetch VMs",
+                "message": str(e),
+                "simulation": False
+            }
         except Exception as e:
             logger.error(f"❌ Failed to fetch VMs: {e}")
             return {
@@ -220,7 +324,27 @@ class AzureClient:
                 "simulation": False
             }
     
-    def get_nsg_rules(self, resource_group: str = "rg-demo", nsg_name: str = "vm-web-01-nsg") -> Dict[str, Any]:
+    def iter_vm_pages(self, deadline: Optional[Deadline] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the subscription's VMs one ARM page at a time (following nextLink), shaped like get_vm_list."""
+        if self.mode == "MOCK" or not self.credential:
+            yield self.get_vm_list()
+            return
+        
+        url = f"https://management.azure.com/subscriptions/{self.subscription_id}/providers/Microsoft.Compute/virtualMachines?api-version=2023-09-01"
+        try:
+            for data in self._arm_pages(url, deadline=deadline):
+                data["simulation"] = False
+                data["mode"] = self.mode
+                yield data
+        except ArmRequestError as e:
+            logger.error(f"❌ {e}: {e.text}")
+            yield {"error": str(e), "message": e.text, "simulation": False}
+        except Exception as e:
+            logger.error(f"❌ Failed to fetch VM page: {e}")
+            yield {"error": "Failed to fetch VMs", "message": str(e), "simulation": False}
+    
+    def get_nsg_rules(self, resource_group: str = "rg-demo", nsg_name: str = "vm-web-01-nsg",
+                      deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """Fetch Network Security Group rules."""
         # MOCK MODE - Return simulated NSG rules (missing RDP rule)
         if self.mode == "MOCK" or not self.credential:
@@ -269,20 +393,24 @@ class AzureClient:
         headers = {"Authorization": f"Bearer {token}"}
         
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self._arm_request("GET", url, headers=headers, timeout=30, deadline=deadline)
             if response.status_code == 200:
                 data = response.json()
                 rules = data.get("properties", {}).get("securityRules", [])
                 logger.info(f"✅ Fetched {len(rules)} NSG rules")
-                return {"value": rules, "simulation": False, "mode": self.mode}
+                return self._remember(f"nsg:{resource_group}/{nsg_name}",
+                                      {"value": rules, "simulation": False, "mode": self.mode})
             else:
                 logger.error(f"❌ NSG API returned {response.status_code}")
                 return {"error": response.text, "simulation": False}
+        except CircuitOpenError as e:
+            return self._fallback(f"nsg:{resource_group}/{nsg_name}", e) or {"error": str(e), "simulation": False}
         except Exception as e:
             logger.error(f"❌ Failed to fetch NSG rules: {e}")
             return {"error": str(e), "simulation": False}
     
-    def add_nsg_rule_for_rdp(self, resource_group: str = "rg-demo", nsg_name: str = "vm-web-01-nsg") -> Dict[str, Any]:
+    def add_nsg_rule_for_rdp(self, resource_group: str = "rg-demo", nsg_name: str = "vm-web-01-nsg",
+                             deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """Add NSG rule to allow RDP (port 3389)."""
         # MOCK MODE - Simulate success
         if self.mode == "MOCK" or not self.credential:
@@ -324,7 +452,7 @@ class AzureClient:
         
         try:
             logger.info("🌐 Adding NSG rule via Azure API...")
-            response = requests.put(url, headers=headers, json=payload, timeout=60)
+            response = self._arm_request("PUT", url, headers=headers, json=payload, timeout=60, deadline=deadline)
             
             if response.status_code in [200, 201]:
                 logger.info("✅ Successfully added NSG rule for RDP")
@@ -347,7 +475,7 @@ class AzureClient:
             logger.error(f"❌ Exception while adding NSG rule: {e}")
             return {"success": False, "error": str(e)}
     
-    def get_resource_groups(self) -> Dict[str, Any]:
+    def get_resource_groups(self, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """Fetch list of resource groups."""
         if self.mode == "MOCK" or not self.credential:
             return {
@@ -358,22 +486,92 @@ class AzureClient:
                 "simulation": True
             }
         
-        token = self._get_token()
-        if not token:
+        if not self._get_token():
             return {"error": "Authentication failed"}
         
         url = f"https://management.azure.com/subscriptions/{self.subscription_id}/resourcegroups?api-version=2021-04-01"
-        headers = {"Authorization": f"Bearer {token}"}
         
         try:
-            response = requests.get(url, headers=headers, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                data["simulation"] = False
-                return data
-            else:
-                return {"error": response.text, "simulation": False}
+            data = self._arm_list(url, deadline=deadline)
+            data["simulation"] = False
+            return self._remember("resource_groups", data)
+        except ArmRequestError as e:
+            return {"error": e.text or str(e), "simulation": False}
+        except CircuitOpenError as e:
+            return self._fallback("resource_groups", e) or {"error": str(e), "simulation": False}
+        except Exception as e:
+            return {"error": str(e), "simulation": False}
+    
+    def get_nsgs(self, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """Fetch every Network Security Group in the subscription (rules and attachments) in one call."""
+        if self.mode == "MOCK" or not self.credential:
+            nsgs = []
+            for vm in self.get_vm_list()["value"]:
+                name = f"{vm['name']}-nsg"
+                nsgs.append({
+                    "name": name,
+                    "location": vm.get("location"),
+                    "properties": {
+                        "securityRules": self.get_nsg_rules(nsg_name=name)["value"],
+                        "networkInterfaces": vm["properties"]["networkProfile"]["networkInterfaces"]
+                    }
+                })
+            return {"value": nsgs, "simulation": True, "mode": "MOCK"}
+        
+        if not self._get_token():
+            return {"error": "Authentication failed"}
+        
+        url = f"https://management.azure.com/subscriptions/{self.subscription_id}/providers/Microsoft.Network/networkSecurityGroups?api-version=2023-05-01"
+        
+        try:
+            data = self._arm_list(url, deadline=deadline)
+            data["simulation"] = False
+            data["mode"] = self.mode
+            logger.info(f"✅ Fetched {len(data.get('value', []))} NSGs")
+            return self._remember("nsgs", data)
+        except ArmRequestError as e:
+            logger.error(f"❌ NSG list API: {e}")
+            return {"error": e.text or str(e), "simulation": False}
+        except CircuitOpenError as e:
+            return self._fallback("nsgs", e) or {"error": str(e), "simulation": False}
+        except Exception as e:
+            logger.error(f"❌ Failed to fetch NSGs: {e}")
+            return {"error": str(e), "simulation": False}
+    
+    def get_vm_instance_views(self, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """Fetch power and provisioning status for every VM in the subscription (statusOnly list)."""
+        if self.mode == "MOCK" or not self.credential:
+            return {
+                "value": [
+                    {
+                        "name": vm["name"],
+                        "properties": {"instanceView": {"statuses": [
+                            {"code": f"ProvisioningState/{vm['properties']['provisioningState'].lower()}"},
+                            {"code": f"PowerState/{vm['properties']['powerState']}"}
+                        ]}}
+                    }
+                    for vm in self.get_vm_list()["value"]
+                ],
+                "simulation": True,
+                "mode": "MOCK"
+            }
+        
+        if not self._get_token():
+            return {"error": "Authentication failed"}
+        
+        url = f"https://management.azure.com/subscriptions/{self.subscription_id}/providers/Microsoft.Compute/virtualMachines?api-version=2023-09-01&statusOnly=true"
+        
+        try:
+            data = self._arm_list(url, deadline=deadline)
+            data["simulation"] = False
+            return self._remember("instance_views", data)
+        except ArmRequestError as e:
+            logger.error(f"❌ Instance view API: {e}")
+            return {"error": e.text or str(e), "simulation": False}
+        except CircuitOpenError as e:
+            return self._fallback("instance_views", e) or {"error": str(e), "simulation": False}
         except Exception as e:
+            logger.error(f"❌ Failed to fetch VM instance views: {e}")
             return {"error": str(e), "simulation": False}
     
     def get_subscription_info(self) -> Dict[str, Any]:
@@ -0,0 +1,211 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Circuit Breakers - Fail fast while ARM or OpenAI is degraded
+
+Each dependency has one process-wide breaker over a rolling window of calls:
+- closed:    calls flow; the breaker opens when the error rate or the slow-call
+             rate over the window reaches its threshold
+- open:      calls are rejected immediately with CircuitOpenError, so callers
+             switch to cached or rules-based paths instead of waiting out timeouts
+- half_open: after the cool-down a single trial call is let through; success
+             closes the breaker, failure re-opens it
+
+Settings come from CIRCUIT_* variables; per-dependency slow-call thresholds
+from ARM_SLOW_CALL_SECONDS and OPENAI_SLOW_CALL_SECONDS.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, TypeVar
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.metrics import circuit_breaker_rejections, circuit_breaker_state
+from src.utils.logger import log
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+# Gauge values for circuit_breaker_state
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Dependency -> (slow-call env var, default seconds)
+SLOW_CALL_DEFAULTS = {"arm": ("ARM_SLOW_CALL_SECONDS", "10"), "openai": ("OPENAI_SLOW_CALL_SECONDS", "30")}
+
+_breakers: Dict[str, "CircuitBreaker"] = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+
+class CircuitBreaker:
+    """Thread-safe closed/open/half-open breaker for one dependency"""
+
+    def __init__(
+        self,
+        name: str,
+        error_rate: float = 0.5,
+        slow_call_rate: float = 0.5,
+        slow_call_seconds: float = 30.0,
+        window: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        enabled: bool = True
+    ):
+        self.name = name
+        self.error_rate = error_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.enabled = enabled
+        self._calls = deque(maxlen=window)  # (failed, slow)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        circuit_breaker_state.labels(dependency=name).set(STATE_VALUES[CLOSED])
+
+    @classmethod
+    def from_env(cls, name: str, scope: Optional[str] = None) -> "CircuitBreaker":
+        """Breaker configured from the environment; scope names one instance of the dependency"""
+        slow_env, slow_default = SLOW_CALL_DEFAULTS.get(name, ("", "30"))
+        return cls(
+            f"{name}:{scope}" if scope else name,
+            error_rate=float(os.getenv("CIRCUIT_ERROR_RATE", "0.5")),
+            slow_call_rate=float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.5")),
+            slow_call_seconds=float(os.getenv(slow_env, slow_default) if slow_env else slow_default),
+            window=int(os.getenv("CIRCUIT_WINDOW", "20")),
+            min_calls=int(os.getenv("CIRCUIT_MIN_CALLS", "5")),
+            open_seconds=float(os.getenv("CIRCUIT_OPEN_SECONDS", "30")),
+            enabled=os.getenv("ENABLE_CIRCUIT_BREAKERS", "true").lower() in ("1", "true", "yes")
+        )
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def _transition(self, state: str, **details):
+        # Caller holds the lock
+        if state == self._state:
+            return
+        log.warning("circuit_breaker.state_change", dependency=self.name,
+                    previous=self._state, state=state, **details)
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._calls.clear()
+        circuit_breaker_state.labels(dependency=self.name).set(STATE_VALUES[state])
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now; a True in half-open claims the trial call"""
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+        circuit_breaker_rejections.labels(dependency=self.name).inc()
+        return False
+
+    def check(self):
+        """
+        Raises:
+            CircuitOpenError: If the breaker rejects the call
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit open - failing fast")
+
+    def release(self):
+        """Give back an admitted call that never reached the dependency"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record(self, failed: bool, seconds: float = 0.0):
+        """Record the outcome of a call admitted by allow()"""
+        if not self.enabled:
+            return
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trial_in_flight = False
+                if failed or slow:
+                    self._transition(OPEN, reason="trial call failed" if failed else "trial call slow")
+                else:
+                    self._transition(CLOSED)
+                return
+            self._calls.append((failed, slow))
+            if self._state != CLOSED or len(self._calls) < self.min_calls:
+                return
+            errors = sum(1 for f, _ in self._calls if f) / len(self._calls)
+            slow_rate = sum(1 for _, s in self._calls if s) / len(self._calls)
+            if errors >= self.error_rate or slow_rate >= self.slow_call_rate:
+                self._transition(OPEN, error_rate=round(errors, 2), slow_call_rate=round(slow_rate, 2))
+
+    def call(
+        self,
+        fn: Callable[[], T],
+        is_failure: Optional[Callable[[T], bool]] = None,
+        prepare: Optional[Callable[[], object]] = None
+    ) -> T:
+        """
+        Run fn through the breaker
+
+        Exceptions count as failures and are re-raised; is_failure can also mark
+        a returned value (e.g. an HTTP 503 response) as a failure. prepare runs
+        once the call is admitted and is not timed (e.g. a rate-limiter wait,
+        which should neither happen for rejected calls nor count as slowness).
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+        """
+        self.check()
+        started = time.monotonic()
+        try:
+            if prepare is not None:
+                prepare()
+                started = time.monotonic()
+            result = fn()
+        except Exception:
+            self.record(True, time.monotonic() - started)
+            raise
+        self.record(bool(is_failure and is_failure(result)), time.monotonic() - started)
+        return result
+
+
+def get_breaker(name: str, scope: Optional[str] = None) -> CircuitBreaker:
+    """
+    Get the process-wide breaker for a dependency ('arm' or 'openai')
+
+    Args:
+        scope: Separate breaker per instance of the dependency (e.g. one per
+            Azure subscription), so one failing tenant does not open the
+            circuit for the others
+    """
+    key = f"{name}:{scope}" if scope else name
+    with _breakers_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker.from_env(name, scope)
+        return _breakers[key]
+
+
+def reset_breakers():
+    """Drop every breaker so the next get_breaker re-reads the environment (tests)"""
+    with _breakers_lock:
+        for name in _breakers:
+            circuit_breaker_state.labels(dependency=name).set(STATE_VALUES[CLOSED])
+        _breakers.clear()
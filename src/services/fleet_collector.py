@@ -0,0 +1,176 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Fleet Collector - Concurrent collection of the ARM data one run needs
+
+VMs, resource groups, NSGs and VM instance views are independent
+subscription-wide list calls, so they run side by side on a small thread pool
+and collection takes as long as the slowest call instead of their sum. The
+results are joined into one fleet snapshot: each VM gets its power state from
+its instance view, the rules of the NSG attached to its NIC (falling back to
+the '<vm>-nsg' naming convention) and its resource group. Per-source timings
+are recorded on the snapshot and as metrics.
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.metrics import collection_duration, collection_errors
+from src.utils.deadline import Deadline
+from src.utils.logger import log
+
+# Source name -> AzureClient method; every method takes deadline=
+SOURCES = {
+    "vms": "get_vm_list",
+    "resource_groups": "get_resource_groups",
+    "nsgs": "get_nsgs",
+    "instance_views": "get_vm_instance_views",
+}
+
+
+@dataclass
+class FleetSnapshot:
+    """Raw per-source results of one collection, plus how long each took"""
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    wall_seconds: float = 0.0
+    # Lookup tables built from the non-VM sources on first join
+    _index: Optional[tuple] = field(default=None, repr=False, compare=False)
+
+    @property
+    def vms(self) -> Dict[str, Any]:
+        return self.results.get("vms", {})
+
+    def vm_data(self) -> Dict[str, Any]:
+        """
+        The VM list joined with the other sources (see join)
+
+        Shaped like AzureClient.get_vm_list output (errors pass through
+        unchanged); VMs carry 'nsg' the way triage expects it.
+        """
+        vms = self.vms
+        if vms.get("error"):
+            return vms
+        data = dict(vms)
+        data["value"] = self.join(vms.get("value", []))
+        data["count"] = len(data["value"])
+        return data
+
+    def join(self, vms: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Copies of vms with power state, NSG rules and resource group from the other sources"""
+        if self._index is None:
+            self._index = (_power_states(self.results.get("instance_views", {})),
+                           *_nsg_index(self.results.get("nsgs", {})),
+                           {rg.get("name", "").lower(): rg
+                            for rg in self.results.get("resource_groups", {}).get("value", [])})
+        power, nsg_by_nic, nsg_by_name, groups = self._index
+
+        joined = []
+        for vm in vms:
+            vm = dict(vm)
+            name = vm.get("name", "")
+            state = power.get(vm.get("id", "").lower()) or power.get(name)
+            if state:
+                vm["properties"] = dict(vm.get("properties", {}), powerState=state)
+            resource_group = _resource_group(vm)
+            if resource_group:
+                vm["resourceGroup"] = groups.get(resource_group.lower(), {}).get("name", resource_group)
+            nsg = _attached_nsg(vm, nsg_by_nic) or nsg_by_name.get(f"{name}-nsg".lower())
+            if nsg is not None and "nsg" not in vm:
+                vm["nsg"] = {"name": nsg.get("name"),
+                             "value": nsg.get("properties", {}).get("securityRules", []),
+                             "simulation": self.results.get("nsgs", {}).get("simulation", False)}
+            joined.append(vm)
+        return joined
+
+
+def _power_states(instance_views: Dict[str, Any]) -> Dict[str, str]:
+    """VM id (lowercased) and name -> power state, e.g. 'running' from 'PowerState/running'"""
+    states = {}
+    for view in instance_views.get("value", []):
+        statuses = view.get("properties", {}).get("instanceView", {}).get("statuses", [])
+        state = next((s["code"].split("/", 1)[1] for s in statuses
+                      if s.get("code", "").startswith("PowerState/")), None)
+        if state:
+            if view.get("id"):
+                states[view["id"].lower()] = state
+            if view.get("name"):
+                states[view["name"]] = state
+    return states
+
+
+def _nsg_index(nsgs: Dict[str, Any]):
+    by_nic, by_name = {}, {}
+    for nsg in nsgs.get("value", []):
+        by_name[nsg.get("name", "").lower()] = nsg
+        for nic in nsg.get("properties", {}).get("networkInterfaces", []):
+            by_nic[nic.get("id", "").lower()] = nsg
+    return by_nic, by_name
+
+
+def _attached_nsg(vm: Dict[str, Any], nsg_by_nic: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    nics = vm.get("properties", {}).get("networkProfile", {}).get("networkInterfaces", [])
+    for nic in nics:
+        nsg = nsg_by_nic.get(nic.get("id", "").lower())
+        if nsg is not None:
+            return nsg
+    return None
+
+
+def _resource_group(vm: Dict[str, Any]) -> Optional[str]:
+    parts = vm.get("id", "").split("/")
+    lowered = [part.lower() for part in parts]
+    if "resourcegroups" in lowered and lowered.index("resourcegroups") + 1 < len(parts):
+        return parts[lowered.index("resourcegroups") + 1]
+    return None
+
+
+def collect_fleet(azure_client, deadline: Optional[Deadline] = None,
+                  sources: Optional[List[str]] = None) -> FleetSnapshot:
+    """
+    Fetch every source concurrently and wait for all of them
+
+    Args:
+        azure_client: AzureClient (or anything with the SOURCES methods)
+        deadline: Shared by every call; each one's HTTP timeout is cut to it
+        sources: Subset of SOURCES to collect (default: all)
+
+    Returns:
+        FleetSnapshot; a source that failed has its error in snapshot.errors
+    """
+    sources = list(sources or SOURCES)
+    snapshot = FleetSnapshot()
+    started = time.monotonic()
+
+    def fetch(source: str) -> Dict[str, Any]:
+        call_started = time.monotonic()
+        try:
+            return getattr(azure_client, SOURCES[source])(deadline=deadline)
+        except Exception as e:
+            return {"error": str(e)}
+        finally:
+            snapshot.timings[source] = time.monotonic() - call_started
+
+    with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="collect") as pool:
+        futures = {source: pool.submit(fetch, source) for source in sources}
+        for source, future in futures.items():
+            result = future.result()
+            snapshot.results[source] = result
+            collection_duration.labels(source=source).observe(snapshot.timings[source])
+            if result.get("error"):
+                snapshot.errors[source] = str(result.get("message") or result["error"])
+                collection_errors.labels(source=source).inc()
+
+    snapshot.wall_seconds = time.monotonic() - started
+    log.info("collector.completed",
+             wall_seconds=round(snapshot.wall_seconds, 3),
+             timings={source: round(seconds, 3) for source, seconds in snapshot.timings.items()},
+             errors=sorted(snapshot.errors))
+    return snapshot
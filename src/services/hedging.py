@@ -0,0 +1,170 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Hedged Requests - Latency SLO for blocking LLM calls
+
+A call that has not returned by the hedge delay (a percentile of recent call
+latencies) gets a duplicate fired alongside it, and whichever finishes first
+wins. Tail latency from a slow replica or connection then costs one extra
+request instead of the whole run. If nothing returns by the hard deadline the
+caller gets LLMDeadlineExceeded and can fall back to a heuristic answer.
+
+The losing call is abandoned rather than cancelled (the OpenAI client blocks
+in its thread until its own timeout), so hedged calls run on a dedicated pool.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Optional, Tuple, TypeVar
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.metrics import llm_deadline_exceeded, llm_hedge_wins, llm_hedged_requests, llm_slo_requests
+from src.utils.logger import log
+
+T = TypeVar("T")
+
+# Below this many observed latencies the percentile is noise; use the initial delay
+MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """Raised when no attempt of a hedged call finished before the hard deadline"""
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_HEDGE_MAX_WORKERS", "16")),
+                                       thread_name_prefix="llm-hedge")
+        return _pool
+
+
+class LatencyTracker:
+    """Thread-safe rolling window of successful call latencies"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile, or None before MIN_SAMPLES observations"""
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[rank]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+
+class Hedger:
+    """
+    Runs blocking calls under a hedge delay and a hard deadline
+
+    Settings default to LLM_HEDGE_ENABLED, LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_INITIAL_DELAY_SECONDS and LLM_HARD_DEADLINE_SECONDS
+    (0 disables the hard deadline).
+    """
+
+    def __init__(
+        self,
+        purpose: str = "llm",
+        percentile: Optional[float] = None,
+        initial_delay: Optional[float] = None,
+        hard_deadline: Optional[float] = None,
+        enabled: Optional[bool] = None
+    ):
+        self.purpose = purpose
+        self.enabled = enabled if enabled is not None else \
+            os.getenv("LLM_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.percentile = percentile if percentile is not None else float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+        self.initial_delay = initial_delay if initial_delay is not None else \
+            float(os.getenv("LLM_HEDGE_INITIAL_DELAY_SECONDS", "10"))
+        self.hard_deadline = hard_deadline if hard_deadline is not None else \
+            float(os.getenv("LLM_HARD_DEADLINE_SECONDS", "45"))
+        self.latencies = LatencyTracker()
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait on the first attempt before firing a duplicate"""
+        observed = self.latencies.percentile(self.percentile)
+        return self.initial_delay if observed is None else observed
+
+    def call(self, fn: Callable[[], T], hard_deadline: Optional[float] = None) -> T:
+        """
+        Run fn, hedging once if it is slow
+
+        Args:
+            fn: The blocking call
+            hard_deadline: Seconds for this call, overriding the configured hard deadline
+
+        Raises:
+            LLMDeadlineExceeded: If no attempt returned before the hard deadline
+            Exception: Whatever the last attempt raised, if every attempt failed
+        """
+        hard_deadline = self.hard_deadline if hard_deadline is None else hard_deadline
+        if not self.enabled and not hard_deadline:
+            return fn()
+
+        def timed() -> Tuple[T, float]:
+            started = time.monotonic()
+            result = fn()
+            return result, time.monotonic() - started
+
+        llm_slo_requests.labels(purpose=self.purpose).inc()
+        pool = _get_pool()
+        started = time.monotonic()
+        deadline = started + hard_deadline if hard_deadline else None
+        primary = pool.submit(timed)
+        pending = {primary}
+
+        if self.enabled:
+            delay = self.hedge_delay()
+            if deadline is None or started + delay < deadline:
+                done, _ = wait(pending, timeout=delay)
+                if not done:
+                    llm_hedged_requests.labels(purpose=self.purpose).inc()
+                    log.info("hedger.hedge_fired", purpose=self.purpose, delay_seconds=round(delay, 3))
+                    pending.add(pool.submit(timed))
+
+        error: Optional[BaseException] = None
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                return self._won(future, primary)
+
+        if error is not None and not pending:
+            raise error
+        llm_deadline_exceeded.labels(purpose=self.purpose).inc()
+        log.warning("hedger.deadline_exceeded", purpose=self.purpose, deadline_seconds=hard_deadline)
+        raise LLMDeadlineExceeded(f"no response within the {hard_deadline:g}s deadline")
+
+    def _won(self, future: Future, primary: Future) -> T:
+        result, seconds = future.result()
+        self.latencies.observe(seconds)
+        if future is not primary:
+            llm_hedge_wins.labels(purpose=self.purpose).inc()
+            log.info("hedger.hedge_won", purpose=self.purpose, latency_seconds=round(seconds, 3))
+        return result
@@ -0,0 +1,163 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+LLM Client Provider - Process-wide pooled OpenAI clients shared by every agent
+
+One HTTP connection pool (and TLS session) per process instead of one per agent.
+Pool limits, keep-alive, timeouts and HTTP/2 are configured from the environment:
+- OPENAI_MAX_CONNECTIONS (default 100)
+- OPENAI_MAX_KEEPALIVE_CONNECTIONS (default 20)
+- OPENAI_KEEPALIVE_EXPIRY seconds (default 60)
+- OPENAI_TIMEOUT / OPENAI_CONNECT_TIMEOUT seconds (default 60 / 10)
+- OPENAI_HTTP2 (default true; used only when the 'h2' package is installed)
+- OPENAI_BASE_URL (optional; e.g. the local mock server for offline runs)
+
+Async pools belong to one event loop; run coroutines that use them with
+run_async so the loop's pool is closed before the loop goes away.
+"""
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI, Timeout
+
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.utils.logger import log
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+_sync_client: Optional[OpenAI] = None
+# Async connection pools are bound to an event loop, so keep one client per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional 'h2' package"""
+    return importlib.util.find_spec("h2") is not None
+
+
+def client_settings() -> Dict[str, Any]:
+    """Resolve pool, timeout and protocol settings from the environment"""
+    return {
+        "max_connections": int(os.getenv("OPENAI_MAX_CONNECTIONS", "100")),
+        "max_keepalive_connections": int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        "keepalive_expiry": float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60")),
+        "timeout": float(os.getenv("OPENAI_TIMEOUT", "60")),
+        "connect_timeout": float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10")),
+        "http2": _env_flag("OPENAI_HTTP2", "true") and http2_available(),
+        "base_url": os.getenv("OPENAI_BASE_URL") or None,
+    }
+
+
+def _api_key() -> str:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not found in environment variables")
+    return api_key
+
+
+def _http_options(settings: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings["max_connections"],
+            max_keepalive_connections=settings["max_keepalive_connections"],
+            keepalive_expiry=settings["keepalive_expiry"]
+        ),
+        "timeout": Timeout(settings["timeout"], connect=settings["connect_timeout"]),
+        "http2": settings["http2"],
+    }
+
+
+def build_openai_client(max_retries: int = 2) -> OpenAI:
+    """Create a new pooled sync client (use get_openai_client to share one)"""
+    settings = client_settings()
+    options = _http_options(settings)
+    return OpenAI(
+        api_key=_api_key(),
+        base_url=settings["base_url"],
+        timeout=options["timeout"],
+        max_retries=max_retries,
+        http_client=DefaultHttpxClient(**options)
+    )
+
+
+def get_openai_client() -> OpenAI:
+    """Get the process-wide sync OpenAI client"""
+    global _sync_client
+    with _lock:
+        if _sync_client is None:
+            _sync_client = build_openai_client()
+            log.info("llm_client.created", kind="sync", **client_settings())
+        return _sync_client
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """
+    Get the async OpenAI client for the running event loop
+
+    Retries are disabled because AsyncLLMExecutor retries 429s itself so the
+    shared rate limiter sees them.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            settings = client_settings()
+            options = _http_options(settings)
+            client = AsyncOpenAI(
+                api_key=_api_key(),
+                base_url=settings["base_url"],
+                timeout=options["timeout"],
+                max_retries=0,
+                http_client=DefaultAsyncHttpxClient(**options)
+            )
+            _async_clients[loop] = client
+            log.info("llm_client.created", kind="async", **settings)
+        return client
+
+
+async def close_async_client():
+    """Close the running event loop's async client, if one was created"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.pop(loop, None)
+    if client is not None:
+        await client.close()
+        log.info("llm_client.closed", kind="async")
+
+
+def run_async(coro: Awaitable[T]) -> T:
+    """
+    asyncio.run for coroutines that make LLM calls
+
+    Each asyncio.run creates a new loop and so a new async pool; closing it
+    when the coroutine finishes keeps repeated runs from leaking connections.
+    """
+    async def _main() -> T:
+        try:
+            return await coro
+        finally:
+            await close_async_client()
+    return asyncio.run(_main())
+
+
+def reset_clients():
+    """Drop shared clients (after fork, or when settings change in tests)"""
+    global _sync_client
+    with _lock:
+        if _sync_client is not None:
+            _sync_client.close()
+        _sync_client = None
+        _async_clients.clear()
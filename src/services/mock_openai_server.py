@@ -0,0 +1,376 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Mock OpenAI Server - Local OpenAI-compatible endpoint for offline tests and load benchmarks
+
+Implements POST /v1/chat/completions (plain and streaming) and GET /v1/models with
+configurable latency, output speed, error and 429 rates. Responses are canned and
+deterministic for a given prompt, so agent caching and concurrency can be exercised
+without network access or an API key. Provider prompt caching is simulated: prompts
+sharing a previously seen prefix of 1024+ tokens report it as cached_tokens.
+
+Point the agents at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1, or run:
+    python src/services/mock_openai_server.py --port 8080 --latency-ms 300
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.utils.logger import log
+from src.utils.tokens import count_message_tokens, count_tokens
+
+# Canned replies keyed by a phrase that identifies which agent prompt is being answered;
+# checked in order, most specific prompt first
+CANNED_RESPONSES = {
+    # Structured-output prompts come first: they mention the same topics as the prose ones
+    "return json findings": json.dumps({"findings": [
+        {"vm": "vm-web-01", "category": "network", "severity": "High",
+         "root_cause": "NSG does not allow inbound RDP (port 3389)",
+         "evidence": ["No Allow rule for port 3389 in vm-web-01-nsg"]},
+        {"vm": "vm-db-01", "category": "availability", "severity": "High",
+         "root_cause": "VM is stopped", "evidence": ["powerState=stopped"]},
+    ]}),
+    "return json remediation actions": json.dumps({"actions": [
+        {"title": "Start the VM", "vm": "vm-db-01", "priority": "High", "effort_hours": 0.1,
+         "commands": ["az vm start --resource-group <rg> --name vm-db-01"]},
+        {"title": "Allow RDP from a trusted range", "vm": "vm-web-01", "priority": "High", "effort_hours": 0.5,
+         "commands": ["az network nsg rule create --resource-group <rg> --nsg-name vm-web-01-nsg "
+                      "--name Allow-RDP-3389 --priority 100 --destination-port-ranges 3389 --access Allow"]},
+    ]}),
+    "azure cli or powershell": (
+        "az network nsg rule create --resource-group <rg> --nsg-name <nsg> "
+        "--name Allow-RDP-3389 --priority 100 --destination-port-ranges 3389 --access Allow\n"
+        "Required permissions: Network Contributor\n"
+        "Rollback: az network nsg rule delete --resource-group <rg> --nsg-name <nsg> --name Allow-RDP-3389"
+    ),
+    "resolution steps": (
+        "1. Immediate Actions (Priority: Critical, Effort: 0.5 hours)\n"
+        "   - az vm start --resource-group <rg> --name <vm>\n"
+        "   - az network nsg rule create --nsg-name <nsg> --name Allow-RDP-3389 --priority 100 "
+        "--destination-port-ranges 3389 --access Allow\n"
+        "2. Short-term Fixes: Restrict RDP source ranges via Just-In-Time access.\n"
+        "3. Long-term Solutions: Replace public RDP with Azure Bastion."
+    ),
+    "diagnostic report": (
+        "1. Health Assessment: Degraded - {vm_hint} needs attention.\n"
+        "2. Configuration Issues: NSG does not allow inbound RDP (port 3389).\n"
+        "3. Performance Concerns: None detected.\n"
+        "4. Security Risks: Management ports should be restricted to known sources.\n"
+        "5. Cost Optimization: Deallocate stopped VMs that are not needed.\n"
+        "6. Recommendations: Start stopped VMs; add an NSG rule for 3389 from a trusted range."
+    ),
+}
+DEFAULT_RESPONSE = "Mock analysis complete. No anomalies found in the supplied data."
+
+
+@dataclass
+class MockOpenAIConfig:
+    """Behaviour knobs for the mock server"""
+    latency_ms: float = 50.0
+    latency_jitter_ms: float = 0.0
+    tokens_per_second: float = 0.0  # 0 = send the whole completion at once
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after_seconds: float = 1.0
+    seed: int = 0
+    responses: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_env(cls) -> "MockOpenAIConfig":
+        return cls(
+            latency_ms=float(os.getenv("MOCK_OPENAI_LATENCY_MS", "50")),
+            latency_jitter_ms=float(os.getenv("MOCK_OPENAI_JITTER_MS", "0")),
+            tokens_per_second=float(os.getenv("MOCK_OPENAI_TOKENS_PER_SECOND", "0")),
+            error_rate=float(os.getenv("MOCK_OPENAI_ERROR_RATE", "0")),
+            rate_limit_rate=float(os.getenv("MOCK_OPENAI_429_RATE", "0")),
+            seed=int(os.getenv("MOCK_OPENAI_SEED", "0")),
+        )
+
+
+@dataclass
+class MockServerStats:
+    connections: int = 0
+    requests: int = 0
+    completions: int = 0
+    rate_limited: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    cached_tokens: int = 0
+
+
+def canned_completion(messages: List[Dict[str, Any]], responses: Optional[Dict[str, str]] = None) -> str:
+    """Deterministic reply for a prompt: first matching phrase (custom ones first), else the default"""
+    prompt = "\n".join(str(m.get("content") or "") for m in messages)
+    lowered = prompt.lower()
+    table = list((responses or {}).items()) + list(CANNED_RESPONSES.items())
+    for phrase, template in table:
+        if phrase.lower() in lowered:
+            digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+            return template.replace("{vm_hint}", f"fleet {digest}")
+    return DEFAULT_RESPONSE
+
+
+# Prompt cache simulation, modelled on the provider's: prefixes of at least
+# 1024 tokens are cached, in 128-token increments
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_INCREMENT = 128
+_PREFIX_BLOCK_CHARS = 256
+
+
+def _prompt_text(messages: List[Dict[str, Any]]) -> str:
+    return "".join(f"<|{m.get('role')}|>{m.get('content') or ''}" for m in messages)
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "_MockHTTPServer"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.stats.connections += 1
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [
+                {"id": "gpt-4o-mini", "object": "model", "owned_by": "mock"},
+                {"id": "gpt-4o", "object": "model", "owned_by": "mock"},
+            ]})
+        else:
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "Invalid JSON", "type": "invalid_request_error"}})
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+        self.server.handle_completion(self, body)
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: MockOpenAIConfig):
+        super().__init__(address, _MockHandler)
+        self.config = config
+        self.stats = MockServerStats()
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._seen_prefixes: set = set()
+
+    def _roll(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def _cached_prefix_tokens(self, messages: List[Dict[str, Any]], model: str) -> int:
+        """Tokens of the longest previously seen prompt prefix; remembers this prompt's prefixes"""
+        prompt = _prompt_text(messages)
+        digests = [hashlib.sha1(prompt[:end].encode("utf-8")).digest()
+                   for end in range(_PREFIX_BLOCK_CHARS, len(prompt) + 1, _PREFIX_BLOCK_CHARS)]
+        with self._lock:
+            hits = 0
+            while hits < len(digests) and digests[hits] in self._seen_prefixes:
+                hits += 1
+            self._seen_prefixes.update(digests)
+        cached = count_tokens(prompt[:hits * _PREFIX_BLOCK_CHARS], model) if hits else 0
+        if cached < PROMPT_CACHE_MIN_TOKENS:
+            return 0
+        return cached - cached % PROMPT_CACHE_INCREMENT
+
+    def handle_completion(self, handler: _MockHandler, body: Dict[str, Any]):
+        config = self.config
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.in_flight += 1
+            self.stats.peak_in_flight = max(self.stats.peak_in_flight, self.stats.in_flight)
+        try:
+            if self._roll() < config.rate_limit_rate:
+                with self._lock:
+                    self.stats.rate_limited += 1
+                handler._send_json(429, {"error": {"message": "Rate limit reached (mock)",
+                                                   "type": "rate_limit_error"}},
+                                   {"retry-after": str(config.retry_after_seconds)})
+                return
+
+            delay = config.latency_ms + config.latency_jitter_ms * self._roll()
+            time.sleep(delay / 1000.0)
+
+            if self._roll() < config.error_rate:
+                with self._lock:
+                    self.stats.errors += 1
+                handler._send_json(500, {"error": {"message": "Internal server error (mock)",
+                                                   "type": "server_error"}})
+                return
+
+            model = body.get("model", "gpt-4o-mini")
+            messages = body.get("messages", [])
+            content = canned_completion(messages, config.responses)
+            prompt_tokens = count_message_tokens(messages, model)
+            completion_tokens = count_tokens(content, model)
+            cached_tokens = min(self._cached_prefix_tokens(messages, model), prompt_tokens)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            }
+            if body.get("stream"):
+                self._stream(handler, model, content, usage, body)
+            else:
+                if config.tokens_per_second:
+                    time.sleep(completion_tokens / config.tokens_per_second)
+                handler._send_json(200, {
+                    "id": f"chatcmpl-mock-{self.stats.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": usage,
+                })
+            with self._lock:
+                self.stats.completions += 1
+                self.stats.cached_tokens += cached_tokens
+        finally:
+            with self._lock:
+                self.stats.in_flight -= 1
+
+    def _stream(self, handler: _MockHandler, model: str, content: str,
+                usage: Dict[str, Any], body: Dict[str, Any]):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+
+        def emit(delta: Dict[str, Any], finish_reason: Optional[str] = None, extra: Optional[Dict] = None):
+            chunk = {
+                "id": f"chatcmpl-mock-{self.stats.requests}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            chunk.update(extra or {})
+            handler.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            handler.wfile.flush()
+
+        emit({"role": "assistant", "content": ""})
+        words = content.split(" ")
+        pause = 1.0 / self.config.tokens_per_second if self.config.tokens_per_second else 0.0
+        for idx, word in enumerate(words):
+            emit({"content": word if idx == 0 else " " + word})
+            if pause:
+                time.sleep(pause)
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+        emit({}, "stop")
+        if include_usage:
+            handler.wfile.write(("data: " + json.dumps({
+                "id": f"chatcmpl-mock-{self.stats.requests}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": model, "choices": [], "usage": usage
+            }) + "\n\n").encode("utf-8"))
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.wfile.flush()
+
+
+class MockOpenAIServer:
+    """
+    In-process mock OpenAI server
+
+    Usage:
+        with MockOpenAIServer(MockOpenAIConfig(latency_ms=200)) as server:
+            os.environ["OPENAI_BASE_URL"] = server.base_url
+    """
+
+    def __init__(self, config: Optional[MockOpenAIConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockOpenAIConfig()
+        self._httpd = _MockHTTPServer((host, port), self.config)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def stats(self) -> MockServerStats:
+        return self._httpd.stats
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        log.info("mock_openai.started", base_url=self.base_url)
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        log.info("mock_openai.stopped", **self.stats.__dict__)
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockOpenAIConfig(
+        latency_ms=args.latency_ms, latency_jitter_ms=args.jitter_ms,
+        tokens_per_second=args.tokens_per_second, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, seed=args.seed
+    )
+    server = MockOpenAIServer(config, args.host, args.port).start()
+    print(f"Mock OpenAI server listening on {server.base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Rate Limiter - Token buckets for OpenAI requests/min and tokens/min limits
+
+Callers reserve capacity up front using a pre-estimated token cost and wait the
+returned delay. Reservations may push a bucket into debt, so concurrent callers
+queue in arrival order instead of racing. A 429 retry-after hint blocks every
+caller until it expires.
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at capacity per minute"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.refill_per_second = float(per_minute) / 60.0
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._level = min(self.capacity, self._level + elapsed * self.refill_per_second)
+        self._updated = now
+
+    def reserve(self, amount: float, now: Optional[float] = None) -> float:
+        """
+        Take amount from the bucket and return how long the caller must wait
+
+        Amounts larger than capacity are clamped so one oversized request
+        cannot block the bucket forever.
+        """
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = now if now is not None else time.monotonic()
+            self._refill(now)
+            self._level -= amount
+            if self._level >= 0:
+                return 0.0
+            return -self._level / self.refill_per_second
+
+    def refund(self, amount: float):
+        """Return unused capacity (e.g. when actual usage was below the estimate)"""
+        with self._lock:
+            self._level = min(self.capacity, self._level + amount)
+
+    @property
+    def level(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._level
+
+
+class RateLimiter:
+    """
+    Combined requests/min and tokens/min limiter shared by every LLM caller
+    """
+
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.total_wait_seconds = 0.0
+        self.acquired = 0
+        self.throttled = 0
+
+    def reserve(self, estimated_tokens: int) -> float:
+        """Reserve one request and estimated_tokens; returns the required wait in seconds"""
+        now = time.monotonic()
+        wait = max(self.requests.reserve(1, now), self.tokens.reserve(estimated_tokens, now))
+        with self._lock:
+            wait = max(wait, self._blocked_until - now)
+        return max(wait, 0.0)
+
+    def _record(self, waited: float):
+        with self._lock:
+            self.acquired += 1
+            self.total_wait_seconds += waited
+
+    def acquire(self, estimated_tokens: int) -> float:
+        """Block the calling thread until capacity is available; returns seconds waited"""
+        wait = self.reserve(estimated_tokens)
+        if wait > 0:
+            with self._lock:
+                self.waiting += 1
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+        self._record(wait)
+        return wait
+
+    async def acquire_async(self, estimated_tokens: int) -> float:
+        """Async variant of acquire; returns seconds waited"""
+        wait = self.reserve(estimated_tokens)
+        if wait > 0:
+            with self._lock:
+                self.waiting += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+        self._record(wait)
+        return wait
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """Adjust the token bucket once the real usage of a request is known"""
+        if actual_tokens and actual_tokens < estimated_tokens:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+        elif actual_tokens > estimated_tokens:
+            self.tokens.reserve(actual_tokens - estimated_tokens)
+
+    def penalize(self, retry_after: float):
+        """Block all callers for retry_after seconds (server-side 429 hint)"""
+        with self._lock:
+            self.throttled += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "waiting": self.waiting,
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "avg_wait_seconds": self.total_wait_seconds / self.acquired if self.acquired else 0.0
+            }
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Get the process-wide OpenAI rate limiter
+
+    Limits come from OPENAI_RPM_LIMIT and OPENAI_TPM_LIMIT (defaults match a
+    typical gpt-4o-mini tier).
+    """
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(
+                rpm=float(os.getenv("OPENAI_RPM_LIMIT", "500")),
+                tpm=float(os.getenv("OPENAI_TPM_LIMIT", "200000"))
+            )
+        return _shared_limiter
+
+
+def reset_rate_limiter():
+    """Drop the process-wide limiter so the next get_rate_limiter() rereads its limits"""
+    global _shared_limiter
+    with _shared_lock:
+        _shared_limiter = None
+
+
+def retry_after_seconds(error: Exception, default: float = 1.0) -> float:
+    """Extract the retry-after hint from an OpenAI 429 error, if present"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return default
@@ -0,0 +1,86 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Run Deadlines - One time budget per agent run, split across its stages
+
+main() creates a Deadline per run and hands each stage (fetch, diagnose,
+resolve) a child deadline holding its share of the time still left, so time
+one stage does not use rolls over to the next. Components derive HTTP timeouts
+and LLM output budgets from remaining() and return partial results once the
+deadline has passed instead of blocking on their own fixed timeouts.
+"""
+import os
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when work is started after its deadline has passed"""
+
+
+class Deadline:
+    """
+    A point in monotonic time by which a run or stage must finish
+
+    A Deadline without a budget never expires; remaining() is then None.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, name: str = "run"):
+        self.name = name
+        self.started = time.monotonic()
+        self.expires_at = self.started + seconds if seconds else None
+
+    @classmethod
+    def from_env(cls, name: str = "run") -> "Deadline":
+        """Run deadline from RUN_BUDGET_SECONDS (0 = unbounded)"""
+        return cls(float(os.getenv("RUN_BUDGET_SECONDS", "300")) or None, name=name)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None when unbounded"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def check(self):
+        """
+        Raises:
+            DeadlineExceeded: If the deadline has passed
+        """
+        if self.expired:
+            raise DeadlineExceeded(f"{self.name} deadline exceeded after {self.elapsed:.1f}s")
+
+    def stage(self, name: str, share: float = 1.0) -> "Deadline":
+        """Child deadline for a stage, given a share of the time remaining now"""
+        child = Deadline(name=name)
+        remaining = self.remaining()
+        if remaining is not None:
+            child.expires_at = child.started + remaining * min(1.0, max(0.0, share))
+        return child
+
+    def timeout(self, default: float, minimum: float = 1.0) -> float:
+        """
+        A per-call timeout: default, shortened to the time remaining
+
+        Raises:
+            DeadlineExceeded: If the deadline has already passed
+        """
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return max(minimum, min(default, remaining))
+
+    def __repr__(self) -> str:
+        remaining = self.remaining()
+        left = "unbounded" if remaining is None else f"{remaining:.1f}s left"
+        return f"Deadline({self.name}, {left})"
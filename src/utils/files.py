@@ -0,0 +1,35 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+File Helpers - Atomic JSON persistence for agent state files
+"""
+import json
+import os
+import tempfile
+from typing import Any, Optional
+
+
+def write_json_atomic(path: str, data: Any, indent: Optional[int] = None):
+    """
+    Write data as JSON to path atomically
+
+    Each call writes to its own temporary file in the target directory and
+    renames it over path, so concurrent writers never share a temp file and
+    readers never see a partial file. Callers that write from several threads
+    must still serialize calls if the last write has to win.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
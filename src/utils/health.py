@@ -0,0 +1,45 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Fleet Health Check - Quick power-state and region summary without AI
+"""
+from typing import Any, Dict
+
+
+def quick_health_check(azure_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Perform a quick health check without AI (for testing/metrics)
+    """
+    vms = azure_data.get("value", [])
+
+    health = {
+        "total_vms": len(vms),
+        "running_vms": 0,
+        "stopped_vms": 0,
+        "locations": set(),
+        "issues": []
+    }
+
+    for vm in vms:
+        power_state = vm.get("properties", {}).get("powerState", "unknown")
+        if power_state == "running":
+            health["running_vms"] += 1
+        else:
+            health["stopped_vms"] += 1
+
+        location = vm.get("location")
+        if location:
+            health["locations"].add(location)
+
+    health["locations"] = list(health["locations"])
+
+    # Simple heuristics
+    if health["stopped_vms"] > 0:
+        health["issues"].append(f"{health['stopped_vms']} VMs are not running")
+
+    if len(health["locations"]) > 3:
+        health["issues"].append(f"Resources spread across {len(health['locations'])} regions - consider consolidation")
+
+    return health
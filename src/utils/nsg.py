@@ -0,0 +1,81 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+NSG Rule Evaluation - Deterministic checks on Network Security Group rules
+"""
+from typing import Any, Dict, List, Optional
+
+RDP_PORT = 3389
+
+
+def _port_matches(port_range: str, port: int) -> bool:
+    """Check whether an NSG port expression ('*', '3389', '3000-4000') covers a port"""
+    port_range = str(port_range).strip()
+    if port_range == "*":
+        return True
+    if "-" in port_range:
+        low, _, high = port_range.partition("-")
+        try:
+            return int(low) <= port <= int(high)
+        except ValueError:
+            return False
+    try:
+        return int(port_range) == port
+    except ValueError:
+        return False
+
+
+def _rule_ports(props: Dict[str, Any]) -> List[str]:
+    ranges = props.get("destinationPortRanges") or []
+    single = props.get("destinationPortRange")
+    if single:
+        ranges = [single] + list(ranges)
+    return [str(r) for r in ranges]
+
+
+def evaluate_inbound_port(rules: List[Dict[str, Any]], port: int = RDP_PORT) -> Dict[str, Any]:
+    """
+    Evaluate whether inbound traffic on a port is allowed by a set of NSG rules
+
+    Rules are applied in priority order (lowest number wins), as Azure does.
+
+    Returns:
+        Dictionary with 'allowed' flag and the deciding rule name (None when
+        no custom rule matches and the default deny applies)
+    """
+    inbound = []
+    for rule in rules or []:
+        props = rule.get("properties", rule)
+        if str(props.get("direction", "Inbound")).lower() != "inbound":
+            continue
+        if str(props.get("protocol", "*")).upper() not in ("*", "TCP"):
+            continue
+        if any(_port_matches(r, port) for r in _rule_ports(props)):
+            inbound.append((props.get("priority", 65000), rule.get("name"), props))
+
+    for _, name, props in sorted(inbound, key=lambda r: r[0]):
+        allowed = str(props.get("access", "")).lower() == "allow"
+        return {"port": port, "allowed": allowed, "rule": name}
+
+    return {"port": port, "allowed": False, "rule": None}
+
+
+def nsg_issues(nsg_data: Optional[Dict[str, Any]], port: int = RDP_PORT) -> List[str]:
+    """
+    List NSG problems for a VM's attached NSG data (as returned by get_nsg_rules)
+
+    Returns an empty list when no NSG data is available or no problem is found.
+    """
+    if not nsg_data:
+        return []
+    if nsg_data.get("error"):
+        return [f"NSG rules could not be fetched: {nsg_data.get('error')}"]
+
+    verdict = evaluate_inbound_port(nsg_data.get("value", []), port)
+    if verdict["allowed"]:
+        return []
+    if verdict["rule"]:
+        return [f"Inbound port {port} denied by NSG rule '{verdict['rule']}'"]
+    return [f"No NSG rule allows inbound port {port}"]
@@ -0,0 +1,164 @@
+"""
+© Rajan Mishra — 2025
+Agentic AI for Azure Supportability Test
+"""
+"""
+Token Counting & Prompt Budgeting - Fits prompts to the model context window locally
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+try:
+    import tiktoken
+except ImportError:  # Optional dependency - fall back to a character heuristic
+    tiktoken = None
+
+
+# Context window sizes (tokens) for the models this project uses
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Per-message framing overhead used by the chat completions format
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+_encodings: Dict[str, Any] = {}
+
+
+class PromptBudgetExceeded(ValueError):
+    """Raised when the fixed part of a prompt cannot fit the context window"""
+
+
+def _get_encoding(model: str):
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """
+    Count tokens in a piece of text
+
+    Uses tiktoken when installed, otherwise a conservative ~3.5 chars/token estimate.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return int(len(text) / 3.5) + 1
+
+
+def count_message_tokens(messages: Sequence[Dict[str, str]], model: str = "gpt-4o-mini") -> int:
+    """Count tokens for a list of chat messages, including framing overhead"""
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE + count_tokens(message.get("content") or "", model)
+    return total
+
+
+def get_context_window(model: str) -> int:
+    """Return the context window for a model (prefix match for dated variants)"""
+    if model in MODEL_CONTEXT_WINDOWS:
+        return MODEL_CONTEXT_WINDOWS[model]
+    for name in sorted(MODEL_CONTEXT_WINDOWS, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_CONTEXT_WINDOWS[name]
+    return DEFAULT_CONTEXT_WINDOW
+
+
+@dataclass
+class BudgetResult:
+    """Outcome of fitting prompt items into the token budget"""
+    kept: List[Any]
+    dropped: List[Any] = field(default_factory=list)
+    prompt_tokens: int = 0
+    budget_tokens: int = 0
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.dropped)
+
+
+class TokenBudgeter:
+    """
+    Fits a prompt to the model context window minus the max_tokens reservation.
+
+    Items are admitted highest-priority first; anything that no longer fits is
+    dropped and reported back so the caller can tell the user what was left out.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_tokens: int,
+        context_window: Optional[int] = None,
+        safety_margin: int = 64
+    ):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.context_window = context_window or get_context_window(model)
+        self.safety_margin = safety_margin
+
+    @property
+    def prompt_budget(self) -> int:
+        """Tokens available for the prompt after reserving the completion"""
+        return self.context_window - self.max_tokens - self.safety_margin
+
+    def fit(
+        self,
+        items: Sequence[Any],
+        render: Callable[[Any], str],
+        base_tokens: int,
+        priority: Callable[[Any], int] = lambda item: 0
+    ) -> BudgetResult:
+        """
+        Select the items that fit alongside the fixed prompt text
+
+        Args:
+            items: Candidate items (e.g. VMs) in their natural order
+            render: Renders one item to the text that goes into the prompt
+            base_tokens: Tokens used by the fixed part of the prompt
+            priority: Higher values are kept first when the budget is tight
+
+        Returns:
+            BudgetResult with kept items in their original order
+
+        Raises:
+            PromptBudgetExceeded: If the fixed prompt alone does not fit
+        """
+        budget = self.prompt_budget
+        if base_tokens > budget:
+            raise PromptBudgetExceeded(
+                f"Prompt needs {base_tokens} tokens before any data, "
+                f"but only {budget} are available for {self.model}"
+            )
+
+        costs = [count_tokens(render(item), self.model) for item in items]
+        total = base_tokens + sum(costs)
+        if total <= budget:
+            return BudgetResult(kept=list(items), prompt_tokens=total, budget_tokens=budget)
+
+        # Stable sort keeps the original order among equal priorities
+        order = sorted(range(len(items)), key=lambda i: -priority(items[i]))
+        used = base_tokens
+        kept_idx = set()
+        for i in order:
+            if used + costs[i] <= budget:
+                kept_idx.add(i)
+                used += costs[i]
+
+        kept = [item for i, item in enumerate(items) if i in kept_idx]
+        dropped = [items[i] for i in order if i not in kept_idx]
+        return BudgetResult(kept=kept, dropped=dropped, prompt_tokens=used, budget_tokens=budget)
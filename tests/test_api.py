@@ -0,0 +1,136 @@
+# © Rajan Mishra — 2025
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+import pytest
+import requests
+
+from src.utils.singleflight import SingleFlight
+
+
+def test_singleflight_coalesces_concurrent_calls_and_shares_errors():
+    flights, calls = SingleFlight(), []
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        release.wait(1)
+        return "report"
+
+    with ThreadPoolExecutor(5) as pool:
+        futures = [pool.submit(flights.do, "vm-web-01", slow) for _ in range(5)]
+        time.sleep(0.1)
+        release.set()
+        results = [f.result() for f in futures]
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert flights.in_flight() == 0
+
+    def boom():
+        raise RuntimeError("ARM down")
+    with pytest.raises(RuntimeError):
+        flights.do("vm-web-01", boom)
+    assert flights.do("vm-web-01", lambda: "again") == ("again", False)
+
+
+def test_api_burst_for_one_vm_runs_one_analysis(monkeypatch):
+    monkeypatch.setenv("AZURE_AUTH_MODE", "MOCK")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.api import DiagnosticService, DiagnosticsAPI
+
+    class CountingService(DiagnosticService):
+        runs = 0
+
+        def _diagnose(self, scope, target):
+            CountingService.runs += 1
+            time.sleep(0.3)
+            return super()._diagnose(scope, target)
+
+    service = CountingService(resolution_agent=type("Fixes", (), {
+        "suggest_fixes": lambda self, summary, deadline=None: "start the VM"})())
+    with DiagnosticsAPI(service) as api:
+        url = f"{api.base_url}/diagnose/vm/vm-db-01"
+        with ThreadPoolExecutor(8) as pool:
+            responses = list(pool.map(lambda _: requests.post(url, timeout=5), range(8)))
+        missing = requests.get(f"{api.base_url}/diagnose/vm/vm-nope", timeout=5)
+        fleet = requests.get(f"{api.base_url}/diagnose/fleet", timeout=5).json()
+
+    assert all(r.status_code == 200 for r in responses)
+    assert CountingService.runs == 3  # one burst, the 404 and the fleet
+    assert sum(r.json()["coalesced"] for r in responses) == 7
+    body = responses[0].json()
+    assert body["vms"] == ["vm-db-01"] and body["resolution"] == "start the VM"
+    assert "VM is stopped" in body["diagnosis"]
+    assert missing.status_code == 404
+    assert fleet["vms"] == ["vm-web-01", "vm-db-01"]
+
+
+class UnexplainedFleetClient:
+    """Instant ARM data for VMs the rules cannot explain, so every request reaches the finding store"""
+
+    def get_vm_list(self, deadline=None):
+        return {"value": [{"name": f"vm-app-{i:02d}", "location": "eastus",
+                           "properties": {"powerState": "starting"}} for i in range(16)]}
+
+    def get_resource_groups(self, deadline=None):
+        return {"value": []}
+
+    def get_nsgs(self, deadline=None):
+        return {"value": []}
+
+    def get_vm_instance_views(self, deadline=None):
+        return {"value": []}
+
+
+def test_api_requests_for_different_vms_share_the_finding_store(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.agents.diagnostic_agent import AnalysisResult, DiagnosticAgent
+    from src.agents.finding_store import FindingStore
+    from src.api import DiagnosticService, DiagnosticsAPI
+
+    def analyze_result(data, **kwargs):
+        time.sleep(0.01)
+        names = [vm["name"] for vm in data["value"]]
+        return AnalysisResult("Analysis of " + ", ".join(names), analyzed=[(names, "Analysis")])
+
+    agent = DiagnosticAgent()
+    monkeypatch.setattr(agent, "analyze_result", analyze_result)
+    store = FindingStore(str(tmp_path / "findings.json"))
+    service = DiagnosticService(UnexplainedFleetClient(), agent, type("Fixes", (), {
+        "suggest_fixes": lambda self, summary, deadline=None: "investigate"})(), finding_store=store)
+    names = [f"vm-app-{i:02d}" for i in range(16)]
+    with DiagnosticsAPI(service) as api:
+        with ThreadPoolExecutor(8) as pool:
+            responses = list(pool.map(
+                lambda name: requests.post(f"{api.base_url}/diagnose/vm/{name}", timeout=5), names * 4))
+
+    assert all(r.status_code == 200 for r in responses)
+    assert os.listdir(tmp_path) == ["findings.json"]
+    reports = FindingStore(store.path).cached_reports(names)
+    assert sorted(name for _, members in reports for name in members) == names
+
+
+def test_fleet_fetch_is_bounded_by_the_request_budget(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("STAGE_FETCH_SHARE", "0.25")
+    from src.api import DiagnosticService
+
+    class RecordingClient(UnexplainedFleetClient):
+        deadlines = []
+
+        def get_vm_list(self, deadline=None):
+            self.deadlines.append(deadline)
+            return super().get_vm_list(deadline)
+
+    agent = type("Agent", (), {"analyze": lambda self, data, deadline=None: "findings"})()
+    fixes = type("Fixes", (), {"suggest_fixes": lambda self, summary, deadline=None: "investigate"})()
+    service = DiagnosticService(RecordingClient(), agent, fixes, budget_seconds=8)
+    service.diagnose("vm", "vm-app-03")
+
+    deadline = RecordingClient.deadlines[0]
+    assert deadline is not None and deadline.name == "fetch"
+    assert 0 < deadline.remaining() <= 2.0  # a quarter of the 8 s request budget
@@ -0,0 +1,50 @@
+# © Rajan Mishra — 2025
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.agents.async_executor import AsyncLLMExecutor, LLMRequest
+from src.services.rate_limiter import RateLimiter, TokenBucket
+
+
+class FakeCompletions:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    async def create(self, model, messages, temperature, max_tokens):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        message = SimpleNamespace(content=f"echo {messages[-1]['content']}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)],
+                               usage=SimpleNamespace(total_tokens=42))
+
+
+def _client(completions):
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+
+def test_token_bucket_reports_wait_once_empty():
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(60, now=bucket._updated) == 0.0
+    assert abs(bucket.reserve(1, now=bucket._updated) - 1.0) < 1e-6
+
+
+def test_executor_runs_concurrently_and_preserves_order():
+    completions = FakeCompletions()
+    executor = AsyncLLMExecutor(client=_client(completions),
+                                rate_limiter=RateLimiter(rpm=10000, tpm=10_000_000),
+                                max_concurrency=8)
+    requests = [LLMRequest(messages=[{"role": "user", "content": str(i)}], key=i) for i in range(20)]
+
+    results = asyncio.run(executor.run_all(requests))
+
+    assert [r.content for r in results] == [f"echo {i}" for i in range(20)]
+    assert completions.peak == 8
+    assert executor.stats.as_dict()["completed"] == 20
+    assert executor.stats.queue_depth == 0
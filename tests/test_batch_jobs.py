@@ -0,0 +1,86 @@
+# © Rajan Mishra — 2025
+import os
+import sys
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.agents.batch_jobs import BatchJob, LocalBatchBackend
+from src.services.mock_openai_server import canned_completion
+
+
+def _canned(body):
+    return canned_completion(body.get("messages", []))
+
+
+def _fleet(count):
+    return {"value": [
+        {"name": f"vm-{i:03d}", "location": "eastus",
+         "properties": {"powerState": "running"}, "tags": {"app": f"app-{i}"}}
+        for i in range(count)
+    ]}
+
+
+def test_diagnostic_batch_maps_results_to_every_vm(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    agent = DiagnosticAgent()
+    backend = LocalBatchBackend(str(tmp_path / "backend"), _canned)
+
+    job = BatchJob(str(tmp_path / "job"))
+    job.write_requests(agent.build_batch_requests(_fleet(12), chunk_size=5))
+    reports = agent.map_batch_results(job.run(backend, poll_interval=0))
+
+    assert len(job.manifest["requests"]) == 3
+    assert sorted(reports) == [f"vm-{i:03d}" for i in range(12)]
+    assert "Health Assessment" in reports["vm-011"]
+
+
+def test_batch_job_resumes_without_resubmitting(monkeypatch, tmp_path):
+    class CountingBackend(LocalBatchBackend):
+        submitted = 0
+
+        def submit(self, input_path):
+            CountingBackend.submitted += 1
+            return super().submit(input_path)
+
+        def poll(self, batch_id):
+            # Simulate the process dying while the batch is still running
+            raise KeyboardInterrupt
+
+    requests = [{"custom_id": "a", "body": {"messages": [{"role": "user", "content": "hi"}]}, "meta": {}}]
+    job = BatchJob(str(tmp_path / "job"))
+    job.write_requests(requests)
+    try:
+        job.run(CountingBackend(str(tmp_path / "backend"), _canned), poll_interval=0)
+    except KeyboardInterrupt:
+        pass
+
+    resumed = BatchJob(str(tmp_path / "job"))
+    assert resumed.status == "submitted"
+    resumed.write_requests([])  # ignored for a job that already has requests
+    results = resumed.run(LocalBatchBackend(str(tmp_path / "backend"), _canned), poll_interval=0)
+
+    assert CountingBackend.submitted == 1
+    assert results["a"]["content"]
+
+
+def test_requests_without_a_result_line_are_reported_failed(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.agents.diagnostic_agent import DiagnosticAgent
+
+    class LossyBackend(LocalBatchBackend):
+        def download(self, batch_id, dest_path):
+            super().download(batch_id, dest_path)
+            with open(dest_path, encoding="utf-8") as f:
+                lines = f.readlines()
+            with open(dest_path, "w", encoding="utf-8") as f:
+                f.writelines(lines[1:])
+
+    agent = DiagnosticAgent()
+    job = BatchJob(str(tmp_path / "job"))
+    job.write_requests(agent.build_batch_requests(_fleet(10), chunk_size=5))
+    reports = agent.map_batch_results(job.run(LossyBackend(str(tmp_path / "backend"), _canned), poll_interval=0))
+
+    assert sorted(reports) == [f"vm-{i:03d}" for i in range(10)]
+    assert sum(report == "⚠️ Analysis failed: no batch result" for report in reports.values()) == 5
+    assert os.listdir(job.job_dir).count("manifest.json") == 1
+    assert not [name for name in os.listdir(job.job_dir) if name.endswith(".tmp")]
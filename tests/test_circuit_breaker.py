@@ -0,0 +1,110 @@
+# © Rajan Mishra — 2025
+import os
+import sys
+import time
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+import pytest
+
+from src.metrics import REGISTRY
+from src.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def _state(name):
+    return REGISTRY.get_sample_value("circuit_breaker_state", {"dependency": name})
+
+
+def _fail():
+    raise ConnectionError("boom")
+
+
+def test_opens_on_error_rate_and_fails_fast():
+    breaker = CircuitBreaker("test-errors", error_rate=0.5, min_calls=4, open_seconds=60)
+    breaker.call(lambda: "ok")
+    breaker.call(lambda: "ok")
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+
+    assert breaker.state == OPEN
+    assert _state("test-errors") == 2
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: calls.append(1))
+    assert calls == []
+
+
+def test_opens_on_slow_calls_and_response_failures():
+    slow = CircuitBreaker("test-slow", slow_call_seconds=0.01, min_calls=2)
+    for _ in range(2):
+        slow.call(lambda: time.sleep(0.02))
+    assert slow.state == OPEN
+
+    http = CircuitBreaker("test-http", min_calls=2)
+    for _ in range(2):
+        http.call(lambda: 503, is_failure=lambda status: status >= 500)
+    assert http.state == OPEN
+
+
+def test_half_open_trial_closes_or_reopens():
+    breaker = CircuitBreaker("test-half-open", min_calls=1, open_seconds=0.05)
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # only one trial at a time
+    breaker.record(True)
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+    assert _state("test-half-open") == 0
+
+
+def test_azure_client_serves_cached_vms_while_arm_is_open(monkeypatch):
+    import requests
+    from src.services import azure_client as module
+
+    class Token:
+        token = "token"
+        expires_on = time.time() + 3600
+
+    class Credential:
+        def get_token(self, scope):
+            return Token()
+
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {"value": [{"name": "vm-web-01"}]}
+
+    monkeypatch.setenv("AZURE_AUTH_MODE", "MOCK")
+    client = module.AzureClient()
+    client.mode, client.credential = "CLI", Credential()
+    client.breaker = CircuitBreaker("test-arm", min_calls=1, open_seconds=60)
+    monkeypatch.setattr(requests, "request", lambda *a, **kw: Response())
+    assert client.get_vm_list()["value"][0]["name"] == "vm-web-01"
+
+    def outage(*args, **kwargs):
+        raise requests.ConnectionError("ARM unreachable")
+    monkeypatch.setattr(requests, "request", outage)
+    assert client.get_vm_list()["error"] == "Failed to fetch VMs"
+    assert client.breaker.state == OPEN
+
+    cached = client.get_vm_list()
+    assert cached["stale"] is True
+    assert cached["value"][0]["name"] == "vm-web-01"
+    assert "error" in client.get_nsg_rules()
+
+
+def test_each_subscription_gets_its_own_arm_breaker(monkeypatch):
+    from src.services.azure_client import AzureClient
+    monkeypatch.setenv("AZURE_AUTH_MODE", "MOCK")
+    first, second = AzureClient(subscription_id="sub-a"), AzureClient(subscription_id="sub-b")
+    assert first.breaker is not second.breaker
+    assert first.breaker is AzureClient(subscription_id="sub-a").breaker
+    assert first.breaker.name == "arm:sub-a" and _state("arm:sub-b") == 0
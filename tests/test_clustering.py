@@ -0,0 +1,70 @@
+# © Rajan Mishra — 2025
+import os
+import sys
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.agents.clustering import cluster_vms, config_fingerprint, fan_out_findings
+
+
+def _vm(name, size="Standard_B2s", state="running", tags=None):
+    return {"name": name, "location": "eastus",
+            "properties": {"hardwareProfile": {"vmSize": size}, "powerState": state},
+            "tags": tags if tags is not None else {"environment": "production", "app": "web"}}
+
+
+def test_clones_share_fingerprint_regardless_of_instance_tags():
+    a = _vm("vmss-web-0", tags={"app": "web", "hostname": "web0"})
+    b = _vm("vmss-web-1", tags={"app": "web", "hostname": "web1"})
+    assert config_fingerprint(a) == config_fingerprint(b)
+    assert config_fingerprint(a) != config_fingerprint(_vm("vm-x", state="stopped", tags={"app": "web"}))
+
+
+def test_cluster_and_fan_out_findings():
+    vms = [_vm(f"vmss-web-{i}") for i in range(5)] + [_vm("vm-db-01", size="Standard_E4s_v3")]
+    clusters = cluster_vms(vms)
+    assert [c.size for c in clusters] == [5, 1]
+    assert clusters[0].representative["name"] == "vmss-web-0"
+
+    findings = [{"vm": "vmss-web-0", "category": "network"}, {"vm": "vm-db-01", "category": "availability"}]
+    expanded = fan_out_findings(findings, clusters)
+    assert sorted(f["vm"] for f in expanded if f["category"] == "network") == [f"vmss-web-{i}" for i in range(5)]
+    assert len(expanded) == 6
+
+
+def test_diagnostic_prompt_describes_one_vm_per_cluster(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    agent = DiagnosticAgent()
+    vms = [_vm(f"vmss-web-{i}") for i in range(50)]
+    prompt = agent._build_messages({"value": vms})[0][1]["content"]
+    assert "Total VMs: 50" in prompt
+    assert "shared by 50 VMs" in prompt
+    assert "VM 2:" not in prompt
+
+
+def test_concurrent_analyses_on_one_agent_fan_out_their_own_clusters(monkeypatch):
+    import json
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from types import SimpleNamespace
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    agent = DiagnosticAgent()
+    both_planned = threading.Barrier(2, timeout=5)
+
+    def create(messages, **kwargs):
+        # Both requests have built their prompts before either one fans out
+        both_planned.wait()
+        representative = "vmss-api-0" if "vmss-api-0" in messages[-1]["content"] else "vmss-web-0"
+        finding = {"vm": representative, "category": "network", "severity": "High",
+                   "root_cause": "RDP blocked", "evidence": ["port 3389 denied"]}
+        content = json.dumps({"findings": [finding]})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    agent.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    fleets = {app: {"value": [_vm(f"vmss-{app}-{i}", tags={"app": app}) for i in range(3)]} for app in ("api", "web")}
+    with ThreadPoolExecutor(2) as pool:
+        findings = dict(zip(fleets, pool.map(agent.analyze_structured, fleets.values())))
+
+    for app in fleets:
+        assert sorted(f.vm for f in findings[app]) == [f"vmss-{app}-{i}" for i in range(3)]
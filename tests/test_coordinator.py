@@ -0,0 +1,57 @@
+# © Rajan Mishra — 2025
+import json
+import os
+import sys
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.coordinator import Coordinator, ScanJob, load_jobs
+from src.services.mock_openai_server import MockOpenAIServer
+
+
+def test_jobs_fan_out_over_worker_processes_and_aggregate(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    # Even with a usable environment identity, the job's own missing secret fails it
+    monkeypatch.setenv("AZURE_AUTH_MODE", "MOCK")
+    monkeypatch.delenv("BROKEN_CLIENT_SECRET", raising=False)
+    tenants = tmp_path / "tenants.json"
+    tenants.write_text(json.dumps(
+        [{"name": f"tenant-{i}", "subscription_id": f"sub-{i}", "auth_mode": "MOCK"} for i in range(4)]
+        + [{"name": "broken", "subscription_id": "sub-x", "tenant_id": "tenant-x", "client_id": "app-x",
+            "client_secret_env": "BROKEN_CLIENT_SECRET"}]
+    ))
+    jobs = load_jobs(str(tenants))
+    assert jobs[0] == ScanJob(name="tenant-0", subscription_id="sub-0", auth_mode="MOCK")
+
+    # Spawned workers inherit the environment, so they use the mock server too
+    with MockOpenAIServer() as server, Coordinator(jobs, workers=2) as coordinator:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        first = coordinator.run_once()
+        second = coordinator.run_once()
+
+    assert [r["job"] for r in first.failed] == ["broken"]
+    assert "BROKEN_CLIENT_SECRET is not set" in first.failed[0]["error"]
+    assert first.total_vms == 8
+    ok = [r for r in first.results + second.results if not r.get("error")]
+    assert all(r["vms"] == ["vm-web-01", "vm-db-01"] and "NSG blocks RDP" in r["diagnosis"] for r in ok)
+    # Two warm worker processes serve both passes; neither is the coordinator
+    pids = {r["worker_pid"] for r in first.results + second.results}
+    assert len(pids) <= 2 and os.getpid() not in pids
+    assert "5 subscriptions, 8 VMs, 1 failed" in first.render()
+
+
+def test_job_naming_credentials_never_falls_back(monkeypatch):
+    from src.coordinator import scan_job
+    monkeypatch.setenv("AZURE_AUTH_MODE", "MOCK")
+    monkeypatch.setenv("AZURE_CLIENT_SECRET", "environment-secret")
+    result = scan_job(ScanJob(name="partial", subscription_id="sub-y", client_secret_env="AZURE_CLIENT_SECRET"))
+    assert result["vms"] == [] and "missing tenant_id, client_id" in result["error"]
+
+
+def test_job_without_credentials_needs_an_explicit_auth_mode(monkeypatch):
+    from src.coordinator import scan_job
+    monkeypatch.setenv("AZURE_AUTH_MODE", "MOCK")
+    for job, error in ((ScanJob(name="implicit", subscription_id="sub-z"), "auth_mode"),
+                       (ScanJob(name="auto", subscription_id="sub-z", auth_mode="auto"), "auth_mode"),
+                       (ScanJob(name="unknown", subscription_id="sub-z", auth_mode="TYPO"), "Unknown Azure auth mode")):
+        result = scan_job(job)
+        assert result["vms"] == [] and error in result["error"]
@@ -0,0 +1,75 @@
+# © Rajan Mishra — 2025
+import asyncio
+import os
+import sys
+import time
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+import pytest
+
+from src.utils.deadline import Deadline, DeadlineExceeded
+
+
+def test_stage_shares_and_timeouts():
+    run = Deadline(10)
+    fetch = run.stage("fetch", 0.2)
+    assert 1.9 < fetch.remaining() <= 2.0
+    assert fetch.timeout(30) <= 2.0
+    assert run.stage("resolve").remaining() <= 10
+
+    unbounded = Deadline(None)
+    assert unbounded.remaining() is None and not unbounded.expired
+    assert unbounded.stage("fetch", 0.2).remaining() is None
+    assert unbounded.timeout(30) == 30
+
+
+def test_expired_deadline_raises_on_timeout():
+    deadline = Deadline(0.01, name="fetch")
+    time.sleep(0.02)
+    assert deadline.expired
+    with pytest.raises(DeadlineExceeded, match="fetch deadline exceeded"):
+        deadline.timeout(30)
+
+
+def test_run_all_returns_partial_results_at_deadline(monkeypatch):
+    from src.agents.async_executor import AsyncLLMExecutor, LLMRequest
+    from src.services.circuit_breaker import CircuitBreaker
+    from src.services.llm_client import reset_clients
+    from src.services.mock_openai_server import MockOpenAIConfig, MockOpenAIServer
+    from src.services.rate_limiter import RateLimiter
+
+    with MockOpenAIServer(MockOpenAIConfig(latency_ms=5)) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        reset_clients()
+        executor = AsyncLLMExecutor(rate_limiter=RateLimiter(rpm=6000, tpm=10_000_000),
+                                    breaker=CircuitBreaker("test-deadline"))
+        fast = LLMRequest(messages=[{"role": "user", "content": "hi"}])
+        server.config.latency_ms = 5
+        results = asyncio.run(executor.run_all([fast], timeout=5))
+        assert results[0].ok
+
+        server.config.latency_ms = 1000
+        started = time.monotonic()
+        results = asyncio.run(executor.run_all([fast, fast], timeout=0.2))
+        elapsed = time.monotonic() - started
+        time.sleep(1)  # let the abandoned requests drain before the server stops
+    reset_clients()
+
+    assert elapsed < 0.8
+    assert all("deadline exceeded" in r.error for r in results)
+    assert executor.stats.queue_depth == 0 and executor.stats.in_flight == 0
+
+
+def test_analyze_after_deadline_returns_degraded_report(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.agents.diagnostic_agent import DiagnosticAgent
+
+    expired = Deadline(0.001, name="diagnose")
+    time.sleep(0.01)
+    report = DiagnosticAgent().analyze(
+        {"value": [{"name": "vm-db-01", "location": "eastus", "properties": {"powerState": "stopped"}}]},
+        deadline=expired)
+
+    assert report.startswith("⚠️ DEGRADED REPORT")
+    assert "diagnose deadline exceeded" in report
@@ -0,0 +1,74 @@
+# © Rajan Mishra — 2025
+import os
+import sys
+from types import SimpleNamespace
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.agents.finding_store import FindingStore
+
+
+def _vm(name, state="running"):
+    return {"name": name, "location": "eastus", "properties": {"powerState": state}, "tags": {}}
+
+
+def test_store_partitions_on_fingerprint_and_ttl(tmp_path):
+    path = str(tmp_path / "findings.json")
+    store = FindingStore(path, ttl_seconds=100)
+    store.record([_vm("a"), _vm("b")], "report-1", now=1000)
+    store.save()
+
+    reloaded = FindingStore(path, ttl_seconds=100)
+    stale, cached = reloaded.partition([_vm("a"), _vm("b", state="stopped"), _vm("c")], now=1050)
+    assert [vm["name"] for vm in stale] == ["b", "c"]
+    assert cached == ["a"]
+
+    stale, cached = reloaded.partition([_vm("a")], now=1200)
+    assert [vm["name"] for vm in stale] == ["a"]
+
+
+def test_analyze_incremental_only_sends_changed_vms(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.agents.diagnostic_agent import AnalysisResult, DiagnosticAgent
+    agent = DiagnosticAgent()
+    calls = []
+    monkeypatch.setattr(agent, "analyze_result", lambda data, **kwargs: calls.append(data["value"]) or AnalysisResult(
+        f"report for {len(data['value'])}", analyzed=[([vm["name"] for vm in data["value"]], "report")]))
+    store = FindingStore(str(tmp_path / "findings.json"))
+
+    agent.analyze_incremental({"value": [_vm("a"), _vm("b")]}, store)
+    report = agent.analyze_incremental({"value": [_vm("a"), _vm("b", state="stopped")]}, store)
+
+    assert [vm["name"] for vm in calls[1]] == ["b"]
+    assert "report for 1" in report
+    assert "1 unchanged VMs: a" in report
+
+
+class FailingChunkCompletions:
+    """Diagnosing the chunk that contains vm-bad fails; every other chunk succeeds"""
+
+    async def create(self, model, messages, temperature, max_tokens):
+        if "vm-bad" in messages[-1]["content"]:
+            raise RuntimeError("model unavailable")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="findings"))],
+                               usage=SimpleNamespace(total_tokens=10))
+
+
+def test_vms_of_a_failed_chunk_stay_stale(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.agents import diagnostic_agent as module
+    from src.agents.async_executor import AsyncLLMExecutor
+    from src.services.rate_limiter import RateLimiter
+    executor = AsyncLLMExecutor(client=SimpleNamespace(chat=SimpleNamespace(completions=FailingChunkCompletions())),
+                                rate_limiter=RateLimiter(rpm=10000, tpm=10_000_000))
+    monkeypatch.setattr(module, "AsyncLLMExecutor", lambda: executor)
+    agent = module.DiagnosticAgent()
+    agent.chunk_size = 1
+    vms = [dict(_vm(name), tags={"app": name}) for name in ("vm-bad", "vm-good")]
+    store = FindingStore(str(tmp_path / "findings.json"))
+
+    report = agent.analyze_incremental({"value": vms}, store)
+
+    # The report starts with a chunk header, yet only the good chunk is cached
+    assert report.startswith("🆕") and "⚠️ Analysis failed" in report
+    stale, cached = FindingStore(store.path).partition(vms)
+    assert [vm["name"] for vm in stale] == ["vm-bad"] and cached == ["vm-good"]
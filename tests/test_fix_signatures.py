@@ -0,0 +1,86 @@
+# © Rajan Mishra — 2025
+import os
+import sys
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.agents.fix_signatures import FixTemplateCache, fill_template, fix_signature
+from src.services.mock_openai_server import MockOpenAIConfig, MockOpenAIServer
+
+
+def test_signature_parameterizes_resource_names():
+    signature, params = fix_signature("Open port 3389 on NSG vm-web-01-nsg in resource group rg-prod.")
+    assert signature == "open port <port> on nsg <nsg> in resource group <rg>"
+    assert params == {"nsg": "vm-web-01-nsg", "rg": "rg-prod", "port": "3389"}
+    assert fix_signature("VM is stopped, start VM vm-db-01")[0] == "vm is stopped, start vm <vm>"
+    assert fill_template("az vm start -g <rg> -n <vm>", {"vm": "vm-db-01"}) == "az vm start -g <rg> -n vm-db-01"
+
+
+def test_signature_does_not_replace_inside_longer_names():
+    signature, params = fix_signature("Start VM vm-1 and compare with vm-10 and vm-1.")
+    assert signature == "start vm <vm> and compare with vm-10 and <vm>"
+    assert params == {"vm": "vm-1"}
+    signature, params = fix_signature("Move it from resource group rg-app to rg-app-prod")
+    assert signature == "move it from resource group <rg> to rg-app-prod"
+
+
+def test_cache_persists(tmp_path):
+    path = str(tmp_path / "templates.json")
+    cache = FixTemplateCache(path)
+    cache.put("start vm <vm>", "az vm start -n <vm>")
+    cache.save()
+    assert FixTemplateCache(path).get("start vm <vm>") == "az vm start -n <vm>"
+
+
+def test_cache_saves_concurrently(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    cache = FixTemplateCache(str(tmp_path / "templates.json"))
+
+    def put_and_save(i):
+        cache.put(f"start vm <vm> {i}", "az vm start -n <vm>")
+        cache.save()
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(put_and_save, range(200)))
+    assert len(FixTemplateCache(cache.path)) == 200
+    assert os.listdir(tmp_path) == ["templates.json"]
+
+
+def test_repeat_fix_shapes_need_one_llm_call(monkeypatch):
+    from src.services.llm_client import reset_clients
+    with MockOpenAIServer(MockOpenAIConfig(latency_ms=1)) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.delenv("FIX_TEMPLATE_CACHE_PATH", raising=False)
+        reset_clients()
+        from src.agents.resolution_agent import ResolutionAgent
+        agent = ResolutionAgent()
+        scripts = [agent.generate_automation_script(f"Open port 3389 on NSG vm-web-{i:02d}-nsg")
+                   for i in range(20)]
+        completions = server.stats.completions
+    reset_clients()
+
+    assert completions == 1
+    assert [s["cached"] for s in scripts] == [False] + [True] * 19
+    assert "--nsg-name vm-web-07-nsg" in scripts[7]["script"]
+
+
+def test_batch_generation_dedupes_and_streams(monkeypatch):
+    from src.services.llm_client import reset_clients
+    fixes = [f"Start VM vm-db-{i:02d}" for i in range(10)] + ["Open port 3389 on NSG web-01-nsg"] * 5 \
+        + [f"Restrict RDP source to 10.0.{i}.0/24 on NSG app-nsg" for i in range(5)]
+    with MockOpenAIServer(MockOpenAIConfig(latency_ms=50)) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.delenv("FIX_TEMPLATE_CACHE_PATH", raising=False)
+        reset_clients()
+        from src.agents.resolution_agent import ResolutionAgent
+        results = list(ResolutionAgent().generate_automation_scripts(fixes, max_workers=4))
+        stats = server.stats
+    reset_clients()
+
+    assert stats.completions == 3 and stats.peak_in_flight == 3
+    assert sorted(r["index"] for r in results) == list(range(len(fixes)))
+    assert sum(not r["deduplicated"] for r in results) == 3
+    assert all(r["status"] == "generated" for r in results)
+    assert [r["elapsed"] for r in results] == sorted(r["elapsed"] for r in results)
+    assert max(r["elapsed"] for r in results) < 0.05 * 3
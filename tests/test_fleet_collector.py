@@ -0,0 +1,91 @@
+# © Rajan Mishra — 2025
+import os
+import sys
+import time
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.services.azure_client import AzureClient
+from src.services.fleet_collector import collect_fleet
+
+VM_ID = "/subscriptions/s/resourceGroups/RG-Web/providers/Microsoft.Compute/virtualMachines/vm-a"
+NIC_ID = "/subscriptions/s/resourceGroups/rg-web/providers/Microsoft.Network/networkInterfaces/vm-a-nic"
+
+
+class SlowClient:
+    """Each source takes 0.2s; collected sequentially that would be 0.8s"""
+
+    def _slow(self, data):
+        time.sleep(0.2)
+        return data
+
+    def get_vm_list(self, deadline=None):
+        return self._slow({"value": [{"name": "vm-a", "id": VM_ID, "properties": {
+            "networkProfile": {"networkInterfaces": [{"id": NIC_ID.upper()}]}}}]})
+
+    def get_resource_groups(self, deadline=None):
+        return self._slow({"value": [{"name": "rg-web", "location": "eastus"}]})
+
+    def get_nsgs(self, deadline=None):
+        return self._slow({"value": [{"name": "web-nsg", "properties": {
+            "securityRules": [{"name": "allow-rdp"}], "networkInterfaces": [{"id": NIC_ID}]}}]})
+
+    def get_vm_instance_views(self, deadline=None):
+        raise RuntimeError("instance views unavailable")
+
+
+def test_sources_fetched_concurrently_and_joined():
+    snapshot = collect_fleet(SlowClient())
+
+    assert snapshot.wall_seconds < 0.5
+    assert set(snapshot.timings) == {"vms", "resource_groups", "nsgs", "instance_views"}
+    assert snapshot.errors == {"instance_views": "instance views unavailable"}
+
+    vm = snapshot.vm_data()["value"][0]
+    assert vm["nsg"]["name"] == "web-nsg" and vm["nsg"]["value"] == [{"name": "allow-rdp"}]
+    assert vm["resourceGroup"] == "rg-web"
+    assert "powerState" not in vm["properties"]
+
+
+def test_mock_client_snapshot_matches_per_vm_lookups():
+    os.environ["AZURE_AUTH_MODE"] = "MOCK"
+    client = AzureClient()
+    vms = {vm["name"]: vm for vm in collect_fleet(client).vm_data()["value"]}
+
+    assert vms["vm-db-01"]["properties"]["powerState"] == "stopped"
+    assert vms["vm-web-01"]["nsg"]["value"] == client.get_nsg_rules()["value"]
+
+
+def test_list_calls_follow_every_arm_page(monkeypatch):
+    import requests
+    from src.services.circuit_breaker import CircuitBreaker
+
+    class Token:
+        token, expires_on = "token", time.time() + 3600
+
+    class Response:
+        status_code = 200
+
+        def __init__(self, data):
+            self.data = data
+
+        def json(self):
+            return dict(self.data)
+
+    def request(method, url, **kwargs):
+        # Two pages per list call: the first points at the second through nextLink
+        if url.endswith("&page=2"):
+            return Response({"value": [{"name": "second", "properties": {}}]})
+        return Response({"value": [{"name": "first", "properties": {}}], "nextLink": url + "&page=2"})
+
+    monkeypatch.setenv("AZURE_AUTH_MODE", "MOCK")
+    client = AzureClient()
+    client.mode = "CLI"
+    client.credential = type("Credential", (), {"get_token": lambda self, scope: Token()})()
+    client.breaker = CircuitBreaker("test-arm-paging")
+    monkeypatch.setattr(requests, "request", request)
+
+    for fetch in (client.get_vm_list, client.get_resource_groups, client.get_nsgs, client.get_vm_instance_views):
+        data = fetch()
+        assert [item["name"] for item in data["value"]] == ["first", "second"]
+        assert "nextLink" not in data
+    assert [len(page["value"]) for page in client.iter_vm_pages()] == [1, 1]
@@ -0,0 +1,84 @@
+# © Rajan Mishra — 2025
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+import pytest
+
+from src.metrics import REGISTRY
+from src.services.hedging import Hedger, LLMDeadlineExceeded
+
+
+def _sample(name):
+    return REGISTRY.get_sample_value(name, {"purpose": "test"}) or 0
+
+
+def test_slow_primary_is_hedged_and_duplicate_wins():
+    calls = []
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            calls.append(1)
+            attempt = len(calls)
+        time.sleep(1.0 if attempt == 1 else 0.01)
+        return attempt
+
+    hedger = Hedger(purpose="test", initial_delay=0.05, hard_deadline=5, enabled=True)
+    hedged, wins = _sample("llm_hedged_requests_total"), _sample("llm_hedge_wins_total")
+
+    assert hedger.call(fn) == 2
+    assert _sample("llm_hedged_requests_total") == hedged + 1
+    assert _sample("llm_hedge_wins_total") == wins + 1
+
+
+def test_fast_call_is_not_hedged_and_sets_percentile_delay():
+    hedger = Hedger(purpose="test", initial_delay=5, hard_deadline=5, enabled=True)
+    hedged = _sample("llm_hedged_requests_total")
+
+    for _ in range(25):
+        assert hedger.call(lambda: "ok") == "ok"
+
+    assert _sample("llm_hedged_requests_total") == hedged
+    assert hedger.hedge_delay() < 1
+
+
+def test_hard_deadline_raises():
+    hedger = Hedger(purpose="test", initial_delay=0.05, hard_deadline=0.2, enabled=True)
+    exceeded = _sample("llm_deadline_exceeded_total")
+
+    with pytest.raises(LLMDeadlineExceeded):
+        hedger.call(lambda: time.sleep(1))
+    assert _sample("llm_deadline_exceeded_total") == exceeded + 1
+
+
+def test_errors_propagate():
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        Hedger(purpose="test", initial_delay=1, hard_deadline=5, enabled=True).call(fail)
+
+
+def test_analyze_falls_back_to_degraded_report(monkeypatch):
+    from src.services.mock_openai_server import MockOpenAIConfig, MockOpenAIServer
+    from src.services.llm_client import reset_clients
+    from src.agents.diagnostic_agent import DiagnosticAgent
+
+    with MockOpenAIServer(MockOpenAIConfig(latency_ms=800)) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        reset_clients()
+        agent = DiagnosticAgent()
+        agent.hedger = Hedger(purpose="test", initial_delay=0.1, hard_deadline=0.3, enabled=True)
+        vms = [{"name": "vm-db-01", "location": "eastus", "properties": {"powerState": "stopped"}},
+               {"name": "vm-app-01", "location": "eastus", "properties": {"powerState": "starting"}}]
+        report = agent.analyze({"value": vms, "count": 2})
+        time.sleep(0.8)  # let the abandoned calls finish before the server stops
+    reset_clients()
+
+    assert report.startswith("⚠️ DEGRADED REPORT")
+    assert "vm-db-01" in report
+    assert "Not analyzed" in report and "vm-app-01" in report
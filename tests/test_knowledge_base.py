@@ -0,0 +1,70 @@
+# © Rajan Mishra — 2025
+import os
+import sys
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.agents.knowledge_base import KnowledgeBase
+
+FINDING = "Network issue: NSG vm-web-01-nsg blocks RDP port 3389 for VM vm-web-01 in resource group rg-prod"
+RESOLUTION = ("az network nsg rule create -g rg-prod --nsg-name vm-web-01-nsg --name Allow-RDP "
+              "--destination-port-ranges 3389 --access Allow")
+
+
+def test_repeat_incident_on_other_resources_is_adapted(tmp_path):
+    kb = KnowledgeBase(str(tmp_path / "kb.jsonl"))
+    kb.add(FINDING, RESOLUTION)
+    kb.add("Performance issue: VM vm-sql-02 has slow disk latency", "Move vm-sql-02 to Premium SSD")
+
+    repeat = FINDING.replace("vm-web-01", "vm-app-07").replace("rg-prod", "rg-dev")
+    best = kb.search(repeat)[0]
+
+    assert best.confidence == 1.0
+    assert best.adapted(repeat) == RESOLUTION.replace("vm-web-01", "vm-app-07").replace("rg-prod", "rg-dev")
+    assert kb.search("Availability issue: VM vm-db-01 is stopped")[0].confidence < 0.5
+
+
+def test_entries_are_appended_and_reloaded(tmp_path):
+    path = str(tmp_path / "kb.jsonl")
+    KnowledgeBase(path).add(FINDING, RESOLUTION)
+    KnowledgeBase(path).add("Cost issue: unused disk on vm-old-01", "Delete the disk")
+
+    with open(path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+    assert len(KnowledgeBase(path)) == 2
+
+
+def test_only_the_same_incident_is_reused(tmp_path):
+    kb = KnowledgeBase(str(tmp_path / "kb.jsonl"))
+    kb.add("Availability issue: VM vm-api-01 and VM vm-api-02 are stopped",
+           "az vm start -n vm-api-01 && az vm start -n vm-api-02")
+
+    # Every resource name is a parameter, not only the first one
+    best = kb.search("Availability issue: VM vm-api-01 and VM vm-api-07 are stopped")[0]
+    assert best.exact
+    assert best.adapted("Availability issue: VM vm-api-01 and VM vm-api-07 are stopped") == \
+        "az vm start -n vm-api-01 && az vm start -n vm-api-07"
+    # A near miss is only an example, however high its overlap
+    assert not kb.search("Availability issue: VM vm-api-01 and VM vm-api-02 are deallocated")[0].exact
+    assert not kb.search("Availability issue: VM vm-api-01 is stopped")[0].exact
+
+
+def test_suggest_fixes_reuses_only_reviewed_resolutions(monkeypatch):
+    from src.services.llm_client import reset_clients
+    from src.services.mock_openai_server import MockOpenAIConfig, MockOpenAIServer
+    with MockOpenAIServer(MockOpenAIConfig(latency_ms=1)) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.delenv("KNOWLEDGE_BASE_PATH", raising=False)
+        reset_clients()
+        from src.agents.resolution_agent import ResolutionAgent
+        agent = ResolutionAgent()
+        agent.suggest_fixes(FINDING)
+        assert len(agent.knowledge_base) == 0
+        agent.record_resolution(FINDING, RESOLUTION)
+        reused = agent.suggest_fixes(FINDING.replace("vm-web-01", "vm-web-02"))
+        completions = server.stats.completions
+    reset_clients()
+
+    assert completions == 1
+    assert reused.startswith("📚 KNOWLEDGE BASE RESOLUTION")
+    assert "--nsg-name vm-web-02-nsg" in reused and "vm-web-01" not in reused
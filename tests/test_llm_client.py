@@ -0,0 +1,37 @@
+# © Rajan Mishra — 2025
+import os
+import sys
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+
+def test_agents_share_one_pooled_client(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.services.llm_client import reset_clients
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    from src.agents.resolution_agent import ResolutionAgent
+    reset_clients()
+    assert DiagnosticAgent().client is ResolutionAgent().client
+
+
+def test_client_settings_from_environment(monkeypatch):
+    monkeypatch.setenv("OPENAI_MAX_CONNECTIONS", "7")
+    monkeypatch.setenv("OPENAI_HTTP2", "false")
+    from src.services.llm_client import client_settings
+    settings = client_settings()
+    assert settings["max_connections"] == 7
+    assert settings["http2"] is False
+
+
+def test_run_async_closes_the_loop_pool(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.services.llm_client import _async_clients, get_async_openai_client, run_async
+
+    async def use_client():
+        client = get_async_openai_client()
+        assert get_async_openai_client() is client
+        return client
+
+    first, second = run_async(use_client()), run_async(use_client())
+    assert first is not second
+    assert first.is_closed() and second.is_closed()
+    assert len(_async_clients) == 0
@@ -0,0 +1,77 @@
+# © Rajan Mishra — 2025
+import asyncio
+import os
+import sys
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+import pytest
+
+from src.services.mock_openai_server import MockOpenAIConfig, MockOpenAIServer
+
+
+@pytest.fixture
+def mock_openai(monkeypatch):
+    from src.services.llm_client import reset_clients
+    server = MockOpenAIServer(MockOpenAIConfig(latency_ms=5)).start()
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    reset_clients()
+    yield server
+    server.stop()
+    reset_clients()
+
+
+def test_agents_run_against_mock_server(mock_openai):
+    os.environ["AZURE_AUTH_MODE"] = "MOCK"
+    from src.services.azure_client import AzureClient
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    from src.agents.resolution_agent import ResolutionAgent
+
+    report = DiagnosticAgent().analyze(AzureClient().get_vm_list())
+    fixes = ResolutionAgent().suggest_fixes(report)
+
+    assert "Health Assessment" in report
+    assert "Immediate Actions" in fixes
+    assert mock_openai.stats.completions == 2
+
+
+def test_streaming_completion(mock_openai):
+    from src.services.llm_client import get_openai_client
+    stream = get_openai_client().chat.completions.create(
+        model="gpt-4o-mini", stream=True,
+        messages=[{"role": "user", "content": "Generate Azure CLI or PowerShell commands"}])
+    text = "".join(chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+    assert text.startswith("az network nsg rule create")
+
+
+def test_rate_limited_requests_fail_after_retries(mock_openai):
+    from src.agents.async_executor import AsyncLLMExecutor, LLMRequest
+    from src.services.rate_limiter import RateLimiter
+    mock_openai.config.rate_limit_rate = 1.0
+    mock_openai.config.retry_after_seconds = 0.01
+    executor = AsyncLLMExecutor(rate_limiter=RateLimiter(rpm=6000, tpm=10_000_000), max_retries=1)
+
+    results = asyncio.run(executor.run_all([LLMRequest(messages=[{"role": "user", "content": "hi"}])]))
+
+    assert not results[0].ok
+    assert results[0].attempts == 2
+    assert executor.stats.throttled == 2
+
+
+def test_reordered_fleet_hits_prompt_cache(mock_openai):
+    import random
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    from src.metrics import REGISTRY
+
+    vms = [{"name": f"vm-{i:03d}", "location": "eastus", "tags": {"app": f"app-{i}"},
+            "properties": {"powerState": "running", "hardwareProfile": {"vmSize": "Standard_B2s"}}}
+           for i in range(80)]
+    agent = DiagnosticAgent()
+    agent.analyze({"value": vms})
+    shuffled = random.Random(3).sample(vms, len(vms))
+    before = REGISTRY.get_sample_value("llm_cached_prompt_tokens_total", {"purpose": "diagnostic"}) or 0
+    agent.analyze({"value": shuffled})
+    after = REGISTRY.get_sample_value("llm_cached_prompt_tokens_total", {"purpose": "diagnostic"})
+
+    assert mock_openai.stats.cached_tokens >= 1024
+    assert after - before == mock_openai.stats.cached_tokens
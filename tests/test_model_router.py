@@ -0,0 +1,66 @@
+# © Rajan Mishra — 2025
+import os
+import sys
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.agents.model_router import TIER_LARGE, TIER_SMALL, TIER_STANDARD, ModelRouter
+
+
+def _router(**overrides):
+    settings = dict(large_model="gpt-4o", large_issue_threshold=10, large_input_tokens=20000,
+                    output_tokens_per_second=60, enabled=True)
+    settings.update(overrides)
+    return ModelRouter("diagnostic", "gpt-4o-mini", 1500, 0.7, **settings)
+
+
+def test_healthy_input_gets_small_budget():
+    route = _router().route(input_tokens=800, issue_count=0)
+    assert route.tier == TIER_SMALL
+    assert route.model == "gpt-4o-mini"
+    assert route.max_tokens < 1500 and route.temperature <= 0.2
+
+
+def test_many_issues_or_large_prompt_get_large_tier():
+    router = _router()
+    assert router.route(input_tokens=800, issue_count=3).tier == TIER_STANDARD
+    for route in (router.route(800, 12), router.route(30000, 1)):
+        assert route.tier == TIER_LARGE
+        assert route.model == "gpt-4o" and route.max_tokens == 3000
+
+
+def test_latency_budget_caps_output_and_rules_out_large_tier():
+    route = _router().route(input_tokens=800, issue_count=12, latency_budget=20)
+    assert route.tier == TIER_STANDARD
+    assert route.model == "gpt-4o-mini"
+    assert route.max_tokens == 960  # 20s * 0.8 * 60 tokens/s
+
+
+def test_default_hedger_budget_keeps_large_tier(monkeypatch):
+    from src.services.hedging import Hedger
+    monkeypatch.delenv("LLM_HARD_DEADLINE_SECONDS", raising=False)
+    route = _router().route(input_tokens=5000, issue_count=30, latency_budget=Hedger().hard_deadline)
+    assert route.tier == TIER_LARGE
+    assert (route.model, route.temperature) == ("gpt-4o", 0.3)
+    assert route.max_tokens == 2160  # 45s * 0.8 * 60 tokens/s, below the uncapped 3000
+
+
+def test_disabled_router_keeps_agent_settings():
+    route = _router(enabled=False).route(input_tokens=800, issue_count=0, latency_budget=1)
+    assert (route.tier, route.model, route.max_tokens, route.temperature) == \
+        (TIER_STANDARD, "gpt-4o-mini", 1500, 0.7)
+
+
+def test_ambiguous_vms_are_not_routed_to_the_small_tier(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    rdp_allowed = {"value": [{"name": "allow-rdp", "properties": {
+        "priority": 100, "direction": "Inbound", "access": "Allow",
+        "protocol": "TCP", "destinationPortRange": "3389"}}]}
+    healthy = {"name": "vm-ok", "properties": {"powerState": "running"}, "nsg": rdp_allowed}
+    unchecked = {"name": "vm-no-nsg", "properties": {"powerState": "running"}}
+
+    assert DiagnosticAgent._issue_count([healthy]) == 0
+    assert DiagnosticAgent._issue_count([healthy, unchecked]) == 1
+    router = _router()
+    assert router.route(800, DiagnosticAgent._issue_count([healthy])).tier == TIER_SMALL
+    assert router.route(800, DiagnosticAgent._issue_count([unchecked])).tier == TIER_STANDARD
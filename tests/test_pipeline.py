@@ -0,0 +1,50 @@
+# © Rajan Mishra — 2025
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.agents.async_executor import AsyncLLMExecutor
+from src.agents.triage import triage_fleet
+from src.services.rate_limiter import RateLimiter
+
+
+class SlowChunkCompletions:
+    """Diagnosing the chunk containing vm-slow takes much longer than anything else"""
+
+    async def create(self, model, messages, temperature, max_tokens):
+        prompt = messages[-1]["content"]
+        await asyncio.sleep(0.3 if "vm-slow" in prompt and "Diagnostic Analysis:" not in prompt else 0.02)
+        kind = "fixes" if "Diagnostic Analysis:" in prompt else "findings"
+        message = SimpleNamespace(content=kind)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)],
+                               usage=SimpleNamespace(total_tokens=10))
+
+
+def test_resolution_starts_before_diagnosis_finishes(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    from src.agents.pipeline import diagnose_and_resolve
+    from src.agents.resolution_agent import ResolutionAgent
+
+    diagnostic = DiagnosticAgent()
+    diagnostic.chunk_size = 1
+    fleet = {"value": [
+        {"name": "vm-slow", "location": "eastus", "properties": {"powerState": "starting"}, "tags": {"app": "a"}},
+        {"name": "vm-fast", "location": "eastus", "properties": {"powerState": "starting"}, "tags": {"app": "b"}},
+        {"name": "vm-off", "location": "eastus", "properties": {"powerState": "stopped"}, "tags": {}},
+    ]}
+    triage = triage_fleet(fleet)
+    executor = AsyncLLMExecutor(client=SimpleNamespace(chat=SimpleNamespace(completions=SlowChunkCompletions())),
+                                rate_limiter=RateLimiter(rpm=10000, tpm=10_000_000))
+
+    report = asyncio.run(diagnose_and_resolve(triage.ai_payload(fleet), diagnostic, ResolutionAgent(),
+                                              triage=triage, executor=executor))
+
+    rules, fast, slow = report.stages  # chunks follow VM name order
+    assert rules.title == "### Rules-based findings" and rules.resolution == "fixes"
+    assert fast.resolved_at < slow.diagnosed_at
+    assert report.duration_seconds < 0.3 + 0.2
+    assert report.resolution_steps.count("fixes") == 3
+    assert "### Chunk 2/2 (1 VMs)\nfindings" in report.diagnostic_summary
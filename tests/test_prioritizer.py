@@ -0,0 +1,52 @@
+# © Rajan Mishra — 2025
+import os
+import random
+import sys
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.agents.prioritizer import KEYWORD_WEIGHTS, PRIORITY_ORDER, prioritize, score_text
+
+
+def test_tiers_match_the_original_heuristic():
+    assert score_text("Security patch missing")[0] == 0
+    assert score_text("Investigate slow disk")[0] == 1
+    assert score_text("Enable boot diagnostics")[0] == 2
+    assert score_text("Delete unused disks to cut cost")[0] == 3
+    # A low-tier keyword does not demote a fix something else promoted
+    assert score_text("Failed deployment wastes cost")[0] == 0
+
+
+def test_ties_break_on_score_then_vm_count_then_tags():
+    fixes = [
+        {"fix": "Restart slow VM", "vms": ["a"]},
+        {"fix": "Restart slow VM", "vms": ["a", "b", "c"]},
+        {"fix": "Restart slow VM", "vms": ["d"], "tags": {"Environment": "Production"}},
+        {"fix": "Slow VM after timeout", "vms": ["e"]},
+    ]
+    ranked = prioritize(fixes)
+    assert [r["index"] for r in ranked] == [3, 1, 2, 0]
+    assert ranked[0]["score"] == 9 and ranked[0]["priority"] == "High"
+
+
+def test_memoized_sentence_scores_match_a_direct_scan():
+    def direct(text):
+        lowered = text.lower()
+        hits = [(PRIORITY_ORDER[tier], weight) for tier, words in KEYWORD_WEIGHTS.items()
+                for word, weight in words.items() if word in lowered]
+        promoted = [rank for rank, _ in hits if rank != PRIORITY_ORDER["Low"]]
+        rank = min(promoted) if promoted else (PRIORITY_ORDER["Low"] if hits else PRIORITY_ORDER["Medium"])
+        return rank, sum(weight for _, weight in hits)
+
+    rng = random.Random(2)
+    parts = ["Open port 3389", "open port 3390", "on vm-0042.", "Slow disk", "Security fix", "cost 12.5",
+             "down-time", "RDP", "the unused NIC", "10.0.3.0/24", ".", "Échec critique"]
+    texts = [" ".join(rng.choices(parts, k=4)) for _ in range(3000)]
+    assert [score_text(t) for t in texts] == [direct(t) for t in texts]
+    # Same sentence shape with different numbers: the port keyword still tells them apart
+    assert score_text("Open port 3389 on vm-01")[1] - score_text("Open port 3390 on vm-02")[1] == 4
+
+def test_top_k_streams_and_matches_full_sort():
+    rng = random.Random(1)
+    words = ["security", "slow", "cost", "failed", "rdp", "boot", "disk", "outage"]
+    fixes = [" ".join(rng.sample(words, 3)) + f" vm-{i}" for i in range(2000)]
+    assert prioritize(iter(fixes), top_k=25) == prioritize(fixes)[:25]
@@ -0,0 +1,87 @@
+# © Rajan Mishra — 2025
+import os
+import sys
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.agents.scan_scheduler import TIER_CRITICAL, TIER_LOW, TIER_STANDARD, TieredScanScheduler
+
+INTERVALS = {TIER_CRITICAL: 60, TIER_STANDARD: 900, TIER_LOW: 3600}
+
+
+def _vm(name, **tags):
+    return {"name": name, "tags": tags}
+
+
+def _names(batch):
+    return [vm["name"] for vm in batch]
+
+
+def test_tiers_follow_tags_and_incidents():
+    scheduler = TieredScanScheduler(intervals=INTERVALS, budget=0, incident_window=600)
+    assert scheduler.tier_for(_vm("a", environment="production"), now=0) == TIER_CRITICAL
+    assert scheduler.tier_for(_vm("b", environment="staging"), now=0) == TIER_STANDARD
+    assert scheduler.tier_for(_vm("c", environment="dev"), now=0) == TIER_LOW
+
+    scheduler.record_incidents(["c"], now=0)
+    assert scheduler.tier_for(_vm("c", environment="dev"), now=100) == TIER_STANDARD
+    assert scheduler.tier_for(_vm("c", environment="dev"), now=700) == TIER_LOW
+
+
+def test_critical_vms_rescanned_every_interval_long_tail_hourly():
+    scheduler = TieredScanScheduler(intervals=INTERVALS, budget=0)
+    fleet = [_vm("prod", environment="production"), _vm("dev", environment="dev")]
+    scanned = {"prod": 0, "dev": 0}
+    for minute in range(61):
+        for name in _names(scheduler.plan({"value": fleet}, now=minute * 60)["value"]):
+            scanned[name] += 1
+    assert scanned == {"prod": 61, "dev": 2}
+
+
+def test_budget_serves_critical_first_and_defers_the_rest():
+    scheduler = TieredScanScheduler(intervals=INTERVALS, budget=2)
+    fleet = [_vm(f"dev-{i}") for i in range(3)] + [_vm("prod", environment="production")]
+
+    assert _names(scheduler.plan({"value": fleet}, now=0)["value"]) == ["prod", "dev-0"]
+    # Deferred VMs keep their original due time and are served ahead of newer long-tail work
+    assert _names(scheduler.plan({"value": fleet}, now=60)["value"]) == ["prod", "dev-1"]
+    assert _names(scheduler.plan({"value": fleet}, now=120)["value"]) == ["prod", "dev-2"]
+    assert scheduler.plan({"value": fleet}, now=150)["value"] == []
+
+
+def test_incident_pulls_next_scan_forward():
+    scheduler = TieredScanScheduler(intervals=INTERVALS, budget=0)
+    fleet = [_vm("dev")]
+    assert _names(scheduler.plan({"value": fleet}, now=0)["value"]) == ["dev"]
+    assert scheduler.plan({"value": fleet}, now=600)["value"] == []
+
+    scheduler.record_incidents(["dev"], now=600)
+    assert _names(scheduler.plan({"value": fleet}, now=900)["value"]) == ["dev"]
+
+
+def test_scheduled_cycles_keep_findings_of_vms_not_due(monkeypatch, tmp_path):
+    monkeypatch.setenv("AZURE_AUTH_MODE", "MOCK")
+    from src import main
+    from src.agents.diagnostic_agent import AnalysisResult, DiagnosticAgent
+    from src.agents.finding_store import FindingStore
+    from src.services.azure_client import AzureClient
+    from src.utils import health
+    monkeypatch.setattr(main, "ENABLE_TRIAGE", False)
+
+    class _Agent:
+        analyze_incremental = DiagnosticAgent.analyze_incremental
+        quick_health_check = staticmethod(health.quick_health_check)
+
+        def analyze_result(self, azure_data, deadline=None):
+            text = "Analysis of " + ", ".join(_names(azure_data["value"]))
+            return AnalysisResult(text, analyzed=[(_names(azure_data["value"]), text)])
+
+    store = FindingStore(str(tmp_path / "findings.json"))
+    scheduler = TieredScanScheduler(intervals=INTERVALS, budget=1, incident_window=600)
+    client = AzureClient()
+    fleet = _names(client.get_vm_list()["value"])
+    for _ in range(2):
+        main.run_cycle(client, _Agent(), None, store, budget_seconds=60, scan_scheduler=scheduler)
+
+    # Each cycle scanned one VM; the second must not prune the first one's finding
+    reports = FindingStore(store.path).cached_reports(fleet)
+    assert sorted(name for _, names in reports for name in names) == sorted(fleet)
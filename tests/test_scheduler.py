@@ -0,0 +1,51 @@
+# © Rajan Mishra — 2025
+import os
+import random
+import sys
+import time
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.metrics import REGISTRY
+from src.scheduler import CycleScheduler
+
+
+def test_cycles_run_on_cadence_and_survive_errors():
+    starts = []
+
+    def cycle():
+        starts.append(time.monotonic())
+        if len(starts) == 2:
+            raise RuntimeError("boom")
+
+    scheduler = CycleScheduler(cycle, interval=0.05, jitter=0.01, rng=random.Random(1))
+    scheduler.run(max_cycles=3)
+
+    assert scheduler.cycles == 3 and scheduler.skipped == 0
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert all(0.03 < gap < 0.1 for gap in gaps)
+
+
+def test_overrunning_cycle_skips_ticks_instead_of_overlapping():
+    before = REGISTRY.get_sample_value("agent_cycles_skipped_total") or 0
+    starts = []
+
+    def cycle():
+        starts.append(time.monotonic())
+        if len(starts) == 1:
+            time.sleep(0.25)
+
+    scheduler = CycleScheduler(cycle, interval=0.1)
+    scheduler.run(max_cycles=2)
+
+    assert scheduler.skipped == 2
+    assert REGISTRY.get_sample_value("agent_cycles_skipped_total") == before + 2
+    assert starts[1] - starts[0] >= 0.29  # next cycle waits for the tick at 0.3s
+    assert REGISTRY.get_sample_value("agent_cycle_lag_seconds") >= 0.15
+
+
+def test_stop_ends_after_current_cycle():
+    scheduler = CycleScheduler(lambda: scheduler.stop(), interval=10)
+    started = time.monotonic()
+    scheduler.run()
+    assert scheduler.cycles == 1
+    assert time.monotonic() - started < 1
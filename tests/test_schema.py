@@ -0,0 +1,47 @@
+# © Rajan Mishra — 2025
+import json
+import os
+import sys
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+import pytest
+
+from src.agents.schema import Finding, SchemaError, parse_actions, parse_findings
+from src.agents.triage import classify_vm
+from src.services.mock_openai_server import MockOpenAIConfig, MockOpenAIServer
+
+
+def test_malformed_output_fails_fast_with_field_path():
+    bad_severity = {"findings": [{"vm": "vm-1", "category": "network", "severity": "Urgent",
+                                  "root_cause": "x", "evidence": []}]}
+    with pytest.raises(SchemaError, match=r"\$\.findings\[0\]\.severity"):
+        parse_findings(json.dumps(bad_severity))
+    with pytest.raises(SchemaError, match="missing required field 'commands'"):
+        parse_actions(json.dumps({"actions": [{"title": "t", "vm": "v", "priority": "Low", "effort_hours": 1}]}))
+    with pytest.raises(SchemaError, match="not valid JSON"):
+        parse_findings("1. Health Assessment: Degraded")
+
+
+def test_triage_findings_share_the_schema():
+    vm = {"name": "vm-db-01", "properties": {"powerState": "stopped"}, "tags": {}}
+    finding = Finding.from_dict(classify_vm(vm)["findings"][0])
+    assert finding.source == "rules" and finding.category == "availability"
+
+
+def test_structured_agents_against_mock_server(monkeypatch):
+    from src.services.llm_client import reset_clients
+    with MockOpenAIServer(MockOpenAIConfig(latency_ms=1)) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        reset_clients()
+        from src.agents.diagnostic_agent import DiagnosticAgent
+        from src.agents.resolution_agent import ResolutionAgent
+
+        fleet = {"value": [{"name": "vm-web-01", "properties": {"powerState": "running"}},
+                           {"name": "vm-db-01", "properties": {"powerState": "stopped"}}]}
+        findings = DiagnosticAgent().analyze_structured(fleet)
+        actions = ResolutionAgent().suggest_fixes_structured(findings)
+    reset_clients()
+
+    assert {f.vm for f in findings} == {"vm-web-01", "vm-db-01"}
+    assert all(a.commands and a.priority == "High" for a in actions)
@@ -0,0 +1,175 @@
+# © Rajan Mishra — 2025
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.agents.async_executor import AsyncLLMExecutor
+from src.services.rate_limiter import RateLimiter
+
+PAGES, PAGE_SIZE = 20, 10
+
+
+class PagedClient:
+    """Instant ARM pages of VMs the rules cannot explain; every batch needs the LLM"""
+
+    def __init__(self):
+        self.pages_read = 0
+
+    def iter_vm_pages(self, deadline=None):
+        for page in range(PAGES):
+            self.pages_read += 1
+            yield {"value": [{"name": f"vm-{page}-{i}", "location": "eastus",
+                              "properties": {"powerState": "starting"}, "tags": {"app": str(i)}}
+                             for i in range(PAGE_SIZE)]}
+
+    def get_resource_groups(self, deadline=None):
+        return {"value": []}
+
+    def get_nsgs(self, deadline=None):
+        return {"value": []}
+
+    def get_vm_instance_views(self, deadline=None):
+        return {"value": []}
+
+
+class SlowCompletions:
+    async def create(self, model, messages, temperature, max_tokens):
+        await asyncio.sleep(0.01)
+        content = "fixes" if "Diagnostic Analysis:" in messages[-1]["content"] else "findings"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+                               usage=SimpleNamespace(total_tokens=10))
+
+
+def test_bounded_queues_apply_backpressure_to_collection(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    from src.agents.resolution_agent import ResolutionAgent
+    from src.agents.stream_pipeline import StreamConfig, StreamPipeline
+    from src.metrics import REGISTRY
+
+    client = PagedClient()
+    sections, in_flight = [], []
+
+    def sink(section):
+        sections.append(section)
+        in_flight.append(pipeline.summary.batches - len(sections))
+
+    executor = AsyncLLMExecutor(client=SimpleNamespace(chat=SimpleNamespace(completions=SlowCompletions())),
+                                rate_limiter=RateLimiter(rpm=100000, tpm=100_000_000))
+    config = StreamConfig(batch_size=5, queue_size=1, workers={"triage": 1, "diagnose": 2, "resolve": 2})
+    pipeline = StreamPipeline(client, DiagnosticAgent(), ResolutionAgent(), sink=sink, config=config,
+                              executor=executor)
+    before = REGISTRY.get_sample_value("stream_batches_processed_total", {"stage": "report"}) or 0
+
+    summary = asyncio.run(pipeline.run())
+
+    assert summary.vms == PAGES * PAGE_SIZE and summary.batches == 40
+    assert summary.processed["report"] == 40 and summary.failed_batches == 0
+    assert all("findings" in s and "fixes" in s for s in sections)
+    # 4 one-slot queues + 6 workers + the rest of the page being split; unbounded would reach 40
+    assert max(in_flight) <= 12
+    assert REGISTRY.get_sample_value("stream_batches_processed_total", {"stage": "report"}) == before + 40
+
+
+class MixedClient(PagedClient):
+    """One page: a stopped VM triage explains and a VM only the LLM can"""
+
+    def iter_vm_pages(self, deadline=None):
+        yield {"value": [
+            {"name": "vm-stopped", "location": "eastus", "properties": {"powerState": "deallocated"},
+             "nsg": {"value": []}},
+            {"name": "vm-odd", "location": "eastus", "properties": {"powerState": "starting"}},
+        ]}
+
+
+class FailingCompletions:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, model, messages, temperature, max_tokens):
+        self.calls.append(messages[-1]["content"])
+        raise RuntimeError("model unavailable")
+
+
+def test_failed_analysis_after_triage_findings_is_counted(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    from src.agents.resolution_agent import ResolutionAgent
+    from src.agents.stream_pipeline import StreamConfig, StreamPipeline
+
+    sections = []
+    completions = FailingCompletions()
+    executor = AsyncLLMExecutor(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)),
+                                rate_limiter=RateLimiter(rpm=100000, tpm=100_000_000))
+    pipeline = StreamPipeline(MixedClient(), DiagnosticAgent(), ResolutionAgent(), sink=sections.append,
+                              config=StreamConfig(batch_size=5), executor=executor)
+
+    summary = asyncio.run(pipeline.run())
+
+    assert summary.failed_batches == 1
+    assert not sections[0].split("\n", 1)[1].startswith("⚠️") and "⚠️ Analysis failed" in sections[0]
+    # Only the triage findings are sent on for resolution, not the failed AI section
+    assert len(completions.calls) == 2
+    assert "vm-stopped" in completions.calls[1] and "Analysis failed" not in completions.calls[1]
+
+
+def test_indexes_cover_every_arm_page(monkeypatch):
+    import time
+    import requests
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    from src.agents.resolution_agent import ResolutionAgent
+    from src.agents.stream_pipeline import StreamPipeline
+    from src.services.azure_client import AzureClient
+    from src.services.circuit_breaker import CircuitBreaker
+
+    rdp_allowed = [{"name": "allow-rdp", "properties": {
+        "priority": 100, "direction": "Inbound", "access": "Allow",
+        "protocol": "TCP", "destinationPortRange": "3389"}}]
+
+    class Response:
+        status_code = 200
+
+        def __init__(self, data):
+            self.data = data
+
+        def json(self):
+            return dict(self.data)
+
+    def request(method, url, **kwargs):
+        if "networkSecurityGroups" in url:
+            # vm-a's NSG is only on the second NSG page
+            if url.endswith("&page=2"):
+                return Response({"value": [{"name": "vm-a-nsg", "properties": {"securityRules": rdp_allowed}}]})
+            return Response({"value": [{"name": "other-nsg", "properties": {"securityRules": []}}],
+                             "nextLink": url + "&page=2"})
+        if "statusOnly" in url:
+            return Response({"value": [{"name": "vm-a", "properties": {"instanceView": {"statuses": [
+                {"code": "PowerState/running"}]}}}]})
+        if "virtualMachines" in url:
+            return Response({"value": [{"name": "vm-a", "location": "eastus", "properties": {}}]})
+        return Response({"value": []})
+
+    class Token:
+        token, expires_on = "token", time.time() + 3600
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("AZURE_AUTH_MODE", "MOCK")
+    client = AzureClient()
+    client.mode = "CLI"
+    client.credential = type("Credential", (), {"get_token": lambda self, scope: Token()})()
+    client.breaker = CircuitBreaker("test-arm-stream")
+    monkeypatch.setattr(requests, "request", request)
+
+    sections = []
+    completions = FailingCompletions()
+    executor = AsyncLLMExecutor(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)),
+                                rate_limiter=RateLimiter(rpm=100000, tpm=100_000_000))
+    pipeline = StreamPipeline(client, DiagnosticAgent(), ResolutionAgent(), sink=sections.append,
+                              executor=executor)
+
+    summary = asyncio.run(pipeline.run())
+
+    assert summary.vms == 1 and summary.batches_with_issues == 0
+    assert "All VMs healthy" in sections[0] and not completions.calls
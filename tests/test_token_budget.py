@@ -0,0 +1,79 @@
+# © Rajan Mishra — 2025
+import os
+import sys
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+import pytest
+
+from src.utils.tokens import TokenBudgeter, PromptBudgetExceeded, count_tokens
+
+
+def _vm(name, state="running", env="dev"):
+    return {
+        "name": name,
+        "location": "eastus",
+        "properties": {"hardwareProfile": {"vmSize": "Standard_B2s"}, "powerState": state},
+        "tags": {"environment": env},
+    }
+
+
+def test_budget_keeps_everything_when_it_fits():
+    budgeter = TokenBudgeter("gpt-4o-mini", max_tokens=1500)
+    result = budgeter.fit(["a", "b"], render=str, base_tokens=100)
+    assert result.kept == ["a", "b"]
+    assert not result.truncated
+
+
+def test_budget_raises_when_base_prompt_too_large():
+    budgeter = TokenBudgeter("gpt-4", max_tokens=1500)
+    with pytest.raises(PromptBudgetExceeded):
+        budgeter.fit([], render=str, base_tokens=10000)
+
+
+def test_diagnostic_agent_drops_healthy_vms_first(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    agent = DiagnosticAgent()
+    agent.enable_clustering = False
+    vms = [_vm(f"vm-healthy-{i:04d}") for i in range(400)]
+    vms.insert(200, _vm("vm-stopped", state="stopped"))
+    vms.insert(300, _vm("vm-prod", env="production"))
+
+    # Shrink the window so only a fraction of the fleet fits
+    one_vm = count_tokens(agent._describe_vm(len(vms), vms[0]), agent.model)
+    agent.context_window = agent.max_tokens + 64 + 256 + 400 + 50 * one_vm
+    _, _, budget = agent._build_messages({"value": vms})
+
+    kept = [cluster.representative["name"] for cluster in budget.kept]
+    assert budget.truncated
+    assert "vm-stopped" in kept and "vm-prod" in kept
+    assert all(c.representative["name"].startswith("vm-healthy") for c in budget.dropped)
+
+
+def test_large_tier_prompt_is_refit_to_its_output_budget(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    from types import SimpleNamespace
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    from src.agents.model_router import ModelRouter
+    from src.utils.tokens import count_message_tokens
+    agent = DiagnosticAgent()
+    agent.enable_clustering = False
+    agent.router = ModelRouter("diagnostic", agent.model, agent.max_tokens, 0.7, large_issue_threshold=1,
+                               output_tokens_per_second=60, enabled=True)
+    vms = [_vm(f"vm-healthy-{i:04d}") for i in range(400)] + [_vm("vm-stopped", state="stopped")]
+    one_vm = count_tokens(agent._describe_vm(len(vms), vms[0]), agent.model)
+    agent.context_window = agent.max_tokens + 64 + 256 + 400 + 100 * one_vm
+    calls = []
+
+    def create(messages, **kwargs):
+        calls.append((count_message_tokens(messages, agent.model), kwargs))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="report"))], usage=None)
+
+    agent.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    result = agent.analyze_result({"value": vms})
+
+    input_tokens, kwargs = calls[0]
+    assert not result.failed
+    assert kwargs["model"] == agent.router.large_model and kwargs["max_tokens"] > agent.max_tokens
+    assert input_tokens + kwargs["max_tokens"] <= agent.context_window
+    assert "vm-stopped" in result.analyzed[0][0]
@@ -0,0 +1,48 @@
+# © Rajan Mishra — 2025
+import os
+import sys
+sys.path.insert(0, str(os.path.dirname(os.path.dirname(__file__))))
+
+from src.agents.triage import triage_fleet, HEALTHY, KNOWN_ISSUE, NEEDS_AI, classify_vm
+
+RDP_ALLOWED = {"value": [{"name": "allow-rdp", "properties": {
+    "priority": 100, "direction": "Inbound", "access": "Allow",
+    "protocol": "TCP", "destinationPortRange": "3389"}}]}
+
+
+def _vm(name, state="running", provisioning="Succeeded", env="dev", nsg=None):
+    vm = {"name": name, "location": "eastus",
+          "properties": {"powerState": state, "provisioningState": provisioning},
+          "tags": {"environment": env}}
+    if nsg is not None:
+        vm["nsg"] = nsg
+    return vm
+
+
+def test_classify_vm_statuses():
+    assert classify_vm(_vm("a", nsg=RDP_ALLOWED))["status"] == HEALTHY
+    assert classify_vm(_vm("b", state="stopped"))["status"] == KNOWN_ISSUE
+    assert classify_vm(_vm("c", provisioning="Updating", nsg=RDP_ALLOWED))["status"] == NEEDS_AI
+
+
+def test_vm_without_nsg_data_is_not_assumed_healthy():
+    verdict = classify_vm(_vm("no-nsg"))
+    assert verdict["status"] == NEEDS_AI
+    assert "RDP reachability not checked" in verdict["reasons"][0]
+
+
+def test_triage_uses_nsg_rules_and_escalates_production():
+    os.environ["AZURE_AUTH_MODE"] = "MOCK"
+    from src.services.azure_client import AzureClient
+    client = AzureClient()
+    vm_data = {"value": [_vm("vm-web-01", env="production"), _vm("vm-ok"), _vm("vm-odd", state="starting")]}
+    nsgs = {"vm-web-01": client.get_nsg_rules(), "vm-ok": RDP_ALLOWED}
+
+    report = triage_fleet(vm_data, nsgs)
+
+    assert [vm["name"] for vm in report.healthy] == ["vm-ok"]
+    assert [vm["name"] for vm in report.needs_ai] == ["vm-odd"]
+    assert report.known_issues[0]["vm"] == "vm-web-01"
+    assert report.known_issues[0]["category"] == "network"
+    assert report.known_issues[0]["severity"] == "Critical"
+    assert report.ai_payload(vm_data)["count"] == 1
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+bench_llm_client.py - Per-request connection cost: fresh client vs shared pooled client
+© Rajan Mishra — 2025
+
+Runs N chat completions against the local mock OpenAI server three ways:
+- fresh:     a new OpenAI client per request (client construction + new connection)
+- reconnect: one client with keep-alive disabled (new connection per request)
+- pooled:    the process-wide client from src/services/llm_client.py
+
+reconnect - pooled is the per-request connection setup the pool saves. Against
+the real API this also includes the TLS handshake, so local numbers are a lower bound.
+
+Run from project root: python tools/bench_llm_client.py [--requests 200]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import httpx
+from openai import DefaultHttpxClient, OpenAI
+
+from src.services.mock_openai_server import MockOpenAIConfig, MockOpenAIServer
+
+
+def _run(label: str, server: MockOpenAIServer, requests: int, make_client, shared: bool) -> float:
+    connections_before = server.stats.connections
+    client = make_client() if shared else None
+    started = time.perf_counter()
+    for _ in range(requests):
+        c = client or make_client()
+        c.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "ping"}])
+        if not shared:
+            c.close()
+    elapsed = time.perf_counter() - started
+    per_request_ms = elapsed / requests * 1000
+    connections = server.stats.connections - connections_before
+    print(f"{label:<10} {per_request_ms:8.3f} ms/request   {connections:5d} connections")
+    return per_request_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with MockOpenAIServer(MockOpenAIConfig(latency_ms=0)) as server:
+        base_url = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+        os.environ["OPENAI_BASE_URL"] = base_url
+
+        from src.services.llm_client import get_openai_client, reset_clients
+        reset_clients()
+
+        print(f"🚀 {args.requests} sequential requests against {base_url}")
+        fresh = _run("fresh", server, args.requests,
+                     lambda: OpenAI(api_key="bench-key", base_url=base_url, max_retries=0), shared=False)
+        reconnect = _run("reconnect", server, args.requests,
+                         lambda: OpenAI(api_key="bench-key", base_url=base_url, max_retries=0,
+                                        http_client=DefaultHttpxClient(
+                                            limits=httpx.Limits(max_keepalive_connections=0))),
+                         shared=True)
+        pooled = _run("pooled", server, args.requests, get_openai_client, shared=True)
+        print(f"\n✅ Connection reuse saves {reconnect - pooled:.3f} ms/request; "
+              f"sharing one client instead of one per caller saves {fresh - pooled:.3f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+bench_prioritize.py - Benchmark fix prioritization at backlog scale
+© Rajan Mishra — 2025
+
+Compares the original per-keyword-list scan + full sort with the weighted
+prioritizer, both as a full sort and as streaming top-K selection.
+
+Run from project root:
+    python tools/bench_prioritize.py --fixes 100000 --top-k 100
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.agents.prioritizer import prioritize
+
+TEMPLATES = [
+    "Start stopped VM vm-{n:05d} so RDP connections succeed",
+    "Open port 3389 on NSG vm-{n:05d}-nsg for the jump host range",
+    "Security: restrict exposed management ports on vm-{n:05d}",
+    "Investigate slow disk performance on vm-{n:05d}",
+    "Redeploy vm-{n:05d} after failed provisioning",
+    "Rightsize unused vm-{n:05d} to reduce cost",
+    "Enable boot diagnostics on vm-{n:05d}",
+    "Rotate local admin password on vm-{n:05d}",
+]
+
+DETAILS = [
+    "Verify connectivity with Test-NetConnection from the bastion subnet and record the change in the ticket.",
+    "Apply during the next maintenance window and notify the application owner before making the change.",
+    "Use the Azure CLI from Cloud Shell; the change takes effect within a minute and can be rolled back.",
+    "Check the activity log for the operation that caused this and add an alert rule for recurrences.",
+]
+
+
+def legacy_prioritize(fixes):
+    """The original heuristic, kept here as the baseline"""
+    prioritized = []
+    for fix in fixes:
+        priority = "Medium"
+        if any(word in fix.lower() for word in ["critical", "security", "down", "failed"]):
+            priority = "Critical"
+        elif any(word in fix.lower() for word in ["performance", "slow", "timeout"]):
+            priority = "High"
+        elif any(word in fix.lower() for word in ["cost", "optimize", "unused"]):
+            priority = "Low"
+        prioritized.append({"fix": fix, "priority": priority})
+    priority_order = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3}
+    prioritized.sort(key=lambda x: priority_order.get(x["priority"], 4))
+    return prioritized
+
+
+def timed(label, fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<28} {best * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fix prioritization")
+    parser.add_argument("--fixes", type=int, default=100_000)
+    parser.add_argument("--top-k", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # Fix descriptions from the ResolutionAgent are a sentence or two long
+    fixes = [f"{rng.choice(TEMPLATES).format(n=i)}. {rng.choice(DETAILS)}" for i in range(args.fixes)]
+    print(f"📊 Prioritizing {args.fixes} fixes (best of {args.repeat})")
+    timed("legacy (scan + full sort)", lambda: legacy_prioritize(fixes), args.repeat)
+    timed("weighted (full sort)", lambda: prioritize(fixes), args.repeat)
+    top = timed(f"weighted (top-{args.top_k})", lambda: prioritize(fixes, top_k=args.top_k), args.repeat)
+    print(f"Most urgent: [{top[0]['priority']}, score {top[0]['score']}] {top[0]['fix']}")
+
+
+if __name__ == "__main__":
+    main()
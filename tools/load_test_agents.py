@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+load_test_agents.py - Offline load test of the AI path against the mock OpenAI server
+© Rajan Mishra — 2025
+
+Builds a synthetic fleet, runs DiagnosticAgent chunked analysis and ResolutionAgent
+batch generation against a local mock server with configurable latency and 429 rate,
+and reports wall-clock time, throughput and executor queue statistics.
+
+Run from project root:
+    python tools/load_test_agents.py --vms 2000 --chunk-size 20 --latency-ms 400
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.services.llm_client import run_async
+from src.services.mock_openai_server import MockOpenAIConfig, MockOpenAIServer
+
+
+def synthetic_fleet(count: int) -> dict:
+    """Distinct VMs (no two share a configuration) so clustering does not collapse them"""
+    vms = []
+    for i in range(count):
+        vms.append({
+            "name": f"vm-load-{i:05d}",
+            "location": ["eastus", "westus", "northeurope"][i % 3],
+            "properties": {
+                "hardwareProfile": {"vmSize": "Standard_B2s"},
+                "provisioningState": "Succeeded",
+                "powerState": "stopped" if i % 7 == 0 else "running",
+            },
+            "tags": {"environment": "production" if i % 5 == 0 else "dev", "app": f"app-{i}"},
+        })
+    return {"value": vms, "count": count, "simulation": True}
+
+
+async def run(args) -> None:
+    from src.agents.async_executor import AsyncLLMExecutor
+    from src.agents.diagnostic_agent import DiagnosticAgent
+    from src.agents.resolution_agent import ResolutionAgent
+    from src.services.rate_limiter import RateLimiter
+
+    limiter = RateLimiter(rpm=args.rpm, tpm=args.tpm)
+    executor = AsyncLLMExecutor(rate_limiter=limiter, max_concurrency=args.concurrency)
+
+    diagnostic = DiagnosticAgent()
+    diagnostic.chunk_size = args.chunk_size
+    resolution = ResolutionAgent()
+
+    fleet = synthetic_fleet(args.vms)
+    started = time.perf_counter()
+    report = await diagnostic.analyze_chunked_async(fleet, executor=executor)
+    diagnose_seconds = time.perf_counter() - started
+
+    sections = report.split("\n\n### ")
+    started = time.perf_counter()
+    await resolution.suggest_fixes_many_async(sections, executor=executor)
+    resolve_seconds = time.perf_counter() - started
+
+    stats = executor.stats.as_dict()
+    total = stats["completed"] + stats["failed"]
+    print(f"Diagnose: {len(sections)} chunks in {diagnose_seconds:.2f}s")
+    print(f"Resolve:  {len(sections)} requests in {resolve_seconds:.2f}s")
+    print(f"Throughput: {total / (diagnose_seconds + resolve_seconds):.1f} requests/s")
+    print(f"Executor: {stats}")
+    print(f"Limiter:  {limiter.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--vms", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=float, default=5000)
+    parser.add_argument("--tpm", type=float, default=5_000_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    config = MockOpenAIConfig(latency_ms=args.latency_ms, rate_limit_rate=args.rate_limit_rate,
+                              retry_after_seconds=0.5)
+    with MockOpenAIServer(config) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "load-test-key")
+        print(f"🚀 {args.vms} VMs, chunk size {args.chunk_size}, concurrency {args.concurrency}, "
+              f"mock latency {args.latency_ms:.0f}ms")
+        run_async(run(args))
+        print(f"Server:   {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+nightly_batch.py - Offline full-estate analysis through batch jobs
+© Rajan Mishra — 2025
+
+1. Fetches the fleet and writes per-chunk diagnostic requests to a JSONL job
+2. Submits the job, polls until complete and maps reports back to VMs
+3. Does the same for resolution steps, one request per diagnostic chunk
+4. Writes report.md into the job directory
+
+Re-running with the same --job-dir resumes: already submitted batches are
+polled instead of resubmitted, and completed steps are not repeated.
+
+Run from project root:
+    python tools/nightly_batch.py --job-dir .agent_state/nightly/2025-01-31 [--local]
+"""
+import argparse
+import codecs
+import os
+import sys
+import time
+from pathlib import Path
+
+if sys.platform == 'win32':
+    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
+    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv
+
+from src.agents.batch_jobs import BatchJob, LocalBatchBackend, OpenAIBatchBackend
+from src.agents.diagnostic_agent import DiagnosticAgent
+from src.agents.resolution_agent import ResolutionAgent
+from src.services.azure_client import AzureClient
+from src.services.mock_openai_server import canned_completion
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nightly full-fleet batch analysis")
+    parser.add_argument("--job-dir", default=os.path.join(".agent_state", "nightly", time.strftime("%Y-%m-%d")))
+    parser.add_argument("--local", action="store_true", help="Use the file-based stand-in backend (offline)")
+    parser.add_argument("--chunk-size", type=int, default=25)
+    parser.add_argument("--poll-interval", type=float, default=60.0)
+    args = parser.parse_args()
+    load_dotenv()
+
+    if args.local:
+        os.environ.setdefault("OPENAI_API_KEY", "local-batch-key")
+        # Offline runs answer with the mock server's canned responses
+        backend = LocalBatchBackend(os.path.join(args.job_dir, "local_backend"),
+                                    lambda body: canned_completion(body.get("messages", [])))
+    else:
+        backend = OpenAIBatchBackend()
+
+    diagnostic_agent = DiagnosticAgent()
+    resolution_agent = ResolutionAgent()
+
+    print(f"🌙 Nightly batch job: {args.job_dir}")
+    diagnostic_job = BatchJob(os.path.join(args.job_dir, "diagnostic"))
+    if diagnostic_job.status == "new":
+        vm_data = AzureClient().get_vm_list()
+        if vm_data.get("error"):
+            print(f"❌ Error fetching VMs: {vm_data.get('message')}")
+            sys.exit(1)
+        diagnostic_job.write_requests(diagnostic_agent.build_batch_requests(vm_data, args.chunk_size))
+    print(f"⏳ Diagnostic batch ({len(diagnostic_job.manifest['requests'])} requests): {diagnostic_job.status}")
+    diagnostic_results = diagnostic_job.run(backend, poll_interval=args.poll_interval)
+    vm_reports = diagnostic_agent.map_batch_results(diagnostic_results)
+
+    resolution_job = BatchJob(os.path.join(args.job_dir, "resolution"))
+    summaries = {cid: r["content"] for cid, r in diagnostic_results.items() if not r["error"]}
+    resolution_job.write_requests(resolution_agent.build_batch_requests(summaries))
+    print(f"⏳ Resolution batch ({len(resolution_job.manifest['requests'])} requests): {resolution_job.status}")
+    fixes = resolution_agent.map_batch_results(resolution_job.run(backend, poll_interval=args.poll_interval))
+
+    report_path = os.path.join(args.job_dir, "report.md")
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(f"# Nightly Fleet Report ({len(vm_reports)} VMs)\n")
+        for custom_id, result in sorted(diagnostic_results.items()):
+            vms = result["meta"].get("vms", [])
+            f.write(f"\n## {custom_id}: {len(vms)} VMs\n\nVMs: {', '.join(vms)}\n\n")
+            f.write(vm_reports.get(vms[0], "") if vms else "")
+            f.write(f"\n\n### Resolution\n\n{fixes.get(custom_id, 'No resolution generated')}\n")
+    print(f"✅ Report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()